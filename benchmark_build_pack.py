@@ -0,0 +1,26 @@
+import argparse
+from modules.dataset_loader import load_dataset
+from modules.question_pack import build_question_pack, pack_path
+from modules.utils import PROMPT_TEMPLATES, DEFAULT_PROMPT
+
+def main():
+    """ Renders and tokenises every question of a dataset once for a given model's tokenizer
+    and saves them as a memory-mapped question pack for local runs (--pack).
+    """
+    parser = argparse.ArgumentParser(description="Ethnographic Benchmark question pack builder")
+    parser.add_argument("--test", type=str, required=True, help="Path to the test dataset file (.csv/.xlsx)")
+    parser.add_argument("--llm", type=str, required=True, help="Model identifier whose tokenizer is used")
+    parser.add_argument("--prompt", type=str, default=DEFAULT_PROMPT, choices=list(PROMPT_TEMPLATES),
+                        help=f"Prompt template id (default: {DEFAULT_PROMPT}); the run must use the same --prompt")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Pack directory (default: models/packs/<dataset>__<model>__<prompt>)")
+
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.llm)
+    path = args.output or pack_path(args.test, args.llm, prompt_id=args.prompt)
+    build_question_pack(load_dataset(args.test), tokenizer, path, args.llm, args.prompt)
+
+if __name__ == "__main__":
+    main()
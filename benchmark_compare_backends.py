@@ -0,0 +1,114 @@
+import argparse
+import json
+import time
+from typing import Any
+from modules.dataset_loader import load_dataset
+from modules.llm_connector import ask_model
+from modules.utils import build_prompt, DEFAULT_PROMPT
+from modules.scorer import evaluate_answer
+from modules.response_saver import save_run_summary
+
+def parse_variant(spec: str) -> dict[str, Any]:
+    """
+    Parses a variant specification "key=value,key=value" into config overrides.
+    Values are decoded as JSON when possible (numbers, booleans), otherwise kept as strings.
+
+    Args:
+        spec (str): Variant specification, e.g. "api=onnx" or "api=local,quantization=int8_dynamic".
+
+    Returns:
+        dict: Config overrides.
+    """
+    overrides = {}
+    for item in spec.split(","):
+        key, _, value = item.partition("=")
+        try:
+            overrides[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key.strip()] = value.strip()
+    return overrides
+
+def compare_variants(test_data, base_config: dict[str, Any], variants: list[str]) -> dict[str, Any]:
+    """
+    Runs the same questions through every config variant and measures time, throughput,
+    accuracy, speedup and agreement of answers with the first variant (the reference).
+
+    Args:
+        test_data (pd.DataFrame): Loaded dataset.
+        base_config (dict): Config shared by all variants.
+        variants (list[str]): Variant specifications (see parse_variant).
+
+    Returns:
+        dict: Per-variant report.
+    """
+    report = {}
+    reference_answers = None
+    reference_s_per_question = None
+
+    for spec in variants:
+        config = {**base_config, **parse_variant(spec)}
+        answers = []
+        completion_tokens = 0
+        generation_time = 0.0
+        correct = 0
+
+        # the first question also covers model loading/export, so it is timed separately
+        start = time.perf_counter()
+        first_question_time = None
+        for _, row in test_data.iterrows():
+            call_info = {}
+            answer, _ = ask_model(build_prompt(row, prompt_id=config.get("prompt_id", DEFAULT_PROMPT)),
+                                  {**config, "call_info": call_info})
+            if first_question_time is None:
+                first_question_time = time.perf_counter() - start
+            answers.append(answer)
+            completion_tokens += call_info.get("completion_tokens", 0)
+            generation_time += call_info.get("generation_time_s", 0.0)
+            correct += evaluate_answer(answer, str(row["Pozycja"])) == "prawidłowa"
+        total_time = time.perf_counter() - start
+
+        steady_questions = max(len(answers) - 1, 1)
+        s_per_question = (total_time - (first_question_time or 0.0)) / steady_questions
+        if reference_answers is None:
+            reference_answers = answers
+            reference_s_per_question = s_per_question
+        agreement = sum(a == b for a, b in zip(answers, reference_answers)) / max(len(answers), 1)
+
+        report[spec] = {
+            "questions": len(answers),
+            "first_question_s": round(first_question_time or 0.0, 3),
+            "s_per_question": round(s_per_question, 3),
+            "speedup_vs_reference": round(reference_s_per_question / s_per_question, 3) if s_per_question > 0 else None,
+            "tokens_per_s": round(completion_tokens / generation_time, 2) if generation_time > 0 else None,
+            "accuracy": round(correct / max(len(answers), 1), 4),
+            "agreement_with_reference": round(agreement, 4),
+        }
+        print(f"[{spec}] {report[spec]}")
+
+    return report
+
+def main():
+    """ Compares backends/configurations of the same model on the same questions
+    (e.g. transformers pipeline vs ONNX Runtime) and saves a JSON report.
+    """
+    parser = argparse.ArgumentParser(description="Ethnographic Benchmark backend comparison")
+    parser.add_argument("--test", type=str, required=True, help="Path to the test dataset file (.csv/.xlsx)")
+    parser.add_argument("--llm", type=str, required=True, help="Model identifier")
+    parser.add_argument("--variant", type=str, action="append", required=True,
+                        help="Config overrides 'key=value,...' (repeatable), e.g. --variant api=local --variant api=onnx "
+                             "or --variant prompt_id=pl-v1 --variant prompt_id=pl-compact-v1")
+    parser.add_argument("--limit", type=int, default=20, help="Number of questions to compare on")
+    parser.add_argument("--max_new_tokens", type=int, default=256, help="Max number of newly generated tokens")
+    parser.add_argument("--output", type=str, default="results/backend_comparison.json", help="Path to save the report")
+
+    args = parser.parse_args()
+
+    test_data = load_dataset(args.test).head(args.limit)
+    base_config = {"model_id": args.llm, "max_new_tokens": args.max_new_tokens}
+
+    report = compare_variants(test_data, base_config, args.variant)
+    save_run_summary(report, args.output)
+    print(f"Comparison saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
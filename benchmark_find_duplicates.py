@@ -0,0 +1,50 @@
+import argparse
+import json
+import os
+import time
+from modules.dataset_loader import (load_dataset, find_near_duplicates, duplicate_report, collapse_duplicates,
+                                    DEFAULT_DUPLICATE_THRESHOLD, DEFAULT_NUM_PERM, DEFAULT_NGRAM)
+
+def main():
+    """ Finds near-duplicate questions in a dataset, reports the clusters and optionally
+    saves the dataset with every cluster collapsed to its first question.
+    """
+    parser = argparse.ArgumentParser(description="Near-duplicate question finder (MinHash/LSH)")
+    parser.add_argument("--test", type=str, required=True, help="Path to the test dataset file (.csv/.xlsx)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD,
+                        help="Minimal similarity (0-1) of near-duplicate questions")
+    parser.add_argument("--num_perm", type=int, default=DEFAULT_NUM_PERM, help="MinHash signature length")
+    parser.add_argument("--ngram", type=int, default=DEFAULT_NGRAM, help="Character n-gram length")
+    parser.add_argument("--output", type=str, default=None, help="Optional path to save the cluster report (JSON)")
+    parser.add_argument("--deduped", type=str, default=None,
+                        help="Optional path to save the dataset without near-duplicates (.csv/.xlsx)")
+
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.test)
+    start = time.perf_counter()
+    clusters = find_near_duplicates(dataset, args.threshold, args.num_perm, args.ngram)
+    report = duplicate_report(dataset, clusters)
+    print(f"{report['questions']} questions checked in {time.perf_counter() - start:.2f}s: {report['clusters']} clusters, "
+          f"{report['duplicates']} duplicates, {report['conflicting']} clusters with different correct answers")
+    for detail in report["details"][:10]:
+        flag = " (different correct answers)" if detail["conflicting_answers"] else ""
+        print(f"  {detail['index']}{flag}: {detail['pytania'][0][:80]}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Duplicate report saved to {args.output}")
+
+    if args.deduped:
+        deduped = collapse_duplicates(dataset, clusters)
+        os.makedirs(os.path.dirname(args.deduped) or ".", exist_ok=True)
+        if args.deduped.endswith(".xlsx"):
+            deduped.to_excel(args.deduped, index=False)
+        else:
+            deduped.to_csv(args.deduped, index=False)
+        print(f"Dataset with {len(deduped)} questions saved to {args.deduped}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+from modules.local_backend import load_local_model, get_local_model_stats
+from modules.local_server import create_server
+
+def main():
+    """ Starts a long-running local inference server that loads the given models once
+    and keeps them warm, so benchmark runs with --api local_server start answering immediately.
+    """
+    parser = argparse.ArgumentParser(description="Ethnographic Benchmark local inference server")
+    parser.add_argument("--llm", type=str, action="append", default=[], help="Model to preload (repeatable)")
+    parser.add_argument("--quantization", type=str, default=None, choices=["q4", "int8_dynamic", "int4_weight_only"],
+                        help="Quantization mode of the preloaded models")
+    parser.add_argument("--micro_batch", action='store_true',
+                        help="Gather concurrent requests into padded micro-batches (one generate call per batch)")
+    parser.add_argument("--batch_size", type=int, default=8, help="Largest micro-batch")
+    parser.add_argument("--batch_wait", type=float, default=0.01,
+                        help="Seconds to wait for more requests after the first one of a micro-batch")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind")
+
+    args = parser.parse_args()
+
+    for model_id in args.llm:
+        pipe = load_local_model(model_id, quantization=args.quantization)
+        # warm-up call, so the first benchmark question does not pay for lazy initialisation
+        pipe("Answer:", max_new_tokens=1, do_sample=False)
+        print(f"[Local server] {model_id} ready: {get_local_model_stats({'model_id': model_id, 'quantization': args.quantization})}")
+
+    server = create_server(args.host, args.port, args.micro_batch, args.batch_size, args.batch_wait)
+    print(f"[Local server] Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[Local server] Shutting down")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+from modules.merger import merge_results
+from modules.stats import compare_models
+from modules.response_saver import load_raw_results, save_raw_results
+
+def main():
+    """ Scores raw results of one or more models, writes per-model summaries
+    and a merged leaderboard, and optionally converts raw results between JSON and Parquet.
+    """
+    parser = argparse.ArgumentParser(description="Ethnographic Benchmark results merger")
+    parser.add_argument("--results", type=str, nargs="+", help="Raw results files (.json or .parquet)")
+    parser.add_argument("--output", type=str, default="results/merged_summary.json", help="Path to save the merged leaderboard")
+    parser.add_argument("--answers", type=str, default=None,
+                        help="Optional path to save all scored answers as one table (.parquet recommended)")
+    parser.add_argument("--convert", type=str, nargs=2, metavar=("SRC", "DST"), default=None,
+                        help="Convert a raw results file between JSON and Parquet and exit")
+    parser.add_argument("--manifest", type=str, default=None,
+                        help="Merge manifest caching per-file counts (default: merge_manifest.json next to --output)")
+    parser.add_argument("--stats", type=str, default=None,
+                        help="Optional path to save bootstrap confidence intervals and paired significance tests (JSON)")
+    parser.add_argument("--n_resamples", type=int, default=10000, help="Bootstrap resamples used with --stats")
+    parser.add_argument("--no_manifest", action="store_true", help="Re-score all files without using a manifest")
+
+    args = parser.parse_args()
+
+    if args.convert:
+        src, dst = args.convert
+        save_raw_results(load_raw_results(src), dst)
+        print(f"Converted {src} to {dst}")
+        return
+
+    if not args.results:
+        parser.error("--results is required unless --convert is used")
+
+    manifest = None
+    if not args.no_manifest:
+        manifest = args.manifest or os.path.join(os.path.dirname(args.output), "merge_manifest.json")
+
+    leaderboard, answers = merge_results(args.results, manifest_path=manifest, with_answers=bool(args.answers or args.stats))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(leaderboard, f, indent=2, ensure_ascii=False)
+    print(f"Merged summary saved to {args.output}")
+
+    if args.answers:
+        if args.answers.endswith(".parquet"):
+            answers.to_parquet(args.answers, index=False)
+        else:
+            answers.to_json(args.answers, orient="records", force_ascii=False, indent=2)
+        print(f"Scored answers saved to {args.answers}")
+
+    if args.stats:
+        report = compare_models(answers, n_resamples=args.n_resamples)
+        os.makedirs(os.path.dirname(args.stats) or ".", exist_ok=True)
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Confidence intervals and paired tests over {report['questions']} shared questions saved to {args.stats}")
+
+    for name, summary in sorted(leaderboard.items(), key=lambda item: -(item[1]["accuracy"] or 0)):
+        print(f"{name}: {summary['accuracy']} ({summary['podsumowanie']['prawidłowa']}/{summary['liczba_pytań']})")
+
+if __name__ == "__main__":
+    main()
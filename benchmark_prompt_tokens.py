@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+from modules.dataset_loader import load_dataset
+from modules.question_pack import prompt_token_counts
+from modules.utils import PROMPT_TEMPLATES, DEFAULT_PROMPT
+
+def main():
+    """ Reports the prompt token count of every prompt template over the whole dataset
+    for one or more tokenizers, with the saving relative to the default template.
+    """
+    parser = argparse.ArgumentParser(description="Prompt token counts per template and tokenizer")
+    parser.add_argument("--test", type=str, required=True, help="Path to the test dataset file (.csv/.xlsx)")
+    parser.add_argument("--tokenizer", type=str, nargs="+", required=True, help="Model identifiers whose tokenizers are used")
+    parser.add_argument("--prompt", type=str, nargs="+", default=list(PROMPT_TEMPLATES), choices=list(PROMPT_TEMPLATES),
+                        help="Prompt template ids (default: all registered templates)")
+    parser.add_argument("--output", type=str, default=None, help="Optional path to save the report (JSON)")
+
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+    test_data = load_dataset(args.test)
+    report = {}
+    for tokenizer_id in args.tokenizer:
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_id)
+        counts = {prompt_id: prompt_token_counts(test_data, tokenizer, prompt_id) for prompt_id in args.prompt}
+        baseline = prompt_token_counts(test_data, tokenizer, DEFAULT_PROMPT)["tokens"]
+        print(f"{tokenizer_id} ({len(test_data)} questions)")
+        for prompt_id, count in counts.items():
+            count["saving_vs_default"] = round(1 - count["tokens"] / baseline, 4) if baseline else None
+            print(f"  {prompt_id:<16} {count['tokens']:>10} tokens   mean {count['mean']:>7.1f}   max {count['max']:>5}   "
+                  f"saving {count['saving_vs_default']:.1%}")
+        report[tokenizer_id] = counts
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Prompt token report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from modules.reparse import reparse_results
+from modules.response_saver import load_raw_results, save_raw_results
+
+def main():
+    """ Re-parses the raw model outputs stored in results files with the current parser
+    (no model calls) and reports which answers changed.
+    """
+    parser = argparse.ArgumentParser(description="Re-parse stored raw model outputs without regenerating answers")
+    parser.add_argument("--results", type=str, nargs="+", required=True, help="Raw results files (.json or .parquet)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Where to save the re-parsed results (one input file only; default: report only)")
+    parser.add_argument("--in_place", action="store_true", help="Overwrite the input files with the re-parsed results")
+    parser.add_argument("--report", type=str, default=None, help="Optional path to save the changes report (JSON)")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+
+    args = parser.parse_args()
+    if args.output and (args.in_place or len(args.results) > 1):
+        parser.error("--output takes a single results file and cannot be combined with --in_place")
+
+    reports = {}
+    for path in args.results:
+        start = time.perf_counter()
+        updated, report = reparse_results(load_raw_results(path), args.workers)
+        reports[path] = report
+
+        transitions = Counter(f"{change['przed']} -> {change['po']}" for change in report["changes"])
+        print(f"{path}: {report['reparsed']}/{report['records']} re-parsed in {time.perf_counter() - start:.2f}s, "
+              f"{report['changed']} answers changed, correct {report['correct_before']} -> {report['correct_after']}")
+        for transition, count in transitions.most_common(10):
+            print(f"  {transition}: {count}")
+        if report["without_raw"]:
+            print(f"  {report['without_raw']} records have no stored raw output and were kept as they are")
+
+        target = path if args.in_place else args.output
+        if target:
+            save_raw_results(updated, target)
+            print(f"Re-parsed results saved to {target}")
+
+    if args.report:
+        os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        print(f"Changes report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
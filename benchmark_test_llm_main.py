@@ -1,10 +1,604 @@
 import argparse
+import json
+import logging
+import os
+import random
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from modules.dataset_loader import load_dataset
-from modules.llm_connector import ask_model
-from modules.utils import build_prompt
-from modules.response_saver import save_raw_results
+from typing import Any, Optional
+from modules.dataset_loader import (load_dataset, find_near_duplicates, duplicate_report, collapse_duplicates,
+                                    DEFAULT_DUPLICATE_THRESHOLD)
+from modules.llm_connector import ask_model, ask_model_batch, ask_model_samples
+from modules.permutations import option_orders, permute_row, permutation_metrics
+from modules.utils import build_prompt, build_explanation_prompt, PROMPT_TEMPLATES, DEFAULT_PROMPT
+from modules.response_saver import (save_raw_results, save_run_summary, run_summary_path, load_raw_results,
+                                    compress_output, compress_outputs, RAW_OUTPUT_META, RAW_EXPLANATION_META)
+from modules.profiling import current_rss_mb, peak_rss_mb, track_peak_rss
+from modules.adaptive import stratified_order, stop_reason, adaptive_summary
+from modules.scorer import evaluate_answer
+from modules.results_db import open_results_db, start_run, record_answer
+from modules.metrics import RunMetrics, start_metrics_exporter
+from modules.costs import load_prices, model_price, usage_summary, budget_reason
+from modules.question_pack import load_question_pack, check_question_pack, pack_input_ids, prompts_hash
+from modules.work_queue import (open_queue, create_queue, queue_meta, claim_batch, renew_lease, complete_batch,
+                                abandon_batch, queue_progress, queue_usage, collect_results, worker_name,
+                                DEFAULT_LEASE_S)
+
+logger = logging.getLogger(__name__)
+
+def build_record(idx, row, answer: str, explanation: str, **extra_meta) -> dict[str, Any]:
+    """
+    Builds a raw result record for a single question.
+
+    Args:
+        idx: Question number (DataFrame index).
+        row (pd.Series): Dataset row.
+        answer (str): Model answer.
+        explanation (str): Model explanation.
+        **extra_meta: Additional fields stored in 'meta' (e.g. per-sample answers).
+
+    Returns:
+        dict: Result record.
+    """
+    return {
+        "numer" : idx,
+        "pytanie": row["Pytanie"],
+        "poprawna": row["Pozycja"],
+        "odpowiedź": answer,
+        "uzasadnienie": explanation,
+        "meta": {
+            "domena": row.get("Domena", ""),
+            "kategoria": row.get("Kategoria", ""),
+            "tagi": row.get("Tagi", ""),
+            **extra_meta
+        }
+    }
+
+def append_result(results: list, record: dict[str, Any], row, db) -> None:
+    """
+    Appends a result record and, if a results database is used, stores it there as well.
+
+    Args:
+        results (list): Raw results of the run.
+        record (dict): Result record (see build_record).
+        row (pd.Series): Dataset row of the question.
+        db (tuple | None): (connection, run id) of the results database or None.
+    """
+    results.append(record)
+    if db is not None:
+        conn, run_id = db
+        record_answer(conn, run_id, row, record)
+
+def add_call_info(totals: dict[str, float], call_info: dict[str, Any]) -> None:
+    """
+    Adds numeric per-call statistics reported by a backend to the run totals.
+    """
+    for key, value in call_info.items():
+        if isinstance(value, (int, float)):
+            totals[key] = totals.get(key, 0) + value
+
+def run_usage(args, totals: dict) -> dict[str, Any]:
+    """
+    Returns the token usage and cost of the run so far, including earlier sessions of a resumed run.
+    """
+    return usage_summary(totals, args.llm, getattr(args, "price_table", None) or load_prices(),
+                         getattr(args, "previous_usage", None))
+
+def budget_exhausted(args, totals: dict) -> Optional[str]:
+    """
+    Checks the run budget (--max_cost, --max_tokens_total) before the next request is dispatched.
+
+    Returns:
+        str | None: Name of the limit that was reached, or None.
+    """
+    if getattr(args, "max_cost", None) is None and getattr(args, "max_tokens_total", None) is None:
+        return None
+    usage = run_usage(args, totals)
+    reason = budget_reason(usage, args.max_cost, args.max_tokens_total)
+    if reason:
+        print(f"Budget limit {reason} reached ({usage['total_tokens']} tokens, cost {usage['cost_usd']} USD); "
+              f"stopping. Rerun with --resume to continue.")
+    return reason
+
+def save_progress(args, results: list, totals: dict) -> None:
+    """
+    Saves the results file and the usage of the run so far to the run summary file, so that
+    --resume also counts the usage of a session that did not finish (the full summary replaces it).
+    """
+    save_raw_results(results, args.results)
+    save_run_summary({"llm": args.llm, "llm_name": args.llm_name, "partial": True, "usage": run_usage(args, totals)},
+                     run_summary_path(args.results))
+
+def answer_question(idx, row, model_config: dict[str, Any], totals: dict, metrics: RunMetrics = None) -> dict[str, Any]:
+    """
+    Asks the model one question and builds its result record (with timing, token count and the
+    compressed raw model output in 'meta').
+
+    Returns:
+        dict: Result record.
+    """
+    metrics = metrics or RunMetrics()
+    prompt_id = model_config.get("prompt_id", DEFAULT_PROMPT)
+    prompt = build_prompt(row, answer_only=bool(model_config.get("answer_only")), prompt_id=prompt_id)
+    call_info = {}
+    config = {**model_config, "call_info": call_info}
+    if model_config.get("question_pack") is not None:
+        config["input_ids"] = pack_input_ids(model_config["question_pack"], idx)
+    question_start = time.perf_counter()
+    try:
+        with metrics.request():
+            answer, explanation = ask_model(prompt, config)
+    except Exception as e:
+        print(f"Error processing question {idx}: {e}")
+        answer, explanation = "Generation error", "Exception during processing"
+    add_call_info(totals, call_info)
+    metrics.record(1, failed=int(answer == "Generation error"), call_info=call_info)
+
+    extra = {"szablon_promptu": prompt_id}
+    if "prompt_tokens" in call_info:
+        extra["tokeny_promptu"] = call_info["prompt_tokens"]
+    if model_config.get("answer_only"):
+        extra["ma_uzasadnienie"] = False
+    if call_info.get("raw_output") is not None:
+        # kept so that answers can be re-parsed later without asking the model again
+        extra[RAW_OUTPUT_META] = compress_output(call_info["raw_output"])
+    return build_record(idx, row, answer, explanation,
+                        czas_s=round(time.perf_counter() - question_start, 3),
+                        tokeny=call_info.get("completion_tokens"), **extra)
+
+def ask_question(idx, row, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                 db=None, metrics: RunMetrics = None) -> dict[str, Any]:
+    """
+    Asks the model one question, stores the result and saves the results file.
+
+    Returns:
+        dict: The stored result record.
+    """
+    record = answer_question(idx, row, model_config, totals, metrics)
+    append_result(results, record, row, db)
+
+    if args.interval > 0:
+        time.sleep(args.interval)
+
+    save_progress(args, results, totals)
+    total_time = time.time() - start_time
+
+    logger.info("Finished %d questions in %.2f seconds. Results saved to: %s", len(results), total_time, args.results)
+    return record
+
+def run_coordinator(test_data, args, results: list, db=None) -> dict[str, float]:
+    """
+    Coordinator role: splits the dataset into batches of args.queue_batch questions in the work
+    queue (args.queue), waits until workers have answered all of them and saves the results.
+    Once the run-wide usage recorded in the queue reaches the budget, it stops waiting as soon as
+    no batch is leased and saves the answers so far. Restarting the coordinator on an existing
+    queue resumes the run.
+
+    Returns:
+        dict: Summed backend statistics reported by the workers.
+    """
+    conn = open_queue(args.queue)
+    prompt_id = getattr(args, "prompt", DEFAULT_PROMPT)
+    batches = create_queue(conn, list(test_data.index), args.queue_batch, {
+        "dataset": args.test, "prompt": prompt_id, "prompts_sha1": prompts_hash(test_data, prompt_id),
+        "llm": args.llm, "llm_name": args.llm_name,
+    })
+    print(f"Work queue {args.queue} has {batches} batches; waiting for workers")
+
+    reported = None
+    while True:
+        progress = queue_progress(conn)
+        if progress["answers"] != reported:
+            reported = progress["answers"]
+            logger.info("Queue progress: %d/%d questions answered (%d batches leased, %d workers)",
+                        progress["answers"], len(test_data), progress["leased"], progress["workers"])
+        if progress["done"] == progress["batches"]:
+            break
+        # workers stop claiming batches once the budget is reached; leased ones are still finished
+        if not progress["leased"] and budget_exhausted(args, queue_usage(conn)):
+            break
+        time.sleep(args.poll_interval)
+
+    records, totals = collect_results(conn)
+    for record in records:
+        append_result(results, record, test_data.loc[record["numer"]], db)
+    save_raw_results(results, args.results)
+    if len(results) < len(test_data):
+        print(f"{len(results)}/{len(test_data)} questions answered within the budget. Results saved to: {args.results}")
+    else:
+        print(f"All {len(results)} questions answered. Results saved to: {args.results}")
+    return totals
+
+def run_worker(test_data, model_config: dict[str, Any], args, totals: dict, metrics: RunMetrics = None) -> None:
+    """
+    Worker role: claims question batches from the work queue with a lease of args.lease seconds,
+    answers them and writes the answers back. The lease is renewed after every question; a worker
+    that lost its lease stops answering the batch, which another worker has reclaimed. Batches of
+    crashed workers are reclaimed once their lease expires. Before each claim the budget is checked
+    against the run-wide usage of all workers recorded in the queue. The worker exits when every
+    batch is done or the budget is reached.
+    """
+    conn = open_queue(args.queue)
+    meta = queue_meta(conn)
+    while not meta:
+        # the coordinator has not filled the queue yet
+        time.sleep(args.poll_interval)
+        meta = queue_meta(conn)
+    if meta.get("prompts_sha1") != prompts_hash(test_data, model_config.get("prompt_id", DEFAULT_PROMPT)):
+        raise ValueError(f"Work queue {args.queue} was created for a different dataset or prompt template")
+    worker = worker_name()
+
+    while not budget_exhausted(args, queue_usage(conn)):
+        claimed = claim_batch(conn, worker, args.lease)
+        if claimed is None:
+            progress = queue_progress(conn)
+            if not progress["pending"] and not progress["leased"]:
+                break
+            # other workers hold the remaining batches; wait in case a lease expires
+            time.sleep(args.poll_interval)
+            continue
+
+        batch_id, labels = claimed
+        batch_totals = {}
+        records = []
+        lease_lost = False
+        for label in labels:
+            records.append(answer_question(label, test_data.loc[label], model_config, batch_totals, metrics))
+            if not renew_lease(conn, batch_id, worker, args.lease):
+                lease_lost = True
+                break
+            if args.interval > 0:
+                time.sleep(args.interval)
+        add_call_info(totals, batch_totals)
+        if lease_lost:
+            abandon_batch(conn, batch_id, worker, batch_totals)
+            logger.warning("Worker %s lost the lease of batch %d after %d questions; leaving it to the new holder",
+                           worker, batch_id, len(records))
+            continue
+        if not complete_batch(conn, batch_id, worker, records, batch_totals):
+            logger.warning("Worker %s lost the lease of batch %d before saving it; leaving it to the new holder",
+                           worker, batch_id)
+            continue
+        logger.info("Worker %s finished batch %d (%d questions)", worker, batch_id, len(records))
+
+def run_questions(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                  db=None, metrics: RunMetrics = None) -> None:
+    """
+    Asks the model every question one by one and saves the results after each answer.
+    """
+    for idx, row in test_data.iterrows():
+        if budget_exhausted(args, totals):
+            break
+        ask_question(idx, row, model_config, args, results, totals, start_time, db, metrics)
+
+def run_concurrent(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                   db=None, metrics: RunMetrics = None) -> None:
+    """
+    Asks up to args.concurrency questions at once (e.g. for the local backend's micro-batching
+    scheduler or rate-limited APIs). A question is submitted only when one of the in-flight ones
+    has finished and the budget is not exhausted; in-flight questions are always completed and
+    counted. Results are stored and saved in dataset order.
+    """
+    rows = test_data.iterrows()
+    in_flight = deque()
+    stopped = False
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while True:
+            while not stopped and len(in_flight) < args.concurrency:
+                if budget_exhausted(args, totals):
+                    stopped = True
+                    break
+                idx, row = next(rows, (None, None))
+                if row is None:
+                    stopped = True
+                    break
+                call_totals = {}
+                in_flight.append((row, call_totals,
+                                  pool.submit(answer_question, idx, row, model_config, call_totals, metrics)))
+            if not in_flight:
+                break
+            row, call_totals, future = in_flight.popleft()
+            record = future.result()
+            add_call_info(totals, call_totals)
+            append_result(results, record, row, db)
+            save_progress(args, results, totals)
+            logger.info("Finished %d questions in %.2f seconds. Results saved to: %s",
+                        len(results), time.time() - start_time, args.results)
+
+def run_adaptive(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                 db=None, metrics: RunMetrics = None) -> dict[str, Any]:
+    """
+    Adaptive mode: asks questions in stratified random order (by 'Domena' and 'Kategoria'),
+    updates the accuracy estimate and its Wilson interval after every answer and stops once the
+    interval is at most args.ci_width wide or args.max_questions questions were asked.
+
+    Returns:
+        dict: Adaptive summary (questions used, accuracy, interval, stop reason).
+    """
+    budget = min(args.max_questions or len(test_data), len(test_data))
+    if metrics is not None:
+        metrics.total_questions = budget
+    hits = asked = 0
+    reason = None
+    for idx in stratified_order(test_data, seed=args.seed):
+        reason = budget_exhausted(args, totals)
+        if reason:
+            break
+        row = test_data.loc[idx]
+        record = ask_question(idx, row, model_config, args, results, totals, start_time, db, metrics)
+        asked += 1
+        hits += evaluate_answer(str(record["odpowiedź"]), str(row["Pozycja"])) == 'prawidłowa'
+        reason = stop_reason(hits, asked, args.ci_width, budget, args.min_questions)
+        if reason:
+            break
+
+    summary = adaptive_summary(hits, asked, len(test_data), reason, args.ci_width, seed=args.seed)
+    print(f"Adaptive run stopped after {asked}/{len(test_data)} questions ({summary['stop_reason']}): "
+          f"accuracy {summary['accuracy']} [{summary['ci_low']}, {summary['ci_high']}]")
+    return summary
+
+def explanation_subset(results: list, test_data, mode: str, fraction: float = 0.1, seed: int = 0) -> list:
+    """
+    Selects the records that get an explanation in the second pass of two-stage evaluation.
+    Only answer-only records with an answer letter A–D can be explained; records explained
+    before (a resumed run) are not selected again.
+
+    Args:
+        results (list): Records of the answer-only pass.
+        test_data (pd.DataFrame): Full dataset (including questions answered before a resume).
+        mode (str): "wrong" (answers other than correct), "sample" (random share), "all" or "none".
+        fraction (float): Share of records drawn in "sample" mode.
+        seed (int): Random seed of "sample" mode.
+
+    Returns:
+        list: Selected records, in results order.
+    """
+    candidates = [record for record in results if record["odpowiedź"] in ("A", "B", "C", "D")
+                  and "ma_uzasadnienie" in record["meta"]]
+    if mode == "none":
+        return []
+    if mode == "wrong":
+        candidates = [record for record in candidates
+                      if evaluate_answer(str(record["odpowiedź"]), str(test_data.loc[record["numer"]]["Pozycja"])) != 'prawidłowa']
+    elif mode == "sample":
+        # drawn over all answer-only records, so a resumed run keeps the original selection
+        chosen = set(random.Random(seed).sample(range(len(candidates)), round(fraction * len(candidates))))
+        candidates = [record for i, record in enumerate(candidates) if i in chosen]
+    return [record for record in candidates if not record["meta"]["ma_uzasadnienie"]]
+
+def run_two_stage(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                  db=None, metrics: RunMetrics = None, dataset=None) -> dict[str, Any]:
+    """
+    Two-stage mode: the first pass asks every question with the answer-only prompt and a limit of
+    args.answer_tokens new tokens; the second pass asks for explanations of the given answers only
+    for the subset selected by args.explain (see explanation_subset). Records are marked with
+    'ma_uzasadnienie' in 'meta'; scored answers always come from the first pass. With --resume,
+    dataset is the full dataset, so answers of the interrupted run can still be explained.
+
+    Returns:
+        dict: Two-stage summary (explained records, tokens and generation time per pass).
+    """
+    answer_config = {**model_config, "answer_only": True, "max_new_tokens": args.answer_tokens}
+    prompt_id = model_config.get("prompt_id", DEFAULT_PROMPT)
+    for idx, row in test_data.iterrows():
+        if budget_exhausted(args, totals):
+            break
+        ask_question(idx, row, answer_config, args, results, totals, start_time, db, metrics)
+    answer_pass = {key: round(totals.get(key, 0), 3) for key in ("completion_tokens", "generation_time_s")}
+
+    dataset = test_data if dataset is None else dataset
+    selected = explanation_subset(results, dataset, args.explain, args.explain_sample, args.seed)
+    explained = 0
+    for record in selected:
+        if budget_exhausted(args, totals):
+            break
+        row = dataset.loc[record["numer"]]
+        call_info = {}
+        try:
+            answer, explanation = ask_model(build_explanation_prompt(row, record["odpowiedź"], prompt_id),
+                                            {**model_config, "call_info": call_info})
+        except Exception as e:
+            print(f"Error explaining question {record['numer']}: {e}")
+            answer, explanation = "Generation error", "Exception during processing"
+        add_call_info(totals, call_info)
+        if call_info.get("completion_tokens") is not None:
+            record["meta"]["tokeny_uzasadnienia"] = call_info["completion_tokens"]
+        if call_info.get("raw_output") is not None:
+            record["meta"][RAW_EXPLANATION_META] = compress_output(call_info["raw_output"])
+        if answer not in ("Generation error", "Parsing error"):
+            record["uzasadnienie"] = explanation
+            record["meta"]["ma_uzasadnienie"] = True
+            explained += 1
+            if db is not None:
+                record_answer(db[0], db[1], row, record)
+        save_progress(args, results, totals)
+
+    summary = {
+        "explain": args.explain,
+        "answer_tokens": args.answer_tokens,
+        "selected": len(selected),
+        "explained": explained,
+        "answer_pass": answer_pass,
+        "explanation_pass": {key: round(totals.get(key, 0) - value, 3) for key, value in answer_pass.items()},
+    }
+    print(f"Two-stage run: {len(results)} answers, {explained}/{len(selected)} explanations")
+    return summary
+
+def run_self_consistency(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                         db=None, metrics: RunMetrics = None) -> None:
+    """
+    Self-consistency mode: draws args.num_samples answers per question in one call
+    (batched across args.batch_size questions), aggregates them by majority vote
+    and stores per-sample letters, raw outputs and the agreement rate in 'meta'.
+    """
+    config = {**model_config, "num_samples": args.num_samples, "temperature": args.temperature,
+              "top_p": args.top_p, "batch_size": args.batch_size}
+    prompt_id = model_config.get("prompt_id", DEFAULT_PROMPT)
+    metrics = metrics or RunMetrics()
+    rows = list(test_data.iterrows())
+
+    for start in range(0, len(rows), args.batch_size):
+        if budget_exhausted(args, totals):
+            break
+        batch = rows[start:start + args.batch_size]
+        call_info = {}
+        try:
+            with metrics.request():
+                outcomes = ask_model_samples([build_prompt(row, prompt_id=prompt_id) for _, row in batch],
+                                             {**config, "call_info": call_info})
+        except Exception as e:
+            print(f"Error processing questions {batch[0][0]}-{batch[-1][0]}: {e}")
+            outcomes = [{"answer": "Generation error", "explanation": "Exception during processing",
+                         "samples": [], "agreement": 0.0} for _ in batch]
+        add_call_info(totals, call_info)
+        metrics.record(len(batch), failed=sum(outcome["answer"] == "Generation error" for outcome in outcomes),
+                       call_info=call_info)
+
+        for (idx, row), outcome in zip(batch, outcomes):
+            extra = {}
+            if any(text is not None for text in outcome.get("raw_outputs", [])):
+                extra[RAW_OUTPUT_META] = compress_outputs(outcome["raw_outputs"])
+            append_result(results, build_record(idx, row, outcome["answer"], outcome["explanation"],
+                                                samples=outcome["samples"], agreement=outcome["agreement"],
+                                                szablon_promptu=prompt_id, **extra), row, db)
+
+        if args.interval > 0:
+            time.sleep(args.interval)
+
+        save_progress(args, results, totals)
+        total_time = time.time() - start_time
+
+        logger.info("Finished %d questions in %.2f seconds. Results saved to: %s", len(results), total_time, args.results)
+
+def run_permutations(test_data, model_config: dict[str, Any], args, results: list, totals: dict, start_time: float,
+                     db=None, metrics: RunMetrics = None) -> None:
+    """
+    Option-permutation robustness mode: every question is asked in several option orders
+    (args.permutations: "cyclic" or "all") with the correct letter remapped. All variants of
+    a question are answered as one batch. The record keeps the answer for the original order
+    and the per-variant answers and raw outputs in 'meta'.
+    """
+    prompt_id = model_config.get("prompt_id", DEFAULT_PROMPT)
+    metrics = metrics or RunMetrics()
+    orders = option_orders(args.permutations)
+
+    for idx, row in test_data.iterrows():
+        if budget_exhausted(args, totals):
+            break
+        variants = [permute_row(row, order) for order in orders]
+        call_info = {}
+        try:
+            with metrics.request():
+                outcomes = ask_model_batch([build_prompt(variant, prompt_id=prompt_id) for variant in variants],
+                                           {**model_config, "call_info": call_info})
+        except Exception as e:
+            print(f"Error processing question {idx}: {e}")
+            outcomes = [("Generation error", "Exception during processing")] * len(variants)
+        add_call_info(totals, call_info)
+        metrics.record(1, failed=int(outcomes[0][0] == "Generation error"), call_info=call_info)
+
+        answer, explanation = outcomes[0]
+        extra = {}
+        if any(text is not None for text in call_info.get("raw_outputs", [])):
+            extra[RAW_OUTPUT_META] = compress_outputs(call_info["raw_outputs"])
+        append_result(results, build_record(idx, row, answer, explanation, szablon_promptu=prompt_id, permutations=[
+            {"order": "".join(order), "poprawna": variant["Pozycja"], "odpowiedź": variant_answer}
+            for order, variant, (variant_answer, _) in zip(orders, variants, outcomes)
+        ], **extra), row, db)
+
+        if args.interval > 0:
+            time.sleep(args.interval)
+
+        save_progress(args, results, totals)
+        total_time = time.time() - start_time
+
+        logger.info("Finished %d questions in %.2f seconds. Results saved to: %s", len(results), total_time, args.results)
+
+def selected_modes(args) -> list[str]:
+    """Run mode flags given on the command line; a run executes exactly one mode."""
+    flags = {
+        "--concurrency": args.concurrency > 1,
+        "--two_stage": args.two_stage,
+        "--adaptive": args.adaptive,
+        "--permutations": bool(args.permutations),
+        "--num_samples": args.num_samples > 1,
+    }
+    return [flag for flag, selected in flags.items() if selected]
+
+def build_summary(args, model_config: dict[str, Any], results: list, totals: dict, start_time: float) -> dict[str, Any]:
+    """
+    Builds the run summary: configuration, timing, throughput, memory and backend-specific statistics.
+    """
+    summary = {
+        "llm": args.llm,
+        "llm_name": args.llm_name,
+        "api": args.api,
+        "quantization": args.quantization or ("q4" if args.use_q4 else None),
+        "prompt": args.prompt,
+        "questions": len(results),
+        "total_time_s": round(time.time() - start_time, 3),
+        "completion_tokens": totals.get("completion_tokens", 0),
+        "tokens_per_s": round(totals["completion_tokens"] / totals["generation_time_s"], 2)
+                        if totals.get("generation_time_s") else None,
+        "rss_mb": round(current_rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if args.api == "local":
+        from modules.local_backend import get_local_model_stats
+        summary["model_load"] = get_local_model_stats(model_config)
+    elif args.api == "onnx":
+        from modules.onnx_backend import get_onnx_model_stats
+        summary["model_load"] = get_onnx_model_stats(model_config)
+    if args.assistant_model_id:
+        summary["assisted_decoding"] = {
+            "assistant_model_id": args.assistant_model_id,
+            "target_forward_calls": totals.get("target_forward_calls", 0),
+            "draft_forward_calls": totals.get("draft_forward_calls", 0),
+            "draft_tokens": totals.get("draft_tokens", 0),
+            "accepted_draft_tokens": totals.get("accepted_draft_tokens", 0),
+            "accept_rate": round(totals.get("accepted_draft_tokens", 0) / totals["draft_tokens"], 4)
+                           if totals.get("draft_tokens") else None,
+            "tokens_per_target_forward": round(totals.get("completion_tokens", 0) / totals["target_forward_calls"], 3)
+                                         if totals.get("target_forward_calls") else None,
+        }
+    summary["usage"] = run_usage(args, totals)
+    if getattr(args, "max_cost", None) is not None or getattr(args, "max_tokens_total", None) is not None:
+        summary["budget"] = {
+            "max_cost": args.max_cost,
+            "max_tokens_total": args.max_tokens_total,
+            "limit_reached": budget_reason(summary["usage"], args.max_cost, args.max_tokens_total),
+        }
+    if getattr(args, "micro_batch", False):
+        summary["micro_batching"] = {
+            "max_batch_size": args.batch_size,
+            "max_wait_s": args.batch_wait,
+            "mean_batch_size": round(totals["micro_batch_size"] / len(results), 2)
+                               if results and totals.get("micro_batch_size") else None,
+        }
+    if args.hedge:
+        summary["hedging"] = {
+            "hedge_budget": args.hedge_budget,
+            "hedged_requests": totals.get("hedged_requests", 0),
+            "hedge_wins": totals.get("hedge_wins", 0),
+        }
+    if args.num_samples > 1:
+        agreements = [r["meta"]["agreement"] for r in results if "agreement" in (r.get("meta") or {})]
+        summary["self_consistency"] = {
+            "num_samples": args.num_samples,
+            "temperature": args.temperature,
+            "top_p": args.top_p,
+            "mean_agreement": round(sum(agreements) / len(agreements), 4) if agreements else None,
+        }
+    if args.permutations:
+        # resumed results may hold answers of an earlier run without permutations
+        summary["permutation_robustness"] = {
+            "mode": args.permutations,
+            **permutation_metrics([{"poprawna": r["poprawna"], "variants": r["meta"]["permutations"]}
+                                   for r in results if "permutations" in (r.get("meta") or {})]),
+        }
+    return summary
 
 def main():
     """ Main function that loads the dataset, configures the model, 
@@ -14,20 +608,147 @@ def main():
 
     parser = argparse.ArgumentParser(description = "Ethnographic Benchmark Runner")
     parser.add_argument("--test", type=str, required=True, help="Path to the test dataset file (.csv/.xlsx)")
-    parser.add_argument("--results", type=str, required=True, help="Path to save raw results (.json)")
+    parser.add_argument("--results", type=str, required=True, help="Path to save raw results (.json or .parquet)")
     parser.add_argument("--llm", type=str, required=True, help="Model identifier (local or API)")
     parser.add_argument("--llm_name", type=str, required=True, help="Friendly model name for reports")
-    parser.add_argument("--api", type=str, required=True, help="API type: local | openAI | google| hf_api | vllm")
+    parser.add_argument("--api", type=str, required=True, help="API type: local | local_server | onnx | openAI | google")
     parser.add_argument("--url", type=str, default=None, help="API URL (if applicable)")
     parser.add_argument("--key", type=str, default=None, help="API key (if applicable, otherwise loaded from .env)")
     parser.add_argument("--max_new_tokens", type=int, default=256, help="Max number of newly generated tokens")
     parser.add_argument("--use_q4", action='store_true', help="Use quantized model (local only)")
+    parser.add_argument("--quantization", type=str, default=None, choices=["q4", "int8_dynamic", "int4_weight_only"],
+                        help="Quantization mode (local only): q4 (bitsandbytes, CUDA) | int8_dynamic | int4_weight_only (CPU)")
+    parser.add_argument("--fast_load", action='store_true',
+                        help="Load memory-mapped safetensors with low CPU memory usage and a parallel tokenizer load (local only)")
+    parser.add_argument("--assistant_model_id", type=str, default=None,
+                        help="Small draft model for assisted decoding, e.g. Bielik 1.5B for Bielik 7B (local only)")
+    parser.add_argument("--constrained", action='store_true',
+                        help="Constrained decoding: force the 'Answer: X / Explanation:' format (local and local_server)")
+    parser.add_argument("--prompt", type=str, default=DEFAULT_PROMPT, choices=list(PROMPT_TEMPLATES),
+                        help=f"Prompt template id (default: {DEFAULT_PROMPT}); stored with every answer")
+    parser.add_argument("--pack", type=str, default=None,
+                        help="Pre-tokenised question pack built with benchmark_build_pack.py (local only)")
+    parser.add_argument("--onnx_path", type=str, default=None, help="Directory with a pre-exported ONNX graph (onnx only)")
+    parser.add_argument("--num_samples", type=int, default=1,
+                        help="Self-consistency: number of sampled answers per question, aggregated by majority vote")
+    parser.add_argument("--temperature", type=float, default=0.7, help="Sampling temperature (only with --num_samples > 1)")
+    parser.add_argument("--top_p", type=float, default=0.95, help="Nucleus sampling threshold (only with --num_samples > 1)")
+    parser.add_argument("--permutations", type=str, default=None, choices=["cyclic", "all"],
+                        help="Option-permutation robustness: ask every question in 4 cyclic or all 24 option orders")
+    parser.add_argument("--batch_size", type=int, default=8, help="Questions per batched generation call (local only)")
+    parser.add_argument("--adaptive", action='store_true',
+                        help="Ask questions in stratified random order and stop once accuracy is pinned down")
+    parser.add_argument("--ci_width", type=float, default=0.1,
+                        help="Adaptive mode: stop when the 95%% confidence interval of accuracy is at most this wide")
+    parser.add_argument("--max_questions", type=int, default=None, help="Adaptive mode: question budget (default: all)")
+    parser.add_argument("--min_questions", type=int, default=30, help="Adaptive mode: minimum questions before stopping")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the adaptive question order")
+    parser.add_argument("--queue", type=str, default=None, help="Work queue file (SQLite) shared by --coordinator and --worker")
+    parser.add_argument("--coordinator", action='store_true',
+                        help="Fill the work queue, wait for workers and save the merged results")
+    parser.add_argument("--worker", action='store_true', help="Answer question batches claimed from the work queue")
+    parser.add_argument("--queue_batch", type=int, default=8, help="Questions per work queue batch")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_S,
+                        help="Seconds a claimed batch stays reserved for a worker before it can be reclaimed")
+    parser.add_argument("--poll_interval", type=float, default=2.0, help="Seconds between work queue polls")
+    parser.add_argument("--prices", type=str, default=None,
+                        help="JSON price table {model_id: {input, output}} in USD per 1M tokens, extending the built-in one")
+    parser.add_argument("--max_cost", type=float, default=None,
+                        help="Stop dispatching requests once the run cost reaches this many USD")
+    parser.add_argument("--max_tokens_total", type=int, default=None,
+                        help="Stop dispatching requests once prompt + completion tokens reach this number")
+    parser.add_argument("--dedupe", action='store_true',
+                        help="Collapse near-duplicate questions (MinHash/LSH) before the run, keeping the first of each cluster")
+    parser.add_argument("--dedupe_threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD,
+                        help="Minimal similarity (0-1) of near-duplicate questions for --dedupe")
+    parser.add_argument("--resume", action='store_true',
+                        help="Keep the answers already in --results and ask only the remaining questions")
+    parser.add_argument("--two_stage", action='store_true',
+                        help="Answer-only first pass with --answer_tokens new tokens, explanations only for --explain")
+    parser.add_argument("--answer_tokens", type=int, default=8, help="Two-stage mode: new tokens of the answer-only pass")
+    parser.add_argument("--explain", choices=["wrong", "sample", "all", "none"], default="wrong",
+                        help="Two-stage mode: which answers get an explanation in the second pass")
+    parser.add_argument("--explain_sample", type=float, default=0.1,
+                        help="Two-stage mode: share of answers explained with --explain sample")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Questions asked at once in the default mode (--interval is not applied)")
+    parser.add_argument("--micro_batch", action='store_true',
+                        help="Local only: gather concurrent requests into padded micro-batches of up to --batch_size")
+    parser.add_argument("--batch_wait", type=float, default=0.01,
+                        help="Seconds the micro-batching scheduler waits for more requests after the first one")
+    parser.add_argument("--max_memory", type=str, default=None,
+                        help="Local only: memory budget per device, e.g. 'cpu=12GiB' or '0=20GiB,cpu=30GiB'; "
+                             "layers that do not fit are offloaded to disk")
+    parser.add_argument("--offload_folder", type=str, default=None,
+                        help="Folder for weights offloaded to disk (default: models/offload/<model>)")
+    parser.add_argument("--db", type=str, default=None, help="SQLite results database to store answers in as the run goes")
+    parser.add_argument("--metrics_file", type=str, default=None,
+                        help="Prometheus text file with live run metrics, refreshed every --metrics_interval seconds")
+    parser.add_argument("--metrics_port", type=int, default=None, help="Serve live run metrics on http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--metrics_interval", type=float, default=5.0, help="Metrics file refresh interval in seconds")
+    parser.add_argument("--log_level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Logging level (DEBUG also logs every prompt)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Per-request deadline in seconds (API backends); late requests end as 'Generation error'")
+    parser.add_argument("--hedge", action='store_true',
+                        help="Send a duplicate API request when one runs past the observed p95 latency; the first answer wins")
+    parser.add_argument("--hedge_budget", type=float, default=0.05, help="Share of API requests that may be duplicated")
     parser.add_argument("--interval", type=int, default=1, help= "Delay between questions in seconds")
 
     args = parser.parse_args()
+    if args.coordinator and args.worker:
+        parser.error("--coordinator and --worker are separate roles")
+    if (args.coordinator or args.worker) and not args.queue:
+        parser.error("--queue is required with --coordinator or --worker")
+    if args.resume and (args.coordinator or args.worker):
+        parser.error("--resume does not apply to work queue runs; restarting the coordinator resumes the queue")
+    if args.resume and args.adaptive:
+        parser.error("--resume cannot continue an --adaptive run: the stratified order and the stopping rule "
+                     "cover the whole run; start it again")
+    modes = selected_modes(args)
+    if (args.coordinator or args.worker) and (modes or args.micro_batch):
+        # workers answer their batches one question at a time with answer_question
+        parser.error(f"{'--coordinator' if args.coordinator else '--worker'} does not support "
+                     f"{', '.join(modes + ['--micro_batch'] * args.micro_batch)}")
+    if len(modes) > 1:
+        parser.error(f"{modes[0]} cannot be combined with {', '.join(modes[1:])}")
+    if args.num_samples > 1 and args.api == "onnx":
+        parser.error("--num_samples needs sampled answers; the onnx backend decodes greedily")
+    if args.concurrency > 1 and args.api == "local" and not args.micro_batch:
+        # the in-process pipeline is not thread-safe; --micro_batch funnels requests through one scheduler
+        parser.error("--concurrency with --api local requires --micro_batch")
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+    args.price_table = load_prices(args.prices)
+    if args.max_cost is not None and model_price(args.llm, args.price_table) is None:
+        parser.error(f"--max_cost needs a price for {args.llm}; add it with --prices")
 
-    test_data = load_dataset(args.test)
+    # peak RSS per phase of the run (dataset, model load, questions)
+    memory_phases = {}
+    with track_peak_rss() as memory_phases["dataset_load"]:
+        dataset = test_data = load_dataset(args.test)
+    dedupe = None
+    if args.dedupe:
+        clusters = find_near_duplicates(dataset, args.dedupe_threshold)
+        report = duplicate_report(dataset, clusters)
+        dedupe = {key: report[key] for key in ("clusters", "duplicates", "conflicting")}
+        dedupe["threshold"] = args.dedupe_threshold
+        dataset = test_data = collapse_duplicates(dataset, clusters)
+        print(f"Dedupe: {report['duplicates']} near-duplicate questions in {report['clusters']} clusters removed "
+              f"({report['conflicting']} clusters with different correct answers); {len(dataset)} questions left")
     results = []
+    args.previous_usage = None
+    if args.resume and os.path.exists(args.results):
+        results = load_raw_results(args.results)
+        templates = {(record.get("meta") or {}).get("szablon_promptu", DEFAULT_PROMPT) for record in results}
+        if templates - {args.prompt}:
+            parser.error(f"--resume: {args.results} was answered with prompt template {', '.join(sorted(templates))}, "
+                         f"not {args.prompt}")
+        answered = {record["numer"] for record in results}
+        test_data = test_data[~test_data.index.isin(answered)]
+        if os.path.exists(run_summary_path(args.results)):
+            with open(run_summary_path(args.results), encoding='utf-8') as f:
+                args.previous_usage = json.load(f).get("usage")
+        print(f"Resuming: {len(results)} questions already answered, {len(test_data)} remaining")
     start_time = time.time()
 
     # Model config passed to ask_model()
@@ -36,38 +757,104 @@ def main():
         "model_id" : args.llm,
         "max_new_tokens": args.max_new_tokens,
         "use_q4" : args.use_q4,
+        "quantization": args.quantization,
+        "fast_load": args.fast_load,
+        "onnx_path": args.onnx_path,
+        "assistant_model_id": args.assistant_model_id,
+        "constrained": args.constrained,
+        "timeout": args.timeout,
+        "hedge": args.hedge,
+        "hedge_budget": args.hedge_budget,
+        "concurrency": args.concurrency,
         "api_key" : args.key,
-        "url" : args.url
+        "url" : args.url,
+        "prompt_id": args.prompt
     }
 
-    for idx, row in test_data.iterrows():
-        prompt = build_prompt(row)
+    if args.max_memory or args.offload_folder:
+        if args.api != "local":
+            parser.error("--max_memory and --offload_folder require --api local")
+        from modules.local_backend import parse_max_memory
         try:
-            answer, explanation = ask_model(prompt, model_config)
-        except Exception as e:
-            print(f"Error processing question {idx}: {e}")
-            answer, explanation = "Generation error", "Exception during processing"
+            model_config["max_memory"] = parse_max_memory(args.max_memory)
+        except ValueError as e:
+            parser.error(str(e))
+        model_config["offload_folder"] = args.offload_folder
 
-        results.append({
-            "numer" : idx,
-            "pytanie": row["Pytanie"],
-            "poprawna": row["Pozycja"],
-            "odpowiedź": answer,
-            "uzasadnienie": explanation,
-            "meta": {
-                "domena": row.get("Domena", ""),
-                "kategoria": row.get("Kategoria", ""),
-                "tagi": row.get("Tagi", "")
-            }
-        })
+    if args.micro_batch:
+        if args.api != "local":
+            parser.error("--micro_batch requires --api local (start benchmark_local_server.py with --micro_batch for local_server)")
+        model_config.update({"micro_batching": True, "max_batch_size": args.batch_size, "max_batch_wait_s": args.batch_wait})
 
-        if args.interval > 0:
-            time.sleep(args.interval)
+    if args.pack:
+        if args.api != "local":
+            parser.error("--pack requires --api local")
+        if args.two_stage:
+            parser.error("--pack holds full prompts and cannot be used with --two_stage")
+        # packed prompts are generated one question at a time (sequential and adaptive modes only)
+        batched = [flag for flag in selected_modes(args) if flag != "--adaptive"] + ["--micro_batch"] * args.micro_batch
+        if batched:
+            parser.error(f"--pack works only in the sequential and adaptive modes, not with {', '.join(batched)}")
+        pack = load_question_pack(args.pack)
+        check_question_pack(pack, dataset, args.llm, args.prompt)
+        model_config["question_pack"] = pack
 
-        save_raw_results(results, args.results)
-        total_time = time.time() - start_time
+    # numeric per-call statistics reported by the backends (tokens, timings, ...)
+    totals = {}
+
+    db = None
+    if args.db and not args.worker:
+        conn = open_results_db(args.db)
+        db = (conn, start_run(conn, args.llm_name, args.llm, args.api, args.test,
+                              {k: v for k, v in model_config.items() if k not in ("api_key", "question_pack")}))
+
+    metrics = RunMetrics(total_questions=len(test_data))
+    stop_metrics = None
+    if args.metrics_file or args.metrics_port is not None:
+        stop_metrics = start_metrics_exporter(metrics, args.metrics_file, args.metrics_port, args.metrics_interval)
+
+    if args.api == "local" and not args.coordinator:
+        from modules.local_backend import load_local_model
+        with track_peak_rss() as memory_phases["model_load"]:
+            load_local_model(args.llm, use_q4=args.use_q4, quantization=args.quantization, fast_load=args.fast_load,
+                             max_memory=model_config.get("max_memory"), offload_folder=model_config.get("offload_folder"))
+
+    adaptive = two_stage = None
+    try:
+        with track_peak_rss() as memory_phases["questions"]:
+            if args.worker:
+                run_worker(test_data, model_config, args, totals, metrics)
+                return
+            if args.coordinator:
+                totals = run_coordinator(test_data, args, results, db)
+            elif args.concurrency > 1:
+                run_concurrent(test_data, model_config, args, results, totals, start_time, db, metrics)
+            elif args.two_stage:
+                two_stage = run_two_stage(test_data, model_config, args, results, totals, start_time, db, metrics, dataset)
+            elif args.adaptive:
+                adaptive = run_adaptive(test_data, model_config, args, results, totals, start_time, db, metrics)
+            elif args.permutations:
+                run_permutations(test_data, model_config, args, results, totals, start_time, db, metrics)
+            elif args.num_samples > 1:
+                run_self_consistency(test_data, model_config, args, results, totals, start_time, db, metrics)
+            else:
+                run_questions(test_data, model_config, args, results, totals, start_time, db, metrics)
+    finally:
+        if stop_metrics:
+            stop_metrics()
 
-        print (f"Finished {len(results)} questions in {total_time:.2f} seconds. Results saved to: {args.results}")
+    summary = build_summary(args, model_config, results, totals, start_time)
+    if adaptive:
+        summary["adaptive"] = adaptive
+    if two_stage:
+        summary["two_stage"] = two_stage
+    if dedupe:
+        summary["dedupe"] = dedupe
+    summary["memory_phases"] = memory_phases
+    if args.coordinator:
+        summary["work_queue"] = queue_progress(open_queue(args.queue))
+    save_run_summary(summary, run_summary_path(args.results))
+    print(f"Run summary saved to: {run_summary_path(args.results)}")
 
               
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+import random
+from typing import Any, Optional
+import pandas as pd
+from modules.stats import wilson_interval
+
+STRATA_COLUMNS = ("Domena", "Kategoria")
+
+def stratified_order(test_data: pd.DataFrame, seed: int = 0, columns: tuple[str, ...] = STRATA_COLUMNS) -> list:
+    """
+    Returns the dataset index in a stratified random order: questions are shuffled within every
+    stratum (combination of 'Domena' and 'Kategoria') and strata are interleaved proportionally to
+    their size, so every prefix of the order covers the strata like the full question bank does.
+
+    Args:
+        test_data (pd.DataFrame): Dataset.
+        seed (int): Random seed.
+        columns (tuple[str, ...]): Stratification columns (missing columns are ignored).
+
+    Returns:
+        list: Dataset index labels in asking order.
+    """
+    rng = random.Random(seed)
+    columns = [column for column in columns if column in test_data.columns]
+    keys = test_data[columns].fillna("").astype(str).agg("|".join, axis=1) if columns else pd.Series("", test_data.index)
+
+    positions = []
+    for _, group in keys.groupby(keys, sort=True):
+        labels = list(group.index)
+        rng.shuffle(labels)
+        offset = rng.random()
+        # item i of a stratum of size n lands at relative position (i + offset) / n
+        positions.extend(((rank + offset) / len(labels), rng.random(), label) for rank, label in enumerate(labels))
+    return [label for *_, label in sorted(positions, key=lambda item: item[:2])]
+
+def stop_reason(hits: int, n: int, target_width: float, max_questions: int, min_questions: int = 30,
+                confidence: float = 0.95) -> Optional[str]:
+    """
+    Decides whether adaptive evaluation can stop.
+
+    Args:
+        hits (int): Correct answers so far.
+        n (int): Questions asked so far.
+        target_width (float): Stop once the confidence interval is at most this wide.
+        max_questions (int): Question budget.
+        min_questions (int): Never stop on interval width before this many questions.
+        confidence (float): Confidence level of the interval.
+
+    Returns:
+        str | None: "ci_width", "budget" or None to continue.
+    """
+    if n >= min_questions:
+        low, high = wilson_interval(hits, n, confidence)
+        if high - low <= target_width:
+            return "ci_width"
+    if n >= max_questions:
+        return "budget"
+    return None
+
+def adaptive_summary(hits: int, n: int, available: int, reason: Optional[str], target_width: float,
+                     confidence: float = 0.95, seed: int = 0) -> dict[str, Any]:
+    """Summary of an adaptive run: questions used, accuracy estimate with its interval and why it stopped."""
+    low, high = wilson_interval(hits, n, confidence)
+    return {
+        "questions_used": n,
+        "questions_available": available,
+        "accuracy": round(hits / n, 4) if n else None,
+        "ci_low": round(low, 4),
+        "ci_high": round(high, 4),
+        "confidence": confidence,
+        "target_width": target_width,
+        "stop_reason": reason or "exhausted",
+        "seed": seed,
+    }
@@ -1,13 +1,198 @@
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from openai import OpenAI
 import google.generativeai as genai
 from dotenv import load_dotenv
-from typing import Any
+from typing import Any, Optional
 from modules.utils import parse_output
 
 # Load environment variables from .env
 load_dotenv()
 
+# Hedged requests: a duplicate request is sent when the first one runs past the p95 latency
+# of recent successful requests (needs HEDGE_MIN_SAMPLES observations first)
+HEDGE_MIN_SAMPLES = 20
+_latencies: deque = deque(maxlen=200)
+_hedge_stats = {"requests": 0, "hedged": 0}
+_hedge_lock = threading.Lock()
+# request threads for deadlines and hedging; grown to 2 threads per concurrent question (see _get_executor)
+MIN_REQUEST_THREADS = 8
+_executor = ThreadPoolExecutor(max_workers=MIN_REQUEST_THREADS, thread_name_prefix="api-request")
+_executor_size = MIN_REQUEST_THREADS
+# usage of abandoned requests (hedge losers, requests past the deadline) that finished later;
+# the provider bills them, so it is added to the call_info of the next finished request
+_late_usage: dict[str, int] = {}
+
+def _usage(prompt_tokens, completion_tokens) -> dict[str, int]:
+    """Builds the token usage of a response (fields missing from the response are left out)."""
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+    return {key: value for key, value in usage.items() if isinstance(value, int)}
+
+def _sampling(config: dict[str, Any]) -> dict[str, float]:
+    """Sampling settings of the request (self-consistency sets them; otherwise the API defaults apply)."""
+    return {key: float(config[key]) for key in ("temperature", "top_p") if config.get(key) is not None}
+
+def _call_openai(prompt: str, config: dict[str, Any], max_new_tokens: int) -> tuple[str, dict[str, int]]:
+    """Sends the prompt to the OpenAI chat completions API and returns the raw output with its token usage."""
+    api_key = config.get("api_key") or os.getenv("OPENAI_API_KEY")
+    client_kwargs = {"timeout": float(config["timeout"])} if config.get("timeout") else {}
+    client = OpenAI(api_key = api_key, base_url = config.get("url"), **client_kwargs)
+
+    response = client.chat.completions.create(
+        model = config["model_id"],
+        messages = [{"role": "user", "content": prompt}],
+        max_tokens=max_new_tokens,
+        **_sampling(config)
+    )
+    usage = getattr(response, "usage", None)
+    return response.choices[0].message.content.strip(), _usage(getattr(usage, "prompt_tokens", None),
+                                                               getattr(usage, "completion_tokens", None))
+
+def _call_google(prompt: str, config: dict[str, Any], max_new_tokens: int) -> tuple[str, dict[str, int]]:
+    """Sends the prompt to the Google Generative AI API and returns the raw output with its token usage."""
+    api_key = config.get("api_key") or os.getenv("GOOGLE_API_KEY")
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name=config["model_id"])
+    request_kwargs = {"request_options": {"timeout": float(config["timeout"])}} if config.get("timeout") else {}
+    response = model.generate_content(
+        prompt,
+        generation_config={"max_output_tokens": int(max_new_tokens), **_sampling(config)},
+        **request_kwargs
+    )
+    usage = getattr(response, "usage_metadata", None)
+    return response.text.strip(), _usage(getattr(usage, "prompt_token_count", None),
+                                         getattr(usage, "candidates_token_count", None))
+
+def _get_executor(config: dict[str, Any]) -> ThreadPoolExecutor:
+    """
+    Returns the request executor, grown to two threads per concurrent question (config['concurrency'])
+    so that requests and their hedges never wait in the executor queue behind other questions.
+    """
+    global _executor, _executor_size
+    size = max(MIN_REQUEST_THREADS, 2 * int(config.get("concurrency") or 1))
+    with _hedge_lock:
+        if size > _executor_size:
+            # running requests finish on the old executor's threads
+            _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="api-request")
+            _executor_size = size
+        return _executor
+
+def _record_late_usage(future) -> None:
+    """Done callback of an abandoned request: keeps its token usage for the run totals."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    (_, usage), _ = future.result()
+    with _hedge_lock:
+        for key, value in usage.items():
+            _late_usage[key] = _late_usage.get(key, 0) + value
+
+def _add_late_usage(call_info: Optional[dict[str, Any]]) -> None:
+    """Moves the usage of abandoned requests that finished in the meantime into call_info."""
+    if call_info is None:
+        return
+    with _hedge_lock:
+        late = dict(_late_usage)
+        _late_usage.clear()
+    for key, value in late.items():
+        call_info[key] = call_info.get(key, 0) + value
+
+def _abandon(futures) -> None:
+    """Cancels requests that have not started; running ones finish and their usage is kept."""
+    for future in futures:
+        future.cancel()
+        future.add_done_callback(_record_late_usage)
+
+def _timed_call(call, *args, started: Optional[threading.Event] = None) -> tuple[tuple[str, dict[str, int]], float]:
+    """Runs a request and returns its result with the latency (recorded for hedging on success)."""
+    if started is not None:
+        started.set()
+    start = time.perf_counter()
+    result = call(*args)
+    latency = time.perf_counter() - start
+    with _hedge_lock:
+        _latencies.append(latency)
+    return result, latency
+
+def hedge_delay(config: dict[str, Any]) -> Optional[float]:
+    """
+    Returns how long to wait before sending a duplicate request: config['hedge_delay_s'] if set,
+    otherwise the p95 latency of recent successful requests (None until enough requests were observed).
+    """
+    if config.get("hedge_delay_s"):
+        return float(config["hedge_delay_s"])
+    with _hedge_lock:
+        observed = sorted(_latencies)
+    if len(observed) < HEDGE_MIN_SAMPLES:
+        return None
+    return observed[min(int(0.95 * len(observed)), len(observed) - 1)]
+
+def _may_hedge(config: dict[str, Any]) -> bool:
+    """Checks the extra-request budget: at most config['hedge_budget'] (default 5%) of requests are duplicated."""
+    budget = float(config.get("hedge_budget", 0.05))
+    with _hedge_lock:
+        if _hedge_stats["hedged"] + 1 > budget * _hedge_stats["requests"]:
+            return False
+        _hedge_stats["hedged"] += 1
+        return True
+
+def _call_with_deadline(call, prompt: str, config: dict[str, Any], max_new_tokens: int) -> tuple[str, dict[str, int]]:
+    """
+    Runs a request with an overall deadline (config['timeout']) and optional hedging (config['hedge']).
+    The deadline and the hedging delay start when the request starts running, not when it is queued.
+    The first successful answer wins; a losing or late request is abandoned (the client timeout
+    ends it on the transport level), its usage is still counted once it finishes (see _add_late_usage),
+    and the caller moves on.
+
+    Raises:
+        TimeoutError: If no request finished before the deadline.
+    """
+    timeout = float(config["timeout"]) if config.get("timeout") else None
+    with _hedge_lock:
+        _hedge_stats["requests"] += 1
+
+    executor = _get_executor(config)
+    started = threading.Event()
+    futures = [executor.submit(_timed_call, call, prompt, config, max_new_tokens, started=started)]
+    started.wait()
+    deadline = time.perf_counter() + timeout if timeout else None
+    hedged = False
+    delay = hedge_delay(config) if config.get("hedge") else None
+    if delay is not None:
+        if deadline is not None:
+            delay = min(delay, max(deadline - time.perf_counter(), 0))
+        done, _ = wait(futures, timeout=delay)
+        if not done and _may_hedge(config):
+            hedged = True
+            futures.append(executor.submit(_timed_call, call, prompt, config, max_new_tokens))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                _abandon(pending)
+                response, latency = future.result()
+                call_info = config.get("call_info")
+                if call_info is not None:
+                    call_info["latency_s"] = latency
+                    call_info["hedged_requests"] = int(hedged)
+                    call_info["hedge_wins"] = int(hedged and future is futures[-1])
+                return response
+            error = future.exception()
+
+    _abandon(pending)
+    if error is not None and not pending:
+        raise error
+    raise TimeoutError(f"No response within {timeout} s")
+
 def run_api_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
     """
     Executes a prompt using a remote LLM API backend.
@@ -24,6 +209,16 @@ def run_api_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
             - 'api_key': optional, else taken from .env
             - 'url': optional custom endpoint
             - 'max_new_tokens': optional limit for newly generated tokens (default: 256)
+            - 'answer_only': optional, the output needs only the answer letter (answer-only prompt)
+            - 'timeout': optional per-request deadline in seconds
+            - 'hedge': optional, send a duplicate request when the first one exceeds the p95 latency
+            - 'hedge_budget': optional share of requests that may be duplicated (default: 0.05)
+            - 'hedge_delay_s': optional fixed hedging delay instead of the observed p95
+            - 'concurrency': optional number of questions asked at once (sizes the request threads)
+            - 'temperature', 'top_p': optional sampling settings (self-consistency)
+            - 'call_info': optional dict filled with 'prompt_tokens' and 'completion_tokens' (as reported
+              by the API, plus abandoned hedged or late requests that finished since), the unparsed completion
+              'raw_output' and, with a deadline or hedging, 'latency_s', 'hedged_requests' and 'hedge_wins'
 
     Returns:
         tuple[str, str]: Parsed (answer, explanation)
@@ -36,41 +231,23 @@ def run_api_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
         max_new_tokens = 256
 
     if api_type == "openAI":
-
-        try:
-            api_key = config.get("api_key") or os.getenv("OPENAI_API_KEY")
-            client = OpenAI(api_key = api_key, base_url = config.get("url"))
-
-            response = client.chat.completions.create(
-                model = model_id,
-                messages = [{"role": "user", "content": prompt}],
-                max_tokens=max_new_tokens
-            )
-            raw_output = response.choices[0].message.content.strip()
-
-        except Exception as e:
-            print(f"OpenAI error: {e}")
-            return "Generation error", "Exception during generation."
-        
-        return parse_output(raw_output)
-    
+        call, provider = _call_openai, "OpenAI"
     elif api_type == "google":
-        
-        try:
-            api_key = config.get("api_key") or os.getenv("GOOGLE_API_KEY")
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name=config["model_id"])
-            response = model.generate_content(
-                prompt,
-                generation_config={"max_output_tokens": int(max_new_tokens)},
-            )
-            raw_output = response.text.strip()
-        
-        except Exception as e:
-            print(f"Google Generative AI error: {e}")
-            return "Generation error", "Exception during generation."
-        
-        return parse_output(raw_output)
-    
+        call, provider = _call_google, "Google Generative AI"
     else:
-        raise NotImplementedError(f"Unsupported API backend: {api_type}")
\ No newline at end of file
+        raise NotImplementedError(f"Unsupported API backend: {api_type}")
+
+    try:
+        if config.get("timeout") or config.get("hedge"):
+            raw_output, usage = _call_with_deadline(call, prompt, config, max_new_tokens)
+        else:
+            raw_output, usage = call(prompt, config, max_new_tokens)
+    except Exception as e:
+        print(f"{provider} error ({model_id}): {e}")
+        _add_late_usage(config.get("call_info"))
+        return "Generation error", "Exception during generation."
+
+    if config.get("call_info") is not None:
+        config["call_info"].update(usage, raw_output=raw_output)
+    _add_late_usage(config.get("call_info"))
+    return parse_output(raw_output, require_explanation=not config.get("answer_only"))
@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, Optional
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT_S = 0.01
+
+# One scheduler per loaded model (keyed like the local model cache)
+_schedulers: dict[str, "MicroBatchScheduler"] = {}
+_schedulers_lock = threading.Lock()
+
+class MicroBatchScheduler:
+    """
+    Dynamic micro-batching in front of a loaded local pipeline. Callers from any thread submit
+    prompts to a queue; a single worker thread gathers them into micro-batches of at most
+    max_batch_size requests, waiting at most max_wait_s after the first one, runs each batch as
+    one padded generate call and hands every caller its own output. Only requests with the
+    same generation settings (max_new_tokens, constrained, answer_only) share a batch.
+    """
+
+    def __init__(self, pipe, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_s: float = DEFAULT_MAX_WAIT_S,
+                 lock: Optional[threading.Lock] = None):
+        from modules.local_backend import _enable_batching
+        _enable_batching(pipe)
+        self.pipe = pipe
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait_s = float(max_wait_s)
+        self.lock = lock
+        self.batches = 0
+        self.requests = 0
+        self._queue: queue.Queue = queue.Queue()
+        # requests taken from the queue whose settings differ from the batch being gathered
+        self._held: deque = deque()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="micro-batcher")
+        self._thread.start()
+
+    @staticmethod
+    def batch_key(max_new_tokens: int, config: dict[str, Any]) -> tuple:
+        """Returns the generation settings that requests of one batch must share."""
+        return int(max_new_tokens), bool(config.get("constrained")), bool(config.get("answer_only"))
+
+    def submit(self, prompt: str, max_new_tokens: int, config: Optional[dict[str, Any]] = None) -> Future:
+        """
+        Queues a prompt for greedy generation.
+
+        Returns:
+            Future: Resolves to (generated text, batch info with 'batch_size' and 'generation_time_s' -
+                the caller's share of the batch time).
+        """
+        config = config or {}
+        future = Future()
+        self._queue.put((self.batch_key(max_new_tokens, config), prompt, config, future))
+        return future
+
+    def generate(self, prompt: str, max_new_tokens: int, config: Optional[dict[str, Any]] = None) -> tuple[str, dict[str, Any]]:
+        """Submits a prompt and waits for its output (see submit)."""
+        return self.submit(prompt, max_new_tokens, config).result()
+
+    def close(self) -> None:
+        """Stops the worker thread after the queued requests are answered."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _gather(self) -> Optional[list]:
+        """Collects the next micro-batch (None once the scheduler is closed and drained)."""
+        first = self._held.popleft() if self._held else self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        for item in list(self._held):
+            if len(batch) < self.max_batch_size and item is not None and item[0] == first[0]:
+                self._held.remove(item)
+                batch.append(item)
+
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # answer this batch and the held requests before stopping
+                self._held.append(None)
+                break
+            if item[0] == first[0]:
+                batch.append(item)
+            else:
+                self._held.append(item)
+        return batch
+
+    def _run_batch(self, batch: list) -> None:
+        """Runs one padded generate call for the batch and resolves the callers' futures."""
+        from modules.local_backend import _constrained_generation_kwargs
+
+        max_new_tokens = batch[0][0][0]
+        try:
+            start = time.perf_counter()
+            with self.lock or nullcontext():
+                responses = self.pipe(
+                    [prompt for _, prompt, _, _ in batch],
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    batch_size=len(batch),
+                    truncation=True,
+                    **_constrained_generation_kwargs(self.pipe, batch[0][2])
+                )
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.requests += len(batch)
+        info = {"batch_size": len(batch), "generation_time_s": elapsed / len(batch)}
+        for (_, _, _, future), response in zip(batch, responses):
+            future.set_result((response[0]["generated_text"].strip(), dict(info)))
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._gather()
+            if batch is None:
+                return
+            self._run_batch(batch)
+
+def get_scheduler(pipe, key: str, max_batch_size: Optional[int] = None, max_wait_s: Optional[float] = None,
+                  lock: Optional[threading.Lock] = None) -> MicroBatchScheduler:
+    """
+    Returns the scheduler of a loaded model, creating it on first use.
+
+    Args:
+        pipe: Loaded text-generation pipeline.
+        key (str): Model cache key (see local_backend._cache_key).
+        max_batch_size (int): Largest micro-batch (default: DEFAULT_MAX_BATCH_SIZE).
+        max_wait_s (float): Longest wait for more requests after the first one (default: DEFAULT_MAX_WAIT_S).
+        lock (threading.Lock): Optional lock held during generate calls (shared with non-batched callers).
+
+    Returns:
+        MicroBatchScheduler: Scheduler of the model (settings of the first call are kept).
+    """
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = MicroBatchScheduler(pipe, max_batch_size or DEFAULT_MAX_BATCH_SIZE,
+                                                   DEFAULT_MAX_WAIT_S if max_wait_s is None else max_wait_s, lock)
+        return _schedulers[key]
+
+def close_schedulers() -> None:
+    """Stops all schedulers (e.g. when models are unloaded)."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+        _schedulers.clear()
+    for scheduler in schedulers:
+        scheduler.close()
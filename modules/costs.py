@@ -0,0 +1,79 @@
+import json
+from typing import Any, Optional
+
+# Prices in USD per 1M tokens (input = prompt, output = completion). Provider price lists change;
+# override or extend them with a JSON file of the same shape (--prices).
+PRICES = {
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
+    "gpt-4": {"input": 30.00, "output": 60.00},
+    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+    "gemini-1.5-pro": {"input": 1.25, "output": 5.00},
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+    "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
+}
+
+def load_prices(path: Optional[str] = None) -> dict[str, dict[str, float]]:
+    """
+    Returns the price table: the built-in PRICES updated with entries from a JSON file
+    ({"<model_id>": {"input": <USD per 1M tokens>, "output": <USD per 1M tokens>}}).
+    """
+    prices = dict(PRICES)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            prices.update(json.load(f))
+    return prices
+
+def model_price(model_id: str, prices: dict[str, dict[str, float]]) -> Optional[dict[str, float]]:
+    """
+    Looks up the price of a model: an exact match or the longest model id prefix
+    (e.g. 'gpt-4o-2024-08-06' uses 'gpt-4o'). Returns None for models without a price.
+    """
+    if model_id in prices:
+        return prices[model_id]
+    matches = [key for key in prices if model_id.startswith(key)]
+    return prices[max(matches, key=len)] if matches else None
+
+def usage_summary(totals: dict[str, float], model_id: str, prices: dict[str, dict[str, float]],
+                  previous: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """
+    Sums the tokens of a run and prices them.
+
+    Args:
+        totals (dict): Run totals with 'prompt_tokens' and 'completion_tokens'.
+        model_id (str): Model identifier.
+        prices (dict): Price table (see load_prices).
+        previous (dict): Usage of earlier sessions of a resumed run (as returned by this function).
+
+    Returns:
+        dict: 'prompt_tokens', 'completion_tokens', 'total_tokens' and 'cost_usd'
+            (None if the model has no price).
+    """
+    previous = previous or {}
+    prompt_tokens = int(totals.get("prompt_tokens", 0)) + int(previous.get("prompt_tokens", 0))
+    completion_tokens = int(totals.get("completion_tokens", 0)) + int(previous.get("completion_tokens", 0))
+    price = model_price(model_id, prices)
+    cost = None
+    if price is not None:
+        cost = round((prompt_tokens * price["input"] + completion_tokens * price["output"]) / 1_000_000, 6)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "cost_usd": cost,
+    }
+
+def budget_reason(usage: dict[str, Any], max_cost: Optional[float] = None,
+                  max_tokens_total: Optional[int] = None) -> Optional[str]:
+    """
+    Checks the run budget.
+
+    Returns:
+        str | None: 'max_cost' or 'max_tokens_total' once the limit is reached, else None.
+    """
+    if max_cost is not None and usage["cost_usd"] is not None and usage["cost_usd"] >= max_cost:
+        return "max_cost"
+    if max_tokens_total is not None and usage["total_tokens"] >= max_tokens_total:
+        return "max_tokens_total"
+    return None
@@ -1,5 +1,8 @@
-import pandas as pd
 import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
 
 REQUIRED_COLUMNS = ['Pytanie', 'A', 'B', 'C', 'D', 'Pozycja']
 
@@ -37,4 +40,150 @@ def load_dataset(filepath: str) -> pd.DataFrame:
     # drop empty rows
     df.dropna(subset=REQUIRED_COLUMNS, inplace=True)
 
-    return df
\ No newline at end of file
+    return df
+
+# Near-duplicate detection: MinHash signatures of character n-grams, grouped with LSH banding,
+# so only questions sharing a band are compared (no all-pairs comparison)
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_NGRAM = 5
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+def normalize_text(text) -> str:
+    """
+    Normalises a cell for comparison: Unicode NFKC, lower case, punctuation removed and
+    whitespace (including stray tabs and line breaks) collapsed to single spaces.
+    """
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ""
+    return _NON_WORD_RE.sub(" ", unicodedata.normalize("NFKC", str(text)).lower()).strip()
+
+def question_fingerprints(df: pd.DataFrame) -> list[str]:
+    """
+    Texts compared between questions: the normalised question and its options in sorted order
+    (the same question with shuffled options is a duplicate).
+    """
+    columns = [[normalize_text(value) for value in df[column].tolist()] for column in ("Pytanie", "A", "B", "C", "D")]
+    return [" | ".join([question, *sorted(options)]) for question, *options in zip(*columns)]
+
+def minhash_signatures(texts: list[str], num_perm: int = DEFAULT_NUM_PERM, ngram: int = DEFAULT_NGRAM,
+                       seed: int = 0):
+    """
+    Computes MinHash signatures of the character n-gram sets of texts.
+
+    Returns:
+        np.ndarray: (len(texts), num_perm) uint32 signatures; the share of equal positions of two
+            rows estimates the Jaccard similarity of their n-gram sets.
+    """
+    rng = np.random.default_rng(seed)
+    # multiply-shift hashing: odd 64-bit multipliers, the top 32 bits are the hash
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for i, text in enumerate(texts):
+            codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+            if len(codes) < ngram:
+                codes = np.concatenate([codes, np.zeros(ngram - len(codes), dtype=np.uint64)])
+            # polynomial hash of every n-gram (wrapping 64-bit arithmetic)
+            shingles = np.zeros(len(codes) - ngram + 1, dtype=np.uint64)
+            for j in range(ngram):
+                shingles = shingles * np.uint64(1_000_003) + codes[j:len(codes) - ngram + 1 + j]
+            shingles = np.unique(shingles)
+            signatures[i] = ((a[:, None] * shingles[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1)
+    return signatures
+
+def _lsh_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """
+    Chooses (bands, rows per band) so that the LSH candidate threshold (1/bands)^(1/rows) lies
+    just below the similarity threshold (pairs near the threshold are still compared).
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    below = [(bands, rows) for bands, rows in options if (1 / bands) ** (1 / rows) <= threshold - 0.05]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1])) if below else (num_perm, 1)
+
+def find_near_duplicates(df: pd.DataFrame, threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                         num_perm: int = DEFAULT_NUM_PERM, ngram: int = DEFAULT_NGRAM, seed: int = 0) -> list[list]:
+    """
+    Finds clusters of near-duplicate questions. Questions are compared by the estimated Jaccard
+    similarity of the character n-grams of their fingerprints (see question_fingerprints); only
+    questions that share an LSH band are compared, each against the first question of the band
+    bucket, so the cost grows linearly with the number of questions.
+
+    Args:
+        df (pd.DataFrame): Loaded dataset.
+        threshold (float): Minimal estimated similarity of duplicates (0-1).
+        num_perm (int): MinHash signature length.
+        ngram (int): Character n-gram length.
+        seed (int): Seed of the hash functions.
+
+    Returns:
+        list[list]: Clusters (index labels in dataset order) with at least two questions, in dataset order.
+    """
+    if len(df) < 2:
+        return []
+    signatures = minhash_signatures(question_fingerprints(df), num_perm, ngram, seed)
+    bands, rows = _lsh_bands(num_perm, threshold)
+
+    parent = list(range(len(df)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, first, bucket = np.unique(keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel(),
+                                     return_index=True, return_inverse=True)
+        anchors = first[bucket.ravel()]
+        members = np.flatnonzero(anchors != np.arange(len(df)))
+        if not len(members):
+            continue
+        similarity = (signatures[members] == signatures[anchors[members]]).mean(axis=1)
+        for member, anchor in zip(members[similarity >= threshold], anchors[members][similarity >= threshold]):
+            root_member, root_anchor = find(int(member)), find(int(anchor))
+            if root_member != root_anchor:
+                parent[max(root_member, root_anchor)] = min(root_member, root_anchor)
+
+    clusters = {}
+    for position in range(len(df)):
+        clusters.setdefault(find(position), []).append(df.index[position])
+    return [cluster for _, cluster in sorted(clusters.items()) if len(cluster) > 1]
+
+def duplicate_report(df: pd.DataFrame, clusters: list[list]) -> dict:
+    """
+    Describes duplicate clusters: the questions of every cluster and whether their correct
+    answers differ (a cluster with different correct option texts needs a manual check).
+
+    Returns:
+        dict: 'questions', 'clusters', 'duplicates' (questions removed by collapse_duplicates),
+            'conflicting' (clusters with different correct answers) and 'details'.
+    """
+    def correct_text(label):
+        row = df.loc[label]
+        letter = str(row["Pozycja"]).strip().upper()
+        return normalize_text(row[letter]) if letter in ("A", "B", "C", "D") else letter
+
+    details = []
+    for cluster in clusters:
+        details.append({
+            "index": [int(label) if isinstance(label, (int, np.integer)) else str(label) for label in cluster],
+            "pytania": [str(df.loc[label, "Pytanie"]) for label in cluster],
+            "conflicting_answers": len({correct_text(label) for label in cluster}) > 1,
+        })
+    return {
+        "questions": len(df),
+        "clusters": len(clusters),
+        "duplicates": sum(len(cluster) - 1 for cluster in clusters),
+        "conflicting": sum(detail["conflicting_answers"] for detail in details),
+        "details": details,
+    }
+
+def collapse_duplicates(df: pd.DataFrame, clusters: list[list]) -> pd.DataFrame:
+    """
+    Keeps only the first question of every duplicate cluster (index labels are preserved).
+    """
+    drop = {label for cluster in clusters for label in cluster[1:]}
+    return df[~df.index.isin(drop)]
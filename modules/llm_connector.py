@@ -1,6 +1,34 @@
 from typing import Any
-from modules.local_backend import run_local_model
-from modules.api_backend import run_api_model
+from modules.server_backend import run_server_model, sample_server_model
+from modules.utils import aggregate_samples
+
+# Backends are imported on first use: torch, transformers and the API SDKs take seconds to import,
+# which would dominate start-up of runs that talk to the local inference server.
+
+def run_local_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
+    """Runs the prompt with modules.local_backend (imported lazily)."""
+    from modules.local_backend import run_local_model as _run_local_model
+    return _run_local_model(prompt, config)
+
+def run_onnx_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
+    """Runs the prompt with modules.onnx_backend (imported lazily)."""
+    from modules.onnx_backend import run_onnx_model as _run_onnx_model
+    return _run_onnx_model(prompt, config)
+
+def run_local_model_samples(prompts: list[str], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """Samples answers with modules.local_backend (imported lazily)."""
+    from modules.local_backend import run_local_model_samples as _run_local_model_samples
+    return _run_local_model_samples(prompts, config)
+
+def run_local_model_batch(prompts: list[str], config: dict[str, Any]) -> list[tuple[str, str]]:
+    """Runs a batch of prompts with modules.local_backend (imported lazily)."""
+    from modules.local_backend import run_local_model_batch as _run_local_model_batch
+    return _run_local_model_batch(prompts, config)
+
+def run_api_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
+    """Runs the prompt with modules.api_backend (imported lazily)."""
+    from modules.api_backend import run_api_model as _run_api_model
+    return _run_api_model(prompt, config)
 
 def ask_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
     """
@@ -9,7 +37,7 @@ def ask_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
     Args:
         prompt (str): The full prompt to send to the model.
         config (dict): Configuration dictionary with at least:
-            - 'api': 'local', 'openAI' or 'google'
+            - 'api': 'local', 'local_server', 'onnx', 'openAI' or 'google'
             - 'model_id': model name or HF ID
             - additional backend specific options
 
@@ -21,7 +49,86 @@ def ask_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
 
     if api_type == 'local':
         return run_local_model(prompt, config)
+    elif api_type == 'local_server':
+        return run_server_model(prompt, config)
+    elif api_type == 'onnx':
+        return run_onnx_model(prompt, config)
     elif api_type in ["openAI", "google"]:
         return run_api_model(prompt, config)
     else:
-        raise NotImplementedError(f"Unsupported API backend: {api_type}") 
\ No newline at end of file
+        raise NotImplementedError(f"Unsupported API backend: {api_type}")
+
+def _add_numeric(call_info: dict[str, Any], request_info: dict[str, Any]) -> None:
+    """Adds the numeric statistics of one request to the call_info of a multi-request call."""
+    for key, value in request_info.items():
+        if isinstance(value, (int, float)):
+            call_info[key] = call_info.get(key, 0) + value
+
+def ask_model_batch(prompts: list[str], config: dict[str, Any]) -> list[tuple[str, str]]:
+    """
+    Answers several prompts at once. Local models process them as one padded batch;
+    other backends answer them one after another. The unparsed outputs are reported in
+    config['call_info']['raw_outputs'] (None for prompts whose backend did not report one).
+
+    Args:
+        prompts (list[str]): Prompts to send to the model.
+        config (dict): Configuration dictionary (see ask_model).
+
+    Returns:
+        list[tuple[str, str]]: (answer, explanation) per prompt.
+    """
+    if config['api'] == 'local':
+        return run_local_model_batch(prompts, config)
+
+    call_info = config.get("call_info")
+    outcomes, raw_outputs = [], []
+    for prompt in prompts:
+        prompt_info = {}
+        outcomes.append(ask_model(prompt, {**config, "call_info": prompt_info}))
+        raw_outputs.append(prompt_info.get("raw_output"))
+        if call_info is not None:
+            _add_numeric(call_info, prompt_info)
+    if call_info is not None:
+        call_info["raw_outputs"] = raw_outputs
+    return outcomes
+
+def ask_model_samples(prompts: list[str], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Self-consistency: draws config['num_samples'] answers for every prompt and aggregates them
+    by majority vote. Local models (in-process or on the local server) sample all answers in batched
+    generate calls; API backends repeat the request with config['temperature'] and config['top_p']
+    (k-fold cost). ONNX generation is greedy, so its samples would all be the same answer.
+
+    Args:
+        prompts (list[str]): Prompts to send to the model.
+        config (dict): Configuration dictionary (see ask_model) with 'num_samples'.
+
+    Returns:
+        list[dict]: One entry per prompt with 'answer', 'explanation', 'samples', 'agreement'
+            and 'raw_outputs' (unparsed sample outputs, None where the backend reported none).
+
+    Raises:
+        NotImplementedError: If the backend cannot sample (onnx) or is unknown.
+    """
+    api_type = config['api']
+    if api_type == 'local':
+        return run_local_model_samples(prompts, config)
+    elif api_type == 'local_server':
+        return sample_server_model(prompts, config)
+    elif api_type not in ["openAI", "google"]:
+        raise NotImplementedError(f"Self-consistency sampling is not supported by the {api_type} backend")
+
+    num_samples = int(config.get("num_samples", 5) or 5)
+    call_info = config.get("call_info")
+    outcomes = []
+    for prompt in prompts:
+        answers, raw_outputs = [], []
+        for _ in range(num_samples):
+            sample_info = {}
+            answers.append(run_api_model(prompt, {**config, "call_info": sample_info}))
+            raw_outputs.append(sample_info.get("raw_output"))
+            if call_info is not None:
+                # token usage of every request counts towards the run
+                _add_numeric(call_info, sample_info)
+        outcomes.append({**aggregate_samples(answers), "raw_outputs": raw_outputs})
+    return outcomes
@@ -1,49 +1,398 @@
+import logging
+import os
+import time
+import numpy as np
 import torch
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-from typing import Any
-from modules.utils import parse_output
+from typing import Any, Optional
+from modules.utils import parse_output, aggregate_samples
+from modules.profiling import track_peak_rss
+
+logger = logging.getLogger(__name__)
 
 # Internal cache to avoid reloading models
 _local_model_cache: dict[str, Any] = {}
 
-def load_local_model(model_id: str, use_q4: bool = False):
+# Load statistics per cache key (load time, resident memory after loading)
+_local_model_stats: dict[str, dict[str, Any]] = {}
+
+# Supported quantization modes:
+# - "q4": 4-bit bitsandbytes quantization (requires CUDA)
+# - "int8_dynamic": int8 dynamic quantization of linear layers (CPU)
+# - "int4_weight_only": weight-only int4 quantization via optimum-quanto (CPU)
+QUANTIZATION_MODES = ("q4", "int8_dynamic", "int4_weight_only")
+
+def _cache_key(model_id: str, quantization: Optional[str] = None) -> str:
     """
-    Loads and returns a text generation pipeline for a local model.
-    Models are cached in memory to avoid repeated loading.
+    Builds the model cache key. Non-default quantization modes get their own entry,
+    so the same model can be kept in memory in different precisions.
+    """
+    return model_id if not quantization else f"{model_id}@{quantization}"
 
-    Args:
-        model_id (str): Hugging Face model ID.
-        use_q4 (bool): Whether to use 4-bit quantization (requires bitsandbytes).
+def _resolve_quantization(config: dict[str, Any]) -> Optional[str]:
+    """
+    Reads the quantization mode from config. The legacy 'use_q4' flag maps to "q4".
+    """
+    quantization = config.get("quantization")
+    if not quantization and config.get("use_q4", False):
+        quantization = "q4"
+    return quantization or None
 
-    Returns:
-        transformers.Pipeline: Text generation pipeline.
+def parse_max_memory(spec: Optional[str]) -> Optional[dict]:
+    """
+    Parses a memory budget specification "cpu=12GiB,0=20GiB" into an accelerate max_memory
+    mapping (GPU indices become ints).
+
+    Raises:
+        ValueError: If an entry is not in the device=size form.
+    """
+    if not spec:
+        return None
+    budget = {}
+    for item in spec.split(","):
+        device, sep, size = item.partition("=")
+        if not sep or not device.strip() or not size.strip():
+            raise ValueError(f"Invalid memory budget entry: {item!r} (expected e.g. cpu=12GiB)")
+        device = device.strip()
+        budget[int(device) if device.isdigit() else device] = size.strip()
+    return budget
+
+def _memory_kwargs(config: dict[str, Any]) -> dict[str, Any]:
+    """Reads the memory budget options ('max_memory', 'offload_folder') from config."""
+    return {key: config[key] for key in ("max_memory", "offload_folder") if config.get(key)}
+
+def _offload_dir(model_id: str) -> str:
+    """Default folder for weights offloaded to disk (models/offload/<model>)."""
+    return os.path.join("models", "offload", model_id.strip("/").replace("/", "--"))
+
+def _load_model(model_id: str, quantization: Optional[str], fast_load: bool,
+                max_memory: Optional[dict] = None, offload_folder: Optional[str] = None):
     """
-    if model_id in _local_model_cache:
-        return _local_model_cache[model_id]
-    
-    if use_q4:
+    Loads model weights in the requested quantization mode.
+    With fast_load, weights are read from memory-mapped safetensors into a meta-device
+    initialised model (low_cpu_mem_usage), so a full random-initialised copy is never allocated.
+    With max_memory, accelerate places layers on the devices within their budgets and offloads
+    the rest to offload_folder; offloaded layers are loaded only for their forward pass.
+
+    Raises:
+        ValueError: If a memory budget is combined with a CPU quantization mode.
+        ImportError: If int4_weight_only is requested without optimum-quanto installed.
+    """
+    fast_kwargs = {"low_cpu_mem_usage": True, "use_safetensors": True} if fast_load else {}
+    memory_kwargs = {}
+    if max_memory:
+        if quantization in ("int8_dynamic", "int4_weight_only"):
+            raise ValueError(f"Memory budgets (max_memory) are not supported with {quantization} quantization")
+        memory_kwargs = {"max_memory": max_memory, "offload_folder": offload_folder or _offload_dir(model_id)}
+
+    if quantization == "q4":
         from transformers import BitsAndBytesConfig
         quant_config = BitsAndBytesConfig(load_in_4bit=True)
-        model = AutoModelForCausalLM.from_pretrained(
+        return AutoModelForCausalLM.from_pretrained(
             model_id,
             device_map="auto",
             trust_remote_code=True,
-            quantization_config=quant_config
+            quantization_config=quant_config,
+            **fast_kwargs,
+            **memory_kwargs
         )
-    else:
+    elif quantization == "int8_dynamic":
+        # dynamic quantization works on float32 CPU weights
         model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            trust_remote_code=True,
+            torch_dtype=torch.float32,
+            **fast_kwargs
+        )
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif quantization == "int4_weight_only":
+        try:
+            from optimum.quanto import freeze, qint4, quantize
+        except ImportError as e:
+            raise ImportError("int4_weight_only quantization requires the optimum-quanto package "
+                              "(pip install optimum-quanto)") from e
+        model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            trust_remote_code=True,
+            torch_dtype=torch.bfloat16,
+            **fast_kwargs
+        )
+        quantize(model, weights=qint4)
+        freeze(model)
+        return model
+    else:
+        return AutoModelForCausalLM.from_pretrained(
             model_id,
             device_map="auto",
             trust_remote_code=True,
-            torch_dtype=torch.bfloat16
+            torch_dtype=torch.bfloat16,
+            **fast_kwargs,
+            **memory_kwargs
         )
 
-    tokenizer = AutoTokenizer.from_pretrained(model_id)
-    pipe = pipeline("text-generation", model=model, tokenizer=tokenizer, return_full_text=False)
+def _timed(fn, *args, **kwargs):
+    """Calls fn and returns (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 3)
 
-    _local_model_cache[model_id] = pipe
+def _build_pipeline(model, tokenizer):
+    """
+    Wraps a loaded model in a text-generation pipeline. The pipeline takes its device from the
+    first entry of an accelerate device map; when the input layers are offloaded to disk, they
+    execute on the CPU, so the pipeline is pointed there while it is created.
+    """
+    device_map = getattr(model, "hf_device_map", None)
+    if not isinstance(device_map, dict) or next(iter(device_map.values()), None) != "disk":
+        return pipeline("text-generation", model=model, tokenizer=tokenizer, return_full_text=False)
+    model.hf_device_map = {"": "cpu"}
+    try:
+        return pipeline("text-generation", model=model, tokenizer=tokenizer, return_full_text=False)
+    finally:
+        model.hf_device_map = device_map
+
+def load_local_model(model_id: str, use_q4: bool = False, quantization: Optional[str] = None,
+                     fast_load: bool = False, max_memory: Optional[dict] = None, offload_folder: Optional[str] = None):
+    """
+    Loads and returns a text generation pipeline for a local model.
+    Models are cached in memory to avoid repeated loading.
+
+    Args:
+        model_id (str): Hugging Face model ID.
+        use_q4 (bool): Whether to use 4-bit quantization (requires bitsandbytes).
+        quantization (str): Optional quantization mode, one of QUANTIZATION_MODES.
+            Takes precedence over 'use_q4'. Default: bf16 weights, no quantization.
+        fast_load (bool): Load memory-mapped safetensors with low_cpu_mem_usage and load
+            the tokenizer in parallel with the model (requires safetensors weights).
+        max_memory (dict): Optional memory budget per device, e.g. {"cpu": "12GiB"} (see parse_max_memory);
+            layers that do not fit are offloaded to disk.
+        offload_folder (str): Folder for offloaded weights (default: models/offload/<model>).
+
+    Returns:
+        transformers.Pipeline: Text generation pipeline.
+
+    Raises:
+        ValueError: If the quantization mode is not supported.
+    """
+    if use_q4 and not quantization:
+        quantization = "q4"
+    if quantization and quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unsupported quantization mode: {quantization}. Available: {QUANTIZATION_MODES}")
+
+    key = _cache_key(model_id, quantization)
+    if key in _local_model_cache:
+        return _local_model_cache[key]
+
+    start = time.perf_counter()
+    stages = {}
+
+    with track_peak_rss() as memory:
+        if fast_load:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                tokenizer_future = executor.submit(_timed, AutoTokenizer.from_pretrained, model_id)
+                model, stages["model_s"] = _timed(_load_model, model_id, quantization, fast_load,
+                                                  max_memory, offload_folder)
+                tokenizer, stages["tokenizer_s"] = tokenizer_future.result()
+        else:
+            model, stages["model_s"] = _timed(_load_model, model_id, quantization, fast_load, max_memory, offload_folder)
+            tokenizer, stages["tokenizer_s"] = _timed(AutoTokenizer.from_pretrained, model_id)
+
+        pipe, stages["pipeline_s"] = _timed(_build_pipeline, model, tokenizer)
+
+    _local_model_stats[key] = {
+        "model_id": model_id,
+        "quantization": quantization or "bf16",
+        "fast_load": fast_load,
+        "load_time_s": round(time.perf_counter() - start, 3),
+        "stages_s": stages,
+        "rss_mb": memory["end_rss_mb"],
+        "peak_rss_mb": memory["peak_rss_mb"],
+    }
+    if max_memory:
+        placement = {}
+        for device in (getattr(model, "hf_device_map", None) or {}).values():
+            placement[str(device)] = placement.get(str(device), 0) + 1
+        _local_model_stats[key].update({"max_memory": {str(k): v for k, v in max_memory.items()},
+                                        "device_map": placement})
+    print(f"[Local model] Loaded {key} in {_local_model_stats[key]['load_time_s']:.2f}s "
+          f"(RSS: {memory['end_rss_mb']:.0f} MB, peak: {memory['peak_rss_mb']:.0f} MB)")
+
+    _local_model_cache[key] = pipe
     return pipe
 
+def get_local_model_stats(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns load statistics of the local model described by config
+    (empty dict if the model has not been loaded yet).
+    """
+    key = _cache_key(config["model_id"], _resolve_quantization(config))
+    return dict(_local_model_stats.get(key, {}))
+
+def _count_tokens(pipe, text: str) -> int:
+    """
+    Counts tokens of a generated text with the pipeline tokenizer (0 if counting fails).
+    """
+    try:
+        return len(pipe.tokenizer(text, add_special_tokens=False)["input_ids"])
+    except Exception:
+        return 0
+
+@contextmanager
+def _count_forward_calls(model):
+    """
+    Counts forward passes of a model while the context is active.
+
+    Yields:
+        dict: Counter dict with a 'calls' key, updated in place.
+    """
+    counter = {"calls": 0}
+
+    def hook(*_):
+        counter["calls"] += 1
+
+    handle = model.register_forward_hook(hook)
+    try:
+        yield counter
+    finally:
+        handle.remove()
+
+@contextmanager
+def _count_draft_tokens(model):
+    """
+    Counts the candidate tokens a draft model proposes during assisted decoding (the tokens
+    returned by its generate calls) while the context is active.
+
+    Yields:
+        dict: Counter dict with a 'tokens' key, updated in place.
+    """
+    counter = {"tokens": 0}
+    generate = model.generate
+
+    def counting_generate(*args, **kwargs):
+        output = generate(*args, **kwargs)
+        scores = getattr(output, "scores", None)
+        if scores is not None:
+            counter["tokens"] += len(scores)
+        else:
+            sequences = getattr(output, "sequences", output)
+            counter["tokens"] += sequences.shape[-1] - kwargs["input_ids"].shape[-1]
+        return output
+
+    model.generate = counting_generate
+    try:
+        yield counter
+    finally:
+        model.generate = generate
+
+def _assisted_generation_kwargs(pipe, config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Builds generate() kwargs for assisted (speculative) decoding with a small draft model
+    configured through 'assistant_model_id'. The draft model is loaded through the model cache.
+    If the draft model uses a different vocabulary, both tokenizers are passed
+    (universal assisted decoding).
+    """
+    assistant_pipe = load_local_model(
+        config["assistant_model_id"],
+        quantization=config.get("assistant_quantization") or None,
+        fast_load=bool(config.get("fast_load", False)),
+    )
+    kwargs = {"assistant_model": assistant_pipe.model}
+    if pipe.tokenizer.get_vocab() != assistant_pipe.tokenizer.get_vocab():
+        kwargs["tokenizer"] = pipe.tokenizer
+        kwargs["assistant_tokenizer"] = assistant_pipe.tokenizer
+    return kwargs
+
+class AnswerFormatLogitsProcessor:
+    """
+    Logits processor for constrained decoding: forces every generated sequence to start with
+    "Answer:", a single letter token A–D and "\nExplanation:", after which generation is free
+    (end of sequence is blocked for the first free token, so the explanation is never empty).
+    With answer_only=True the letter is followed by end of sequence instead.
+    Positions are counted from the prompt length, which is the same for all rows of a padded
+    batch; a new prompt batch (the pipeline calls generate once per batch) restarts the count.
+    """
+
+    def __init__(self, tokenizer, answer_only: bool = False):
+        prefix_ids = tokenizer.encode("Answer:", add_special_tokens=False)
+        self.letter_ids = list(_answer_letter_token_ids(tokenizer).values())
+        # tokenizers that keep the space separate ("Answer:", " ", "A") get the shared tokens forced as well
+        letter_seqs = [tokenizer.encode(f"Answer: {letter}", add_special_tokens=False) for letter in ANSWER_LETTERS]
+        shared = os.path.commonprefix(letter_seqs)
+        if all(len(seq) == len(shared) + 1 for seq in letter_seqs):
+            prefix_ids, self.letter_ids = shared, [seq[-1] for seq in letter_seqs]
+        self.prefix_ids = prefix_ids
+        head = tokenizer.encode("Answer: A", add_special_tokens=False)
+        full = tokenizer.encode("Answer: A\nExplanation:", add_special_tokens=False)
+        self.explanation_ids = full[len(head):] if full[:len(head)] == head else \
+            tokenizer.encode("\nExplanation:", add_special_tokens=False)
+        self.eos_token_id = tokenizer.eos_token_id
+        if answer_only and self.eos_token_id is not None:
+            self.explanation_ids = [self.eos_token_id]
+        self.prompt_ids = None
+        self.length = 0
+
+    def allowed_tokens(self, step: int) -> Optional[list[int]]:
+        """Returns the token ids allowed at a generation step (None = any token)."""
+        if step < len(self.prefix_ids):
+            return [self.prefix_ids[step]]
+        step -= len(self.prefix_ids)
+        if step == 0:
+            return self.letter_ids
+        step -= 1
+        if step < len(self.explanation_ids):
+            return [self.explanation_ids[step]]
+        return None
+
+    def _step(self, input_ids: torch.LongTensor) -> int:
+        """Returns the generation step of input_ids, detecting the start of a new generate call."""
+        continues = (
+            self.prompt_ids is not None
+            and input_ids.shape[0] == self.prompt_ids.shape[0]
+            and input_ids.shape[1] == self.length + 1
+            and torch.equal(input_ids[:, :self.prompt_ids.shape[1]], self.prompt_ids)
+        )
+        if not continues:
+            self.prompt_ids = input_ids.clone()
+        self.length = input_ids.shape[1]
+        return self.length - self.prompt_ids.shape[1]
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        step = self._step(input_ids)
+        allowed = self.allowed_tokens(step)
+        if allowed is not None:
+            mask = torch.full_like(scores, float("-inf"))
+            mask[:, allowed] = 0
+            return scores + mask
+        if step == len(self.prefix_ids) + 1 + len(self.explanation_ids) and self.eos_token_id is not None:
+            scores[:, self.eos_token_id] = float("-inf")
+        return scores
+
+def _constrained_generation_kwargs(pipe, config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns generate() arguments for constrained decoding ('constrained' in config):
+    a fresh AnswerFormatLogitsProcessor per call.
+    """
+    if not config.get("constrained"):
+        return {}
+    from transformers import LogitsProcessorList
+    processor = AnswerFormatLogitsProcessor(pipe.tokenizer, answer_only=bool(config.get("answer_only")))
+    return {"logits_processor": LogitsProcessorList([processor])}
+
+def _generate_from_ids(pipe, input_ids, max_new_tokens: int, generate_kwargs: dict[str, Any]) -> tuple[str, int]:
+    """
+    Greedy generation from prompt ids (e.g. from a question pack), bypassing the pipeline's
+    tokenisation. Returns the decoded new tokens, like the pipeline with return_full_text=False,
+    and the number of new tokens taken from the generated ids.
+    """
+    ids = torch.as_tensor(np.asarray(input_ids, dtype=np.int64)).unsqueeze(0).to(pipe.model.device)
+    pad_token_id = pipe.tokenizer.pad_token_id if pipe.tokenizer.pad_token_id is not None else pipe.tokenizer.eos_token_id
+    with torch.no_grad():
+        output = pipe.model.generate(input_ids=ids, attention_mask=torch.ones_like(ids), max_new_tokens=max_new_tokens,
+                                     do_sample=False, pad_token_id=pad_token_id, **generate_kwargs)
+    return pipe.tokenizer.decode(output[0, ids.shape[1]:], skip_special_tokens=True), int(output.shape[1] - ids.shape[1])
+
 def run_local_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
     """
     Executes a prompt using a local Hugging Face model via pipeline.
@@ -54,28 +403,255 @@ def run_local_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
             - model_id: Hugging Face model ID
             - max_new_tokens: (optional) new tokens limit
             - use_q4: (optional) whether to use quantization
-    
+            - quantization: (optional) one of QUANTIZATION_MODES
+            - fast_load: (optional) memory-mapped, low-memory model loading
+            - max_memory: (optional) memory budget per device, layers beyond it are offloaded to disk
+            - offload_folder: (optional) folder for offloaded weights
+            - assistant_model_id: (optional) small draft model for assisted decoding
+            - assistant_quantization: (optional) quantization mode of the draft model
+            - constrained: (optional) force the "Answer: X / Explanation:" format while decoding
+            - answer_only: (optional) answer-only prompt; the output needs no explanation (with
+              'constrained', generation ends right after the letter)
+            - input_ids: (optional) pre-tokenised prompt (see question_pack); used instead of tokenising the prompt
+            - micro_batching: (optional) send the prompt through the model's micro-batching scheduler
+              (see batch_scheduler), so concurrent callers share padded generate calls; with
+              'max_batch_size', 'max_batch_wait_s' and 'generation_lock' (lock shared with other callers)
+            - call_info: (optional) dict filled with generation statistics
+              ('completion_tokens', 'generation_time_s', 'model_cache_hit', the unparsed 'raw_output',
+              'micro_batch_size' and, with a draft model, 'target_forward_calls', 'draft_forward_calls',
+              'draft_tokens' (proposed candidate tokens) and 'accepted_draft_tokens')
+
     Returns:
         tuple[str, str]: Parsed (answer, explanation)
     """
 
     model_id = config["model_id"]
     max_new_tokens = int(config.get("max_new_tokens", 256) or 256)
-    use_q4 = config.get("use_q4", False)
+    cache_hit = _cache_key(model_id, _resolve_quantization(config)) in _local_model_cache
+    pipe = load_local_model(model_id, quantization=_resolve_quantization(config),
+                            fast_load=bool(config.get("fast_load", False)), **_memory_kwargs(config))
+
+    if config.get("constrained") and config.get("assistant_model_id"):
+        raise ValueError("Constrained decoding cannot be combined with assisted decoding")
 
-    pipe = load_local_model(model_id, use_q4=use_q4)
+    generate_kwargs = {}
+    if config.get("assistant_model_id"):
+        generate_kwargs = _assisted_generation_kwargs(pipe, config)
+    constrained_kwargs = _constrained_generation_kwargs(pipe, config)
 
     try:
-        print(f"[Local model] Prompting model with:\n{prompt}")
-        response = pipe(
-            prompt, 
-            max_new_tokens=max_new_tokens, 
-            do_sample = False, 
-            truncation = True
-        )
-        raw_output = response[0]["generated_text"].strip()
+        logger.debug("[Local model] Prompting model with:\n%s", prompt)
+        with ExitStack() as stack:
+            if generate_kwargs:
+                target_calls = stack.enter_context(_count_forward_calls(pipe.model))
+                draft_calls = stack.enter_context(_count_forward_calls(generate_kwargs["assistant_model"]))
+                draft_tokens = stack.enter_context(_count_draft_tokens(generate_kwargs["assistant_model"]))
+            start = time.perf_counter()
+            batch_info = None
+            new_tokens = None
+            if config.get("input_ids") is not None or generate_kwargs:
+                # assisted decoding calls generate directly, so new tokens are counted from the output ids
+                input_ids = config.get("input_ids")
+                if input_ids is None:
+                    input_ids = pipe.tokenizer(prompt, truncation=True)["input_ids"]
+                raw_output, new_tokens = _generate_from_ids(pipe, input_ids, max_new_tokens,
+                                                            {**generate_kwargs, **constrained_kwargs})
+            elif config.get("micro_batching") and not generate_kwargs:
+                from modules.batch_scheduler import get_scheduler
+                scheduler = get_scheduler(pipe, _cache_key(model_id, _resolve_quantization(config)),
+                                          config.get("max_batch_size"), config.get("max_batch_wait_s"),
+                                          config.get("generation_lock"))
+                raw_output, batch_info = scheduler.generate(prompt, max_new_tokens, config)
+            else:
+                response = pipe(
+                    prompt,
+                    max_new_tokens=max_new_tokens,
+                    do_sample = False,
+                    truncation = True,
+                    **generate_kwargs,
+                    **constrained_kwargs
+                )
+                raw_output = response[0]["generated_text"]
+            generation_time = time.perf_counter() - start if batch_info is None else batch_info["generation_time_s"]
+        raw_output = raw_output.strip()
     except Exception as e:
         print(f"[ERROR] Local model generation failed: {e}")
         return "Generation error", "Exception during generation."
-    
-    return parse_output(raw_output)
\ No newline at end of file
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info["completion_tokens"] = new_tokens if new_tokens is not None else _count_tokens(pipe, raw_output)
+        call_info["generation_time_s"] = generation_time
+        call_info["model_cache_hit"] = int(cache_hit)
+        call_info["raw_output"] = raw_output
+        if batch_info is not None:
+            call_info["micro_batch_size"] = batch_info["batch_size"]
+        if generate_kwargs:
+            # every target forward pass verifies the draft and adds one token of its own,
+            # so the remaining new tokens are accepted draft tokens
+            call_info["target_forward_calls"] = target_calls["calls"]
+            call_info["draft_forward_calls"] = draft_calls["calls"]
+            call_info["draft_tokens"] = draft_tokens["tokens"]
+            call_info["accepted_draft_tokens"] = min(max(new_tokens - target_calls["calls"], 0), draft_tokens["tokens"])
+
+    return parse_output(raw_output, require_explanation=not config.get("answer_only"))
+
+ANSWER_LETTERS = ("A", "B", "C", "D")
+
+def _answer_letter_token_ids(tokenizer, prefix: str = "Answer:") -> dict[str, int]:
+    """
+    Finds the token id of each answer letter as it appears right after the answer prefix
+    (e.g. "Answer: C"), so that tokenizers which merge the leading space are handled.
+
+    Args:
+        tokenizer: Hugging Face tokenizer.
+        prefix (str): Text preceding the letter.
+
+    Returns:
+        dict[str, int]: Mapping letter -> token id.
+    """
+    prefix_ids = tokenizer.encode(prefix, add_special_tokens=False)
+    letter_ids = {}
+    for letter in ANSWER_LETTERS:
+        ids = tokenizer.encode(f"{prefix} {letter}", add_special_tokens=False)
+        letter_ids[letter] = ids[len(prefix_ids)] if ids[:len(prefix_ids)] == prefix_ids else ids[-1]
+    return letter_ids
+
+def score_local_model(prompt: str, config: dict[str, Any]) -> dict[str, float]:
+    """
+    Scores answer options without generation: returns the log-probability of each letter A–D
+    as the next token after the prompt followed by "Answer:".
+
+    Args:
+        prompt (str): The input prompt.
+        config (dict): Configuration dict (see run_local_model).
+
+    Returns:
+        dict[str, float]: Mapping letter -> log-probability.
+    """
+    pipe = load_local_model(config["model_id"], quantization=_resolve_quantization(config), **_memory_kwargs(config))
+    tokenizer, model = pipe.tokenizer, pipe.model
+
+    inputs = tokenizer(prompt.rstrip() + "\nAnswer:", return_tensors="pt").to(model.device)
+    with torch.no_grad():
+        logits = model(**inputs).logits[0, -1]
+    logprobs = torch.log_softmax(logits.float(), dim=-1)
+
+    return {letter: float(logprobs[token_id]) for letter, token_id in _answer_letter_token_ids(tokenizer).items()}
+
+def _enable_batching(pipe) -> None:
+    """
+    Prepares the pipeline tokenizer for padded batches of prompts
+    (decoder-only models need left padding and a pad token).
+    """
+    if pipe.tokenizer.pad_token is None:
+        pipe.tokenizer.pad_token = pipe.tokenizer.eos_token
+    pipe.tokenizer.padding_side = "left"
+
+def run_local_model_samples(prompts: list[str], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Self-consistency generation: samples 'num_samples' answers for every prompt.
+    Prompts are processed as padded batches and each prompt is expanded to
+    'num_samples' sequences inside one generate call (num_return_sequences),
+    so the cost grows much less than running the benchmark k times.
+
+    Args:
+        prompts (list[str]): Input prompts.
+        config (dict): Configuration dict (see run_local_model). Additional keys:
+            - num_samples: number of samples per prompt (default: 5)
+            - temperature: sampling temperature (default: 0.7)
+            - top_p: nucleus sampling threshold (default: 0.95)
+            - batch_size: prompts per forward batch (default: 8)
+
+    Returns:
+        list[dict]: One entry per prompt with 'answer' (majority vote), 'explanation'
+            (from the first sample agreeing with the majority), 'samples' (per-sample letters),
+            'agreement' (share of samples voting for the majority answer) and 'raw_outputs'
+            (unparsed sample outputs).
+    """
+    model_id = config["model_id"]
+    max_new_tokens = int(config.get("max_new_tokens", 256) or 256)
+    num_samples = int(config.get("num_samples", 5) or 5)
+    pipe = load_local_model(model_id, quantization=_resolve_quantization(config),
+                            fast_load=bool(config.get("fast_load", False)), **_memory_kwargs(config))
+    _enable_batching(pipe)
+
+    try:
+        start = time.perf_counter()
+        responses = pipe(
+            prompts,
+            max_new_tokens=max_new_tokens,
+            do_sample=True,
+            temperature=float(config.get("temperature", 0.7)),
+            top_p=float(config.get("top_p", 0.95)),
+            num_return_sequences=num_samples,
+            batch_size=int(config.get("batch_size", 8) or 8),
+            truncation=True,
+            **_constrained_generation_kwargs(pipe, config)
+        )
+        generation_time = time.perf_counter() - start
+    except Exception as e:
+        print(f"[ERROR] Local model sampling failed: {e}")
+        return [{"answer": "Generation error", "explanation": "Exception during generation.",
+                 "samples": [], "agreement": 0.0} for _ in prompts]
+
+    outcomes = []
+    completion_tokens = 0
+    for samples in responses:
+        texts = [sample["generated_text"].strip() for sample in samples]
+        completion_tokens += sum(_count_tokens(pipe, text) for text in texts)
+        outcome = aggregate_samples([parse_output(text, require_explanation=not config.get("answer_only"))
+                                     for text in texts])
+        outcomes.append({**outcome, "raw_outputs": texts})
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info["completion_tokens"] = completion_tokens
+        call_info["generation_time_s"] = generation_time
+
+    return outcomes
+
+def run_local_model_batch(prompts: list[str], config: dict[str, Any]) -> list[tuple[str, str]]:
+    """
+    Greedy generation for a batch of prompts in one padded pipeline call
+    (e.g. option-order variants of the same question).
+
+    Args:
+        prompts (list[str]): Input prompts.
+        config (dict): Configuration dict (see run_local_model), optionally with 'batch_size'
+            (default: all prompts in one batch). The unparsed outputs are reported in
+            call_info['raw_outputs'].
+
+    Returns:
+        list[tuple[str, str]]: Parsed (answer, explanation) per prompt.
+    """
+    model_id = config["model_id"]
+    max_new_tokens = int(config.get("max_new_tokens", 256) or 256)
+    pipe = load_local_model(model_id, quantization=_resolve_quantization(config),
+                            fast_load=bool(config.get("fast_load", False)), **_memory_kwargs(config))
+    _enable_batching(pipe)
+
+    try:
+        start = time.perf_counter()
+        responses = pipe(
+            prompts,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            batch_size=int(config.get("batch_size") or len(prompts)),
+            truncation=True,
+            **_constrained_generation_kwargs(pipe, config)
+        )
+        generation_time = time.perf_counter() - start
+    except Exception as e:
+        print(f"[ERROR] Local model batch generation failed: {e}")
+        return [("Generation error", "Exception during generation.") for _ in prompts]
+
+    texts = [response[0]["generated_text"].strip() for response in responses]
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info["completion_tokens"] = sum(_count_tokens(pipe, text) for text in texts)
+        call_info["generation_time_s"] = generation_time
+        call_info["raw_outputs"] = texts
+
+    return [parse_output(text, require_explanation=not config.get("answer_only")) for text in texts]
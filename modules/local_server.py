@@ -0,0 +1,119 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Local models share CPU threads and are not safe for concurrent generate calls
+_generation_lock = threading.Lock()
+# Micro-batching options of the server (see create_server); empty = one request per generate call
+_batching_options: dict[str, Any] = {}
+
+def handle_request(path: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Handles a single server request using the in-process local backend.
+
+    Supported paths:
+    - "/generate": {"prompt", "config"} -> {"answer", "explanation", "call_info"}
+    - "/score":    {"prompt", "config"} -> {"scores": {letter: log-probability}}
+    - "/samples":  {"prompts", "config"} -> {"results": [{"answer", "explanation", "samples", "agreement"}], "call_info"}
+
+    Args:
+        path (str): Request path.
+        payload (dict): Decoded JSON body.
+
+    Returns:
+        dict: JSON-serialisable response.
+
+    Raises:
+        NotImplementedError: If the path is not supported.
+    """
+    from modules.local_backend import run_local_model, run_local_model_samples, score_local_model
+
+    config = dict(payload["config"])
+
+    if path == "/samples":
+        call_info = {}
+        with _generation_lock:
+            results = run_local_model_samples(payload["prompts"], {**config, "call_info": call_info})
+        return {"results": results, "call_info": call_info}
+
+    prompt = payload["prompt"]
+    if path == "/generate":
+        call_info = {}
+        if _batching_options and not config.get("assistant_model_id"):
+            # concurrent requests are queued by the model's scheduler, which holds the lock per batch
+            answer, explanation = run_local_model(prompt, {**config, **_batching_options,
+                                                           "generation_lock": _generation_lock, "call_info": call_info})
+        else:
+            with _generation_lock:
+                answer, explanation = run_local_model(prompt, {**config, "call_info": call_info})
+        return {"answer": answer, "explanation": explanation, "call_info": call_info}
+    elif path == "/score":
+        with _generation_lock:
+            return {"scores": score_local_model(prompt, config)}
+    else:
+        raise NotImplementedError(f"Unsupported path: {path}")
+
+def loaded_models() -> list[str]:
+    """
+    Returns the cache keys of the models currently resident in the server.
+    """
+    from modules.local_backend import _local_model_cache
+    return sorted(_local_model_cache)
+
+class LocalModelRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler exposing the local backend: POST /generate, POST /score, POST /samples, GET /health.
+    """
+
+    def _send_json(self, status: int, body: dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "models": loaded_models()})
+        else:
+            self._send_json(404, {"error": f"Unsupported path: {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length).decode("utf-8"))
+            self._send_json(200, handle_request(self.path, payload))
+        except NotImplementedError as e:
+            self._send_json(404, {"error": str(e)})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            print(f"[Local server] Request failed: {e}")
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        # per-request access logs would flood the console during benchmark runs
+        pass
+
+def create_server(host: str = "127.0.0.1", port: int = 8765, micro_batching: bool = False,
+                  max_batch_size: int = 8, max_batch_wait_s: float = 0.01) -> ThreadingHTTPServer:
+    """
+    Creates (but does not start) the local inference HTTP server.
+
+    Args:
+        host (str): Address to bind (localhost by default).
+        port (int): Port to bind.
+        micro_batching (bool): Gather concurrent /generate requests into padded micro-batches.
+        max_batch_size (int): Largest micro-batch.
+        max_batch_wait_s (float): Longest wait for more requests after the first one of a batch.
+
+    Returns:
+        ThreadingHTTPServer: Server instance; call serve_forever() to run it.
+    """
+    _batching_options.clear()
+    if micro_batching:
+        _batching_options.update({"micro_batching": True, "max_batch_size": max_batch_size,
+                                  "max_batch_wait_s": max_batch_wait_s})
+    return ThreadingHTTPServer((host, port), LocalModelRequestHandler)
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+from typing import Any, Optional
+import pandas as pd
+from modules.scorer import evaluate_answer, count_evaluation_labels
+from modules.response_saver import load_results_frame, run_summary_path
+
+LABELS = ['prawidłowa', 'nieprawidłowa', 'brak odpowiedzi', 'odpowiedź niezgodna z oczekiwaniami']
+MANIFEST_VERSION = 1
+
+def model_name_for(path: str) -> str:
+    """
+    Returns the model name for a raw results file: 'llm_name' from the run summary
+    written by the runner if available, otherwise the file name without the '_raw' suffix.
+    """
+    summary_path = run_summary_path(path)
+    if os.path.exists(summary_path):
+        with open(summary_path, encoding='utf-8') as f:
+            name = json.load(f).get("llm_name")
+        if name:
+            return name
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem[:-len("_raw")] if stem.endswith("_raw") else stem
+
+def summary_path_for(path: str) -> str:
+    """
+    Returns the path of the per-model summary (e.g. results/bielik7b_raw.json -> results/bielik7b_summary.json).
+    """
+    root = os.path.splitext(path)[0]
+    return (root[:-len("_raw")] if root.endswith("_raw") else root) + "_summary.json"
+
+def score_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds an evaluation label column to a results frame. Labels are computed once per
+    distinct (answer, correct answer) pair and mapped back, so scoring scales with
+    the number of distinct pairs rather than the number of rows.
+
+    Args:
+        frame (pd.DataFrame): Results frame (see response_saver.load_results_frame).
+
+    Returns:
+        pd.DataFrame: The same frame with a categorical 'label' column.
+    """
+    answers = frame["odpowiedź"].astype(str)
+    correct = frame["poprawna"].astype(str)
+    pairs = pd.MultiIndex.from_arrays([answers, correct])
+    labels = {pair: evaluate_answer(*pair) for pair in pairs.unique()}
+    frame["label"] = pd.Categorical([labels[pair] for pair in pairs], categories=LABELS)
+    return frame
+
+def _counts_by(frame: pd.DataFrame, column: str) -> dict[str, list[int]]:
+    """[correct, questions] per value of a column."""
+    grouped = (frame["label"] == 'prawidłowa').groupby(frame[column].astype(str), observed=True)
+    return {key: [int(hits), int(n)] for key, hits, n in zip(grouped.sum().index, grouped.sum(), grouped.size())}
+
+def frame_aggregates(frame: pd.DataFrame) -> dict[str, Any]:
+    """
+    Computes additive per-file counts of a scored results frame: label counts and
+    [correct, questions] per domain and category. Counts of several files can be combined
+    with summary_from_aggregates without re-reading the files.
+
+    Args:
+        frame (pd.DataFrame): Scored results frame (see score_frame).
+
+    Returns:
+        dict: JSON-serialisable counts.
+    """
+    return {
+        "podsumowanie": count_evaluation_labels([{"label": label} for label in frame["label"]]),
+        "domeny": _counts_by(frame, "domena"),
+        "kategorie": _counts_by(frame, "kategoria"),
+    }
+
+def _accuracy_from_counts(parts: list[dict[str, list[int]]]) -> dict[str, Any]:
+    """Sums [correct, questions] counts and turns them into accuracy per key."""
+    totals = {}
+    for part in parts:
+        for key, (hits, n) in part.items():
+            total = totals.setdefault(key, [0, 0])
+            total[0] += hits
+            total[1] += n
+    return {key: {"accuracy": round(hits / n, 4), "questions": n} for key, (hits, n) in sorted(totals.items())}
+
+def summary_from_aggregates(aggregates: list[dict[str, Any]], model_name: str) -> dict[str, Any]:
+    """
+    Builds the evaluation summary of one model from per-file counts (see frame_aggregates).
+
+    Args:
+        aggregates (list[dict]): Counts of every results file of the model.
+        model_name (str): Model name used in reports.
+
+    Returns:
+        dict: Label counts, accuracy and accuracy per domain and category.
+    """
+    counts = {label: sum(part["podsumowanie"].get(label, 0) for part in aggregates) for label in LABELS}
+    questions = sum(counts.values())
+    return {
+        "model": model_name,
+        "liczba_pytań": questions,
+        "podsumowanie": counts,
+        "accuracy": round(counts['prawidłowa'] / questions, 4) if questions else None,
+        "domeny": _accuracy_from_counts([part["domeny"] for part in aggregates]),
+        "kategorie": _accuracy_from_counts([part["kategorie"] for part in aggregates]),
+    }
+
+def summarize_frame(frame: pd.DataFrame, model_name: str) -> dict[str, Any]:
+    """
+    Builds the evaluation summary for one model.
+
+    Args:
+        frame (pd.DataFrame): Scored results frame (see score_frame).
+        model_name (str): Model name used in reports.
+
+    Returns:
+        dict: Label counts, accuracy and accuracy per domain and category.
+    """
+    return summary_from_aggregates([frame_aggregates(frame)], model_name)
+
+def file_hash(path: str) -> str:
+    """Returns the SHA-1 hex digest of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path: str) -> dict[str, Any]:
+    """
+    Loads the merge manifest: cached per-file counts keyed by content hash ('files') and the
+    last seen size, modification time and hash of every merged path ('paths').
+    Returns an empty manifest if the file does not exist.
+    """
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "files": {}, "paths": {}}
+
+def save_manifest(manifest: dict[str, Any], path: str) -> None:
+    """Saves the merge manifest as JSON."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+def _content_hash(path: str, manifest: dict[str, Any]) -> str:
+    """Returns the content hash of a file, reusing the manifest entry if size and mtime are unchanged."""
+    stat = os.stat(path)
+    seen = manifest["paths"].get(os.path.abspath(path))
+    if seen and seen["size"] == stat.st_size and seen["mtime"] == stat.st_mtime_ns:
+        return seen["hash"]
+    digest = file_hash(path)
+    manifest["paths"][os.path.abspath(path)] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+    return digest
+
+def merge_results(paths: list[str], write_summaries: bool = True, manifest_path: Optional[str] = None,
+                  with_answers: bool = True) -> tuple[dict[str, Any], pd.DataFrame]:
+    """
+    Scores raw results files of several models and merges them into a leaderboard.
+    Files of the same model (e.g. shards of one run) are combined.
+
+    With a manifest, per-file counts are cached by content hash: only new or changed files
+    are parsed and scored, the leaderboard is combined from cached counts, and the manifest
+    is updated. Cached files are still read if the answers table is requested.
+
+    Args:
+        paths (list[str]): Raw results files (.json or .parquet).
+        write_summaries (bool): Whether to write a per-model '<model>_summary.json' next to each file.
+        manifest_path (str): Optional path of the merge manifest (JSON).
+        with_answers (bool): Whether to build the long answers table.
+
+    Returns:
+        tuple: (leaderboard dict keyed by model name, long answers frame with 'model' and 'label' columns)
+    """
+    manifest = load_manifest(manifest_path)
+    aggregates = {}
+    changed = set()
+    frames = []
+    scored = 0
+    for path in paths:
+        name = model_name_for(path)
+        digest = _content_hash(path, manifest) if manifest_path else None
+        cached = manifest["files"].get(digest)
+        frame = None
+        if cached is None or with_answers:
+            frame = score_frame(load_results_frame(path))
+        if cached is None:
+            cached = frame_aggregates(frame)
+            scored += 1
+            changed.add(name)
+            if digest:
+                manifest["files"][digest] = cached
+        aggregates.setdefault(name, []).append((path, cached))
+        if frame is not None and with_answers:
+            frames.append(frame.assign(model=name))
+
+    leaderboard = {}
+    for name, parts in aggregates.items():
+        summary = summary_from_aggregates([part for _, part in parts], name)
+        leaderboard[name] = summary
+        if write_summaries:
+            for path, _ in parts:
+                summary_path = summary_path_for(path)
+                if name in changed or not os.path.exists(summary_path):
+                    with open(summary_path, 'w', encoding='utf-8') as f:
+                        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    if manifest_path:
+        live = {entry["hash"] for entry in manifest["paths"].values()}
+        manifest["files"] = {digest: counts for digest, counts in manifest["files"].items() if digest in live}
+        save_manifest(manifest, manifest_path)
+        print(f"Scored {scored} new or changed file(s), reused {len(paths) - scored} from {manifest_path}")
+
+    answers = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not answers.empty:
+        answers["model"] = answers["model"].astype("category")
+        for column in ("poprawna", "odpowiedź", "domena", "kategoria"):
+            answers[column] = answers[column].astype("category")
+    return leaderboard, answers
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class RunMetrics:
+    """
+    Thread-safe live statistics of a benchmark run: completed and failed questions, in-flight
+    requests, throughput, request latency histogram, model cache hit rate and ETA.
+    Rendered in the Prometheus text exposition format by to_prometheus().
+    """
+
+    def __init__(self, total_questions: int = 0):
+        self.total_questions = total_questions
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def request(self):
+        """Tracks one model request: counts it as in flight and observes its latency."""
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.latency_sum += latency
+                self.latency_count += 1
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if latency <= bound:
+                        self.latency_counts[i] += 1
+                        break
+
+    def record(self, questions: int, failed: int = 0, call_info: Optional[dict[str, Any]] = None) -> None:
+        """
+        Records finished questions.
+
+        Args:
+            questions (int): Number of answered questions (including failed ones).
+            failed (int): Number of questions that ended with a generation error.
+            call_info (dict): Statistics reported by the backend ('completion_tokens', 'model_cache_hit').
+        """
+        call_info = call_info or {}
+        with self._lock:
+            self.completed += questions
+            self.failed += failed
+            self.tokens += int(call_info.get("completion_tokens") or 0)
+            if "model_cache_hit" in call_info:
+                if call_info["model_cache_hit"]:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the current values, including derived rates and ETA."""
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            rate = self.completed / elapsed
+            remaining = max(self.total_questions - self.completed, 0)
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "questions_total": self.total_questions,
+                "questions_completed": self.completed,
+                "questions_failed": self.failed,
+                "requests_in_flight": self.in_flight,
+                "elapsed_s": round(elapsed, 3),
+                "questions_per_s": round(rate, 4),
+                "tokens_per_s": round(self.tokens / elapsed, 2),
+                "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else None,
+                "eta_s": round(remaining / rate, 1) if rate else None,
+                "latency_buckets": list(self.latency_counts),
+                "latency_sum_s": round(self.latency_sum, 6),
+                "latency_count": self.latency_count,
+            }
+
+    def to_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        values = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, value):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+
+        metric("bench_questions_total", "gauge", "Questions planned in this run.", values["questions_total"])
+        metric("bench_questions_completed_total", "counter", "Answered questions.", values["questions_completed"])
+        metric("bench_questions_failed_total", "counter", "Questions ending with a generation error.",
+               values["questions_failed"])
+        metric("bench_requests_in_flight", "gauge", "Model requests in progress.", values["requests_in_flight"])
+        metric("bench_questions_per_second", "gauge", "Answered questions per second.", values["questions_per_s"])
+        metric("bench_tokens_per_second", "gauge", "Generated tokens per second.", values["tokens_per_s"])
+        if values["cache_hit_rate"] is not None:
+            metric("bench_model_cache_hit_ratio", "gauge", "Share of requests served by an already loaded model.",
+                   values["cache_hit_rate"])
+        if values["eta_s"] is not None:
+            metric("bench_eta_seconds", "gauge", "Estimated time to finish the run.", values["eta_s"])
+
+        name = "bench_request_latency_seconds"
+        lines.extend([f"# HELP {name} Model request latency.", f"# TYPE {name} histogram"])
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values["latency_buckets"]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {values["latency_count"]}')
+        lines.append(f"{name}_sum {values['latency_sum_s']}")
+        lines.append(f"{name}_count {values['latency_count']}")
+        return "\n".join(lines) + "\n"
+
+def write_metrics_file(metrics: RunMetrics, path: str) -> None:
+    """Writes the metrics to a Prometheus text file (atomically, for node_exporter's textfile collector)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(metrics.to_prometheus())
+    os.replace(tmp_path, path)
+
+def start_metrics_exporter(metrics: RunMetrics, path: Optional[str] = None, port: Optional[int] = None,
+                           interval: float = 5.0) -> Callable[[], None]:
+    """
+    Starts background metric exporters: a text file rewritten every 'interval' seconds and/or
+    an HTTP endpoint on 127.0.0.1:port serving GET /metrics.
+
+    Args:
+        metrics (RunMetrics): Metrics of the run.
+        path (str): Optional Prometheus text file path.
+        port (int): Optional localhost port of the HTTP endpoint (0 picks a free port).
+        interval (float): File refresh interval in seconds.
+
+    Returns:
+        Callable: stop() - writes the final file and shuts the exporters down.
+    """
+    stop_event = threading.Event()
+    server = None
+
+    if path:
+        def refresh():
+            while not stop_event.wait(interval):
+                write_metrics_file(metrics, path)
+
+        write_metrics_file(metrics, path)
+        threading.Thread(target=refresh, daemon=True).start()
+
+    if port is not None:
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Metrics available at http://127.0.0.1:{server.server_address[1]}/metrics")
+
+    def stop():
+        stop_event.set()
+        if path:
+            write_metrics_file(metrics, path)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    stop.server = server
+    return stop
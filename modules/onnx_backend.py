@@ -0,0 +1,144 @@
+import os
+import time
+from transformers import AutoTokenizer
+from typing import Any, Optional
+from modules.utils import parse_output
+from modules.profiling import current_rss_mb
+
+# Internal cache to avoid reloading ONNX sessions
+_onnx_model_cache: dict[str, Any] = {}
+
+# Load statistics per model (load/export time, resident memory after loading)
+_onnx_model_stats: dict[str, dict[str, Any]] = {}
+
+# Exported graphs are stored here, one subdirectory per model
+DEFAULT_ONNX_CACHE_DIR = os.path.join("models", "onnx")
+
+def onnx_export_dir(model_id: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Returns the on-disk directory for the exported ONNX graph of a model.
+
+    Args:
+        model_id (str): Hugging Face model ID.
+        cache_dir (str): Optional root directory (default: DEFAULT_ONNX_CACHE_DIR).
+
+    Returns:
+        str: Export directory path.
+    """
+    return os.path.join(cache_dir or DEFAULT_ONNX_CACHE_DIR, model_id.replace("/", "--"))
+
+def _is_exported(path: str) -> bool:
+    """Checks whether a directory contains an exported ONNX graph."""
+    return os.path.isdir(path) and any(name.endswith(".onnx") for name in os.listdir(path))
+
+def _load_ort_model(model_path: str, export: bool):
+    """
+    Creates an onnxruntime-backed causal LM on CPU with full graph optimisations and IO binding.
+    Requires optimum[onnxruntime].
+    """
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    return ORTModelForCausalLM.from_pretrained(
+        model_path,
+        export=export,
+        provider="CPUExecutionProvider",
+        session_options=session_options,
+        use_io_binding=True,
+        use_cache=True,
+    )
+
+def load_onnx_model(model_id: str, onnx_path: Optional[str] = None, cache_dir: Optional[str] = None):
+    """
+    Loads an ONNX Runtime model and its tokenizer. If no exported graph is found,
+    the model is exported from Hugging Face weights and saved on disk, so later runs skip the export.
+    Sessions are cached in memory to avoid repeated loading.
+
+    Args:
+        model_id (str): Hugging Face model ID.
+        onnx_path (str): Optional directory with a pre-exported graph.
+        cache_dir (str): Optional root directory for exported graphs.
+
+    Returns:
+        tuple: (ORTModelForCausalLM, tokenizer)
+    """
+    export_dir = onnx_path or onnx_export_dir(model_id, cache_dir)
+    if export_dir in _onnx_model_cache:
+        return _onnx_model_cache[export_dir]
+
+    start = time.perf_counter()
+
+    if _is_exported(export_dir):
+        model = _load_ort_model(export_dir, export=False)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        exported = False
+    else:
+        print(f"[ONNX model] Exporting {model_id} to {export_dir} (first run only)")
+        model = _load_ort_model(model_id, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        os.makedirs(export_dir, exist_ok=True)
+        model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+        exported = True
+
+    _onnx_model_stats[export_dir] = {
+        "model_id": model_id,
+        "onnx_path": export_dir,
+        "exported": exported,
+        "load_time_s": round(time.perf_counter() - start, 3),
+        "rss_mb": round(current_rss_mb(), 1),
+    }
+
+    _onnx_model_cache[export_dir] = (model, tokenizer)
+    return model, tokenizer
+
+def get_onnx_model_stats(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns load statistics of the ONNX model described by config
+    (empty dict if the model has not been loaded yet).
+    """
+    export_dir = config.get("onnx_path") or onnx_export_dir(config["model_id"], config.get("onnx_cache_dir"))
+    return dict(_onnx_model_stats.get(export_dir, {}))
+
+def run_onnx_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
+    """
+    Executes a prompt using a causal LM exported to ONNX and run with onnxruntime on CPU.
+
+    Args:
+        prompt (str): The input prompt.
+        config (dict): Configuration dict. Expected keys:
+            - model_id: Hugging Face model ID
+            - max_new_tokens: (optional) new tokens limit
+            - onnx_path: (optional) directory with a pre-exported graph
+            - onnx_cache_dir: (optional) root directory for exported graphs
+            - call_info: (optional) dict filled with generation statistics and the unparsed 'raw_output'
+
+    Returns:
+        tuple[str, str]: Parsed (answer, explanation)
+    """
+    model_id = config["model_id"]
+    max_new_tokens = int(config.get("max_new_tokens", 256) or 256)
+
+    model, tokenizer = load_onnx_model(model_id, config.get("onnx_path"), config.get("onnx_cache_dir"))
+
+    try:
+        start = time.perf_counter()
+        inputs = tokenizer(prompt, return_tensors="pt")
+        output_ids = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+        new_tokens = output_ids[0][inputs["input_ids"].shape[-1]:]
+        generation_time = time.perf_counter() - start
+        raw_output = tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+    except Exception as e:
+        print(f"[ERROR] ONNX model generation failed: {e}")
+        return "Generation error", "Exception during generation."
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info["completion_tokens"] = len(new_tokens)
+        call_info["generation_time_s"] = generation_time
+        call_info["raw_output"] = raw_output
+
+    return parse_output(raw_output, require_explanation=not config.get("answer_only"))
@@ -0,0 +1,113 @@
+from collections import Counter
+from itertools import permutations
+from typing import Any
+import pandas as pd
+
+LETTERS = ("A", "B", "C", "D")
+
+def option_orders(mode: str = "cyclic") -> list[tuple[str, ...]]:
+    """
+    Returns option orders used to build question variants. Each order lists the original
+    option letters shown at positions A, B, C, D. The identity order always comes first.
+
+    Args:
+        mode (str): "cyclic" (4 rotations) or "all" (24 permutations).
+
+    Returns:
+        list[tuple[str, ...]]: Option orders.
+
+    Raises:
+        ValueError: If the mode is not supported.
+    """
+    if mode == "cyclic":
+        return [LETTERS[i:] + LETTERS[:i] for i in range(len(LETTERS))]
+    elif mode == "all":
+        return list(permutations(LETTERS))
+    else:
+        raise ValueError(f"Unsupported permutation mode: {mode}. Available: cyclic, all")
+
+def permute_row(row: pd.Series, order: tuple[str, ...]) -> pd.Series:
+    """
+    Builds a question variant with options shown in the given order and the correct
+    letter ('Pozycja') remapped to the new position.
+
+    Args:
+        row (pd.Series): Dataset row with 'A'-'D' and 'Pozycja'.
+        order (tuple[str, ...]): Original letters shown at positions A-D.
+
+    Returns:
+        pd.Series: Permuted copy of the row.
+    """
+    permuted = row.copy()
+    for position, original in zip(LETTERS, order):
+        permuted[position] = row[original]
+    permuted["Pozycja"] = LETTERS[order.index(str(row["Pozycja"]).strip().upper())]
+    return permuted
+
+def original_option(answer: str, order: tuple[str, ...]) -> str:
+    """
+    Maps an answer given for a permuted variant back to the original option letter
+    (non-letter answers such as "Parsing error" are returned unchanged).
+    """
+    return order[LETTERS.index(answer)] if answer in LETTERS else answer
+
+def permutation_metrics(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Computes robustness metrics over question variants.
+
+    Each record describes one question: {"poprawna": original correct letter,
+    "variants": [{"order": "BCDA", "poprawna": letter, "odpowiedź": letter}, ...]}.
+
+    Metrics:
+    - accuracy: share of correct answers over all variants,
+    - consistency: share of questions where all variants point at the same original option
+      (variants without a valid letter count as inconsistent),
+    - mean_agreement: mean share of variants agreeing with the question's most frequent option,
+    - answer_position_share: how often each position A-D is chosen (uniform = 0.25),
+    - accuracy_by_correct_position: accuracy when the correct answer is shown at A, B, C or D,
+    - position_bias: total variation distance between answer_position_share and uniform.
+
+    Args:
+        records (list[dict]): Per-question variant results.
+
+    Returns:
+        dict: Metrics.
+    """
+    total = correct = consistent = 0
+    agreement_sum = 0.0
+    position_counts = Counter()
+    by_position = {letter: [0, 0] for letter in LETTERS}
+
+    for record in records:
+        chosen = []
+        for variant in record["variants"]:
+            answer, expected = variant["odpowiedź"], variant["poprawna"]
+            total += 1
+            correct += answer == expected
+            by_position[expected][0] += answer == expected
+            by_position[expected][1] += 1
+            if answer in LETTERS:
+                position_counts[answer] += 1
+            chosen.append(original_option(answer, tuple(variant["order"])))
+
+        valid = [option for option in chosen if option in LETTERS]
+        if valid:
+            consistent += len(valid) == len(chosen) and len(set(valid)) == 1
+            agreement_sum += Counter(valid).most_common(1)[0][1] / len(chosen)
+
+    answered = sum(position_counts.values())
+    position_share = {letter: round(position_counts[letter] / answered, 4) if answered else 0.0 for letter in LETTERS}
+    questions = len(records)
+
+    return {
+        "questions": questions,
+        "variants": total,
+        "accuracy": round(correct / total, 4) if total else None,
+        "consistency": round(consistent / questions, 4) if questions else None,
+        "mean_agreement": round(agreement_sum / questions, 4) if questions else None,
+        "answer_position_share": position_share,
+        "accuracy_by_correct_position": {
+            letter: round(hits / count, 4) if count else None for letter, (hits, count) in by_position.items()
+        },
+        "position_bias": round(sum(abs(share - 0.25) for share in position_share.values()) / 2, 4) if answered else None,
+    }
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+def _read_proc_status(field: str) -> Optional[float]:
+    """
+    Reads a memory field (e.g. 'VmRSS', 'VmHWM') from /proc/self/status.
+
+    Args:
+        field (str): Name of the field.
+
+    Returns:
+        Optional[float]: Value in megabytes or None if not available (non-Linux systems).
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def current_rss_mb() -> float:
+    """
+    Returns the current resident set size (RSS) of this process in megabytes.
+    Uses /proc on Linux and psutil (if installed) elsewhere; returns 0.0 if neither is available.
+    """
+    rss = _read_proc_status("VmRSS")
+    if rss is not None:
+        return rss
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process in megabytes.
+    """
+    peak = _read_proc_status("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    except ImportError:
+        return current_rss_mb()
+
+
+@contextmanager
+def track_peak_rss(interval: float = 0.05):
+    """
+    Tracks the peak resident set size while the context is active by sampling RSS
+    in a background thread (the process-wide peak cannot be reset between phases).
+
+    Args:
+        interval (float): Sampling interval in seconds.
+
+    Yields:
+        dict: Filled on exit with 'start_rss_mb', 'peak_rss_mb' and 'end_rss_mb'.
+    """
+    stats = {"start_rss_mb": current_rss_mb()}
+    peak = [stats["start_rss_mb"]]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            peak[0] = max(peak[0], current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield stats
+    finally:
+        stop.set()
+        sampler.join()
+        stats["end_rss_mb"] = current_rss_mb()
+        stats["peak_rss_mb"] = max(peak[0], stats["end_rss_mb"])
+        for key in ("start_rss_mb", "peak_rss_mb", "end_rss_mb"):
+            stats[key] = round(stats[key], 1)
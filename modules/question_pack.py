@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+from typing import Any
+import numpy as np
+import pandas as pd
+from modules.utils import build_prompt, DEFAULT_PROMPT
+
+PACK_VERSION = 1
+DEFAULT_PACK_DIR = os.path.join("models", "packs")
+
+def prompts_hash(test_data: pd.DataFrame, prompt_id: str = DEFAULT_PROMPT) -> str:
+    """
+    Returns a hash of the prompt template id and all prompts rendered from the dataset with their
+    index labels (dataset snapshot + prompt template), used to check that a question pack or work
+    queue matches the run. Packs and queues address prompts by index label, so a renumbered
+    dataset with the same questions does not match.
+    """
+    digest = hashlib.sha1(prompt_id.encode("utf-8") + b"\x00")
+    for idx, row in test_data.iterrows():
+        digest.update(f"{idx}\x00".encode("utf-8"))
+        digest.update(build_prompt(row, prompt_id=prompt_id).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def pack_path(dataset_path: str, model_id: str, root: str = DEFAULT_PACK_DIR, prompt_id: str = DEFAULT_PROMPT) -> str:
+    """
+    Returns the default pack directory for a dataset, tokenizer and prompt template
+    (e.g. models/packs/input__speakleash--Bielik-7B-Instruct-v0.1__pl-v1).
+    """
+    stem = os.path.splitext(os.path.basename(dataset_path))[0]
+    return os.path.join(root, f"{stem}__{model_id.strip('/').replace('/', '--')}__{prompt_id}")
+
+def build_question_pack(test_data: pd.DataFrame, tokenizer, path: str, tokenizer_id: str,
+                        prompt_id: str = DEFAULT_PROMPT) -> dict[str, Any]:
+    """
+    Renders every prompt through the prompt template, tokenises it once and stores the token ids as
+    memory-mappable NumPy arrays: 'input_ids.npy' (all prompts concatenated), 'offsets.npy'
+    (start of every prompt, plus the end) and a 'meta.json' header.
+
+    Args:
+        test_data (pd.DataFrame): Dataset.
+        tokenizer: Hugging Face tokenizer of the model.
+        path (str): Pack directory.
+        tokenizer_id (str): Model/tokenizer identifier stored in the header.
+        prompt_id (str): Prompt template id (see utils.PROMPT_TEMPLATES).
+
+    Returns:
+        dict: Pack header.
+    """
+    encoded = [tokenizer(build_prompt(row, prompt_id=prompt_id), truncation=True)["input_ids"]
+               for _, row in test_data.iterrows()]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(ids) for ids in encoded])
+    dtype = np.int32 if len(tokenizer) < 2 ** 31 else np.int64
+    input_ids = np.fromiter((token for ids in encoded for token in ids), dtype=dtype, count=int(offsets[-1]))
+
+    meta = {
+        "version": PACK_VERSION,
+        "tokenizer": tokenizer_id,
+        "vocab_size": len(tokenizer),
+        "prompt": prompt_id,
+        "prompts_sha1": prompts_hash(test_data, prompt_id),
+        "questions": len(encoded),
+        "tokens": int(offsets[-1]),
+        "dtype": np.dtype(dtype).name,
+        "index": [int(idx) if isinstance(idx, (int, np.integer)) else str(idx) for idx in test_data.index],
+    }
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "input_ids.npy"), input_ids)
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    print(f"Question pack with {meta['questions']} prompts ({meta['tokens']} tokens) saved to {path}")
+    return meta
+
+def load_question_pack(path: str) -> dict[str, Any]:
+    """
+    Opens a question pack. Token arrays are memory-mapped read-only, so processes using the
+    same pack share one copy through the page cache and nothing is tokenised at run time.
+
+    Args:
+        path (str): Pack directory.
+
+    Returns:
+        dict: 'meta' (header), 'input_ids' and 'offsets' (memory-mapped arrays) and
+            'positions' (dataset index label -> prompt position).
+
+    Raises:
+        FileNotFoundError: If the pack does not exist.
+        ValueError: If the pack version is not supported.
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Question pack {path} does not exist.")
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get("version") != PACK_VERSION:
+        raise ValueError(f"Unsupported question pack version: {meta.get('version')}")
+    return {
+        "meta": meta,
+        "input_ids": np.load(os.path.join(path, "input_ids.npy"), mmap_mode="r"),
+        "offsets": np.load(os.path.join(path, "offsets.npy"), mmap_mode="r"),
+        "positions": {idx: position for position, idx in enumerate(meta["index"])},
+    }
+
+def check_question_pack(pack: dict[str, Any], test_data: pd.DataFrame, tokenizer_id: str,
+                        prompt_id: str = DEFAULT_PROMPT) -> None:
+    """
+    Verifies that a pack was built for this dataset snapshot, prompt template and tokenizer.
+
+    Raises:
+        ValueError: If the pack does not match.
+    """
+    meta = pack["meta"]
+    if meta["tokenizer"] != tokenizer_id:
+        raise ValueError(f"Question pack was built for tokenizer {meta['tokenizer']}, not {tokenizer_id}")
+    if meta.get("prompt") != prompt_id:
+        raise ValueError(f"Question pack was built for prompt template {meta.get('prompt')}, not {prompt_id}")
+    if meta["prompts_sha1"] != prompts_hash(test_data, prompt_id):
+        raise ValueError("Question pack does not match the dataset or prompt template; rebuild it")
+
+def pack_input_ids(pack: dict[str, Any], idx) -> np.ndarray:
+    """Returns the token ids of the prompt of a dataset row (a view into the memory-mapped array)."""
+    position = pack["positions"][idx]
+    return pack["input_ids"][pack["offsets"][position]:pack["offsets"][position + 1]]
+
+def prompt_token_counts(test_data: pd.DataFrame, tokenizer, prompt_id: str = DEFAULT_PROMPT) -> dict[str, Any]:
+    """
+    Counts the prompt tokens of every question of the dataset for one template and tokenizer.
+
+    Returns:
+        dict: 'prompt', 'questions', 'tokens' (total), 'mean' and 'max' tokens per prompt.
+    """
+    counts = [len(tokenizer(build_prompt(row, prompt_id=prompt_id))["input_ids"]) for _, row in test_data.iterrows()]
+    return {
+        "prompt": prompt_id,
+        "questions": len(counts),
+        "tokens": sum(counts),
+        "mean": round(sum(counts) / len(counts), 1) if counts else 0.0,
+        "max": max(counts, default=0),
+    }
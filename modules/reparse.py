@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Union
+from modules.response_saver import decompress_output, RAW_OUTPUT_META, RAW_EXPLANATION_META
+from modules.scorer import evaluate_answer
+from modules.utils import parse_output, aggregate_samples
+
+# below this many records the process pool costs more than it saves
+MIN_PARALLEL_RECORDS = 2000
+
+Parsed = Union[tuple[str, str], list[Optional[tuple[str, str]]], None]
+
+def _parse_stored(data: Union[str, list, None], answer_only: bool) -> Parsed:
+    """
+    Decompresses and parses one stored raw output, or each output of a list (samples,
+    option-order variants). Returns None if there is none.
+    """
+    if isinstance(data, list):
+        if not any(data):
+            return None
+        return [_parse_stored(item, answer_only) for item in data]
+    raw_output = decompress_output(data)
+    if raw_output is None:
+        return None
+    return parse_output(raw_output, require_explanation=not answer_only)
+
+def _parse_item(item: tuple[Any, bool, Optional[str]]) -> tuple[Parsed, Optional[tuple[str, str]]]:
+    data, answer_only, explanation_data = item
+    return _parse_stored(data, answer_only), _parse_stored(explanation_data, False)
+
+def _parse_chunk(items: list[tuple[Any, bool, Optional[str]]]) -> list[tuple[Parsed, Optional[tuple[str, str]]]]:
+    return [_parse_item(item) for item in items]
+
+def _stored_output(record: dict[str, Any]) -> tuple[Any, bool, Optional[str]]:
+    """
+    (compressed raw output or list of outputs, answer-only flag, compressed raw output of the
+    explanation pass) of a record; answer-only records come from two-stage runs.
+    """
+    meta = record.get("meta") or {}
+    return meta.get(RAW_OUTPUT_META), "ma_uzasadnienie" in meta, meta.get(RAW_EXPLANATION_META)
+
+def _reparsed_record(record: dict[str, Any], answer_only: bool,
+                     parsed: tuple[Parsed, Optional[tuple[str, str]]]) -> Optional[dict[str, Any]]:
+    """
+    Builds a copy of a record with the re-parsed answers (None if the record has no raw output).
+    Self-consistency records are re-aggregated by majority vote (samples without a raw output keep
+    their stored letter), permutation records update every variant and take the answer of the
+    original order. Answer-only records keep their explanation unless the stored explanation
+    pass output now parses for the same letter.
+    """
+    outcome, explanation_outcome = parsed
+    if outcome is None:
+        return None
+    meta = dict(record.get("meta") or {})
+    if isinstance(outcome, list) and "samples" in meta:
+        stored = meta["samples"]
+        aggregated = aggregate_samples([sample if sample is not None else (stored[i], "")
+                                        for i, sample in enumerate(outcome)])
+        meta.update(samples=aggregated["samples"], agreement=aggregated["agreement"])
+        answer, explanation = aggregated["answer"], aggregated["explanation"]
+    elif isinstance(outcome, list):
+        variants = meta.get("permutations") or []
+        meta["permutations"] = [{**variant, "odpowiedź": variant_outcome[0]} if variant_outcome is not None else variant
+                                for variant, variant_outcome in zip(variants, outcome)]
+        answer, explanation = outcome[0] if outcome[0] is not None else (record["odpowiedź"], record["uzasadnienie"])
+    else:
+        answer, explanation = outcome
+
+    if answer_only:
+        explanation = record["uzasadnienie"]
+        if explanation_outcome is not None and explanation_outcome[0] == answer:
+            explanation = explanation_outcome[1]
+            meta["ma_uzasadnienie"] = True
+    return {**record, "odpowiedź": answer, "uzasadnienie": explanation, "meta": meta}
+
+def reparse_record(record: dict[str, Any]) -> Optional[tuple[str, str]]:
+    """
+    Runs the current parser over the stored raw output of one record. Answer-only records
+    (two-stage runs) need only the letter and keep the explanation they already have
+    (see _reparsed_record).
+
+    Returns:
+        tuple[str, str] | None: New (answer, explanation), or None if the record has no raw output.
+    """
+    item = _stored_output(record)
+    updated = _reparsed_record(record, item[1], _parse_item(item))
+    return None if updated is None else (updated["odpowiedź"], updated["uzasadnienie"])
+
+def reparse_results(results: list[dict[str, Any]], workers: Optional[int] = None,
+                    chunk_size: int = 500) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Re-parses the stored raw outputs of a results file with the current parser.
+
+    Args:
+        results (list): Raw result records (see response_saver.load_raw_results).
+        workers (int): Parser processes (default: CPU count; 1 parses in this process).
+        chunk_size (int): Records per task sent to a worker process.
+
+    Returns:
+        tuple[list, dict]: Updated records (copies; records without a raw output are unchanged)
+            and a report with 'records', 'reparsed', 'without_raw', 'changed', 'correct_before',
+            'correct_after' and 'changes' (numer, poprawna, before and after answer of every changed record).
+    """
+    workers = workers or os.cpu_count() or 1
+    # workers receive only the compressed outputs, not whole records
+    items = [_stored_output(record) for record in results]
+    if workers > 1 and len(items) >= MIN_PARALLEL_RECORDS:
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = [outcome for chunk in executor.map(_parse_chunk, chunks) for outcome in chunk]
+    else:
+        parsed = _parse_chunk(items)
+
+    updated, changes = [], []
+    correct_before = correct_after = 0
+    for record, (_, answer_only, _), outcome in zip(results, items, parsed):
+        correct_before += evaluate_answer(str(record["odpowiedź"]), str(record["poprawna"])) == 'prawidłowa'
+        reparsed = _reparsed_record(record, answer_only, outcome)
+        if reparsed is not None:
+            if reparsed["odpowiedź"] != record["odpowiedź"]:
+                changes.append({"numer": record["numer"], "poprawna": record["poprawna"],
+                                "przed": record["odpowiedź"], "po": reparsed["odpowiedź"]})
+            record = reparsed
+        correct_after += evaluate_answer(str(record["odpowiedź"]), str(record["poprawna"])) == 'prawidłowa'
+        updated.append(record)
+
+    without_raw = sum(outcome is None for outcome, _ in parsed)
+    report = {
+        "records": len(results),
+        "reparsed": len(results) - without_raw,
+        "without_raw": without_raw,
+        "changed": len(changes),
+        "correct_before": correct_before,
+        "correct_after": correct_after,
+        "changes": changes,
+    }
+    return updated, report
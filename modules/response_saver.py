@@ -1,11 +1,66 @@
+import base64
 import json
+import logging
+import math
 import os
-from typing import Any
+import zlib
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Meta fields stored as their own columns in the columnar (Parquet) format;
+# any other meta fields are kept as a JSON string column
+CATEGORICAL_META = ("domena", "kategoria")
+NUMERIC_META = ("czas_s", "tokeny")
+# Meta field holding the unparsed model output (see compress_output); a list with one entry
+# per sample or option-order variant in self-consistency and permutation runs
+RAW_OUTPUT_META = "surowa_odpowiedź"
+# Meta field holding the unparsed output of the explanation pass of a two-stage run
+RAW_EXPLANATION_META = "surowe_uzasadnienie"
+
+
+def _json_safe(value: Any) -> Any:
+    """
+    Replaces NaN values (e.g. empty 'Tagi' cells read by pandas) with None,
+    recursively, so that the output is valid JSON.
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def compress_output(text: str) -> str:
+    """
+    Compresses a raw model output for storage in a result record (zlib, base64-encoded
+    so that it stays a JSON string).
+    """
+    return base64.b64encode(zlib.compress(text.encode("utf-8"), 9)).decode("ascii")
+
+
+def compress_outputs(texts: list[Optional[str]]) -> list[Optional[str]]:
+    """
+    Compresses the raw outputs of a multi-output record (samples, option-order variants),
+    keeping None for outputs the backend did not report.
+    """
+    return [compress_output(text) if text is not None else None for text in texts]
+
+
+def decompress_output(data: Optional[str]) -> Optional[str]:
+    """
+    Restores a raw model output stored by compress_output (None if the record has none).
+    """
+    if not data:
+        return None
+    return zlib.decompress(base64.b64decode(data)).decode("utf-8")
 
 
 def save_raw_results(results:list[dict[str, Any]], output_path: str) -> None:
     """
-    Save raw model answers to a JSON file.
+    Save raw model answers to a JSON file (or to a Parquet file if the path ends with '.parquet').
 
     Each entry in "results" should include:
     - question_number (int)
@@ -18,9 +73,157 @@ def save_raw_results(results:list[dict[str, Any]], output_path: str) -> None:
         results (list): List of dictionaries containing model answers.
         output_path (str): Path to the output JSON file.
     """
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    if output_path.endswith(".parquet"):
+        save_results_parquet(results, output_path)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(_json_safe(results), f, indent=2, ensure_ascii=False)
+
+    logger.debug("Results saved to %s", output_path)
+
+
+def results_to_table(results: list[dict[str, Any]]):
+    """
+    Converts raw result records into a columnar Arrow table. Answers, correct letters,
+    domains and categories are dictionary-encoded (categorical), explanations and questions
+    are string columns and timing/token counts are numeric columns. Remaining meta fields
+    are stored as a JSON string column 'meta_extra'.
+
+    Args:
+        results (list): Raw result records.
+
+    Returns:
+        pyarrow.Table: Results table.
+    """
+    import pyarrow as pa
+
+    def meta(record):
+        return record.get("meta") or {}
+
+    def extra(record):
+        fields = {k: v for k, v in meta(record).items() if k not in (*CATEGORICAL_META, *NUMERIC_META, "tagi")}
+        return json.dumps(_json_safe(fields), ensure_ascii=False) if fields else None
+
+    def text(value):
+        return None if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    columns = {
+        "numer": pa.array([int(r["numer"]) for r in results], pa.int64()),
+        "pytanie": pa.array([text(r["pytanie"]) for r in results], pa.string()),
+        "poprawna": pa.array([text(r["poprawna"]) for r in results], pa.string()).cast(categorical),
+        "odpowiedź": pa.array([text(r["odpowiedź"]) for r in results], pa.string()).cast(categorical),
+        "uzasadnienie": pa.array([text(r["uzasadnienie"]) for r in results], pa.string()),
+        "domena": pa.array([text(meta(r).get("domena")) for r in results], pa.string()).cast(categorical),
+        "kategoria": pa.array([text(meta(r).get("kategoria")) for r in results], pa.string()).cast(categorical),
+        "tagi": pa.array([text(meta(r).get("tagi")) for r in results], pa.string()),
+        "czas_s": pa.array([meta(r).get("czas_s") for r in results], pa.float64()),
+        "tokeny": pa.array([meta(r).get("tokeny") for r in results], pa.int64()),
+        "meta_extra": pa.array([extra(r) for r in results], pa.string()),
+    }
+    return pa.table(columns)
+
+
+def table_to_results(table) -> list[dict[str, Any]]:
+    """
+    Converts a results table (see results_to_table) back to raw result records
+    in the JSON layout.
+
+    Args:
+        table (pyarrow.Table): Results table.
+
+    Returns:
+        list: Raw result records.
+    """
+    results = []
+    for row in table.to_pylist():
+        meta = {"domena": row["domena"], "kategoria": row["kategoria"], "tagi": row["tagi"]}
+        for key in NUMERIC_META:
+            if row.get(key) is not None:
+                meta[key] = row[key]
+        if row.get("meta_extra"):
+            meta.update(json.loads(row["meta_extra"]))
+        results.append({
+            "numer": row["numer"],
+            "pytanie": row["pytanie"],
+            "poprawna": row["poprawna"],
+            "odpowiedź": row["odpowiedź"],
+            "uzasadnienie": row["uzasadnienie"],
+            "meta": meta,
+        })
+    return results
+
+
+def save_results_parquet(results: list[dict[str, Any]], output_path: str) -> None:
+    """
+    Save raw model answers to a Parquet file (requires pyarrow).
+
+    Args:
+        results (list): Raw result records.
+        output_path (str): Path to the output Parquet file.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    pq.write_table(results_to_table(results), output_path, compression="zstd")
+
+
+def load_raw_results(path: str) -> list[dict[str, Any]]:
+    """
+    Load raw model answers from a JSON or Parquet file.
+    Older JSON files containing NaN values are accepted.
+
+    Args:
+        path (str): Path to a '.json' or '.parquet' results file.
+
+    Returns:
+        list: Raw result records.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return table_to_results(pq.read_table(path))
+
+    with open(path, encoding='utf-8') as f:
+        return _json_safe(json.load(f))
+
+
+def load_results_frame(path: str):
+    """
+    Load raw model answers as a pandas DataFrame with categorical answer, label,
+    domain and category columns (cheap to group and compare at sweep scale).
+
+    Args:
+        path (str): Path to a '.json' or '.parquet' results file.
+
+    Returns:
+        pd.DataFrame: One row per answer.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pandas()
+    return results_to_table(load_raw_results(path)).to_pandas()
+
+
+def run_summary_path(results_path: str) -> str:
+    """
+    Returns the path of the run summary file that accompanies a raw results file
+    (e.g. results/bielik.json -> results/bielik_run.json).
+    """
+    root, _ = os.path.splitext(results_path)
+    return f"{root}_run.json"
+
+
+def save_run_summary(summary: dict[str, Any], output_path: str) -> None:
+    """
+    Save run-level information (model config, timing, throughput, memory) to a JSON file.
+
+    Args:
+        summary (dict): Run summary.
+        output_path (str): Path to the output JSON file.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    
-    print(f"Results saved to {output_path}")
\ No newline at end of file
+        json.dump(summary, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Optional
+from modules.scorer import evaluate_answer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    model_id TEXT,
+    api TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    model_ref INTEGER NOT NULL REFERENCES models(id),
+    started_at TEXT NOT NULL,
+    dataset TEXT,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS questions (
+    hash TEXT PRIMARY KEY,
+    pytanie TEXT NOT NULL,
+    a TEXT, b TEXT, c TEXT, d TEXT,
+    poprawna TEXT NOT NULL,
+    domena TEXT,
+    kategoria TEXT,
+    tagi TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    run_ref INTEGER NOT NULL REFERENCES runs(id),
+    question_hash TEXT NOT NULL REFERENCES questions(hash),
+    numer INTEGER,
+    odpowiedz TEXT,
+    uzasadnienie TEXT,
+    label TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    czas_s REAL,
+    tokeny INTEGER,
+    UNIQUE (run_ref, question_hash)
+);
+-- per run and category counters kept up to date by triggers, so accuracy queries
+-- do not have to scan millions of answers
+CREATE TABLE IF NOT EXISTS run_category_stats (
+    run_ref INTEGER NOT NULL REFERENCES runs(id),
+    kategoria TEXT NOT NULL,
+    answers INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (run_ref, kategoria)
+);
+CREATE TRIGGER IF NOT EXISTS trg_answers_insert AFTER INSERT ON answers BEGIN
+    INSERT INTO run_category_stats (run_ref, kategoria, answers, correct)
+    VALUES (NEW.run_ref, COALESCE((SELECT kategoria FROM questions WHERE hash = NEW.question_hash), ''), 1, NEW.correct)
+    ON CONFLICT (run_ref, kategoria) DO UPDATE SET answers = answers + 1, correct = correct + excluded.correct;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_answers_update AFTER UPDATE OF correct ON answers BEGIN
+    UPDATE run_category_stats SET correct = correct - OLD.correct + NEW.correct
+    WHERE run_ref = NEW.run_ref
+      AND kategoria = COALESCE((SELECT kategoria FROM questions WHERE hash = NEW.question_hash), '');
+END;
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs(model_ref, started_at);
+CREATE INDEX IF NOT EXISTS idx_answers_question ON answers(question_hash, run_ref);
+CREATE INDEX IF NOT EXISTS idx_questions_kategoria ON questions(kategoria);
+CREATE INDEX IF NOT EXISTS idx_questions_domena ON questions(domena);
+"""
+
+def _text(value: Any) -> Optional[str]:
+    """Converts a cell value to text (None for empty/NaN cells)."""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value).strip()
+
+def question_hash(row) -> str:
+    """
+    Returns a stable content hash of a question: question text, options and correct letter
+    (whitespace-normalised), independent of the row position in the dataset.
+
+    Args:
+        row (pd.Series | dict): Dataset row with 'Pytanie', 'A'-'D' and 'Pozycja'.
+
+    Returns:
+        str: Hex digest.
+    """
+    parts = [" ".join((_text(row.get(column)) or "").split()) for column in ("Pytanie", "A", "B", "C", "D", "Pozycja")]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def open_results_db(path: str) -> sqlite3.Connection:
+    """
+    Opens (and creates if needed) the results database.
+
+    Args:
+        path (str): SQLite file path.
+
+    Returns:
+        sqlite3.Connection: Connection with rows accessible by column name.
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def start_run(conn: sqlite3.Connection, model_name: str, model_id: str = None, api: str = None,
+              dataset: str = None, config: dict[str, Any] = None) -> int:
+    """
+    Registers a model (if new) and a new run.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        model_name (str): Friendly model name used in reports.
+        model_id (str): Model identifier (HF ID or API model name).
+        api (str): Backend type.
+        dataset (str): Dataset path.
+        config (dict): Run configuration (stored as JSON; non-serialisable values are stringified).
+
+    Returns:
+        int: Run id.
+    """
+    conn.execute("INSERT OR IGNORE INTO models (name, model_id, api) VALUES (?, ?, ?)", (model_name, model_id, api))
+    model_ref = conn.execute("SELECT id FROM models WHERE name = ?", (model_name,)).fetchone()["id"]
+    cursor = conn.execute(
+        "INSERT INTO runs (model_ref, started_at, dataset, config) VALUES (?, ?, ?, ?)",
+        (model_ref, datetime.now(timezone.utc).isoformat(timespec="seconds"), dataset,
+         json.dumps(config or {}, ensure_ascii=False, default=str)),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+def record_answer(conn: sqlite3.Connection, run_id: int, row, record: dict[str, Any], commit: bool = True) -> None:
+    """
+    Stores one answer of a run together with its question and evaluation label.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        run_id (int): Run id (see start_run).
+        row (pd.Series): Dataset row of the question.
+        record (dict): Raw result record built by the runner.
+        commit (bool): Whether to commit immediately (disable for bulk inserts).
+    """
+    qhash = question_hash(row)
+    conn.execute(
+        "INSERT OR IGNORE INTO questions (hash, pytanie, a, b, c, d, poprawna, domena, kategoria, tagi) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (qhash, _text(row["Pytanie"]), _text(row["A"]), _text(row["B"]), _text(row["C"]), _text(row["D"]),
+         _text(row["Pozycja"]), _text(row.get("Domena")), _text(row.get("Kategoria")), _text(row.get("Tagi"))),
+    )
+    label = evaluate_answer(str(record["odpowiedź"]), str(row["Pozycja"]))
+    meta = record.get("meta") or {}
+    conn.execute(
+        "INSERT INTO answers "
+        "(run_ref, question_hash, numer, odpowiedz, uzasadnienie, label, correct, czas_s, tokeny) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (run_ref, question_hash) DO UPDATE SET numer = excluded.numer, odpowiedz = excluded.odpowiedz, "
+        "uzasadnienie = excluded.uzasadnienie, label = excluded.label, correct = excluded.correct, "
+        "czas_s = excluded.czas_s, tokeny = excluded.tokeny",
+        (run_id, qhash, int(record["numer"]), record["odpowiedź"], record["uzasadnienie"], label,
+         int(label == 'prawidłowa'), meta.get("czas_s"), meta.get("tokeny")),
+    )
+    if commit:
+        conn.commit()
+
+def _latest_run(conn: sqlite3.Connection, model_name: str) -> Optional[int]:
+    """Returns the id of the most recent run of a model (None if the model has no runs)."""
+    row = conn.execute(
+        "SELECT runs.id FROM runs JOIN models ON models.id = runs.model_ref "
+        "WHERE models.name = ? ORDER BY runs.started_at DESC, runs.id DESC LIMIT 1",
+        (model_name,),
+    ).fetchone()
+    return row["id"] if row else None
+
+def disagreements(conn: sqlite3.Connection, model_a: str, model_b: str) -> list[dict[str, Any]]:
+    """
+    Returns questions answered differently by two models (latest run of each).
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        model_a (str): First model name.
+        model_b (str): Second model name.
+
+    Returns:
+        list[dict]: Question text, correct letter and both answers.
+    """
+    run_a, run_b = _latest_run(conn, model_a), _latest_run(conn, model_b)
+    rows = conn.execute(
+        "SELECT q.hash, q.pytanie, q.poprawna, q.kategoria, a.odpowiedz AS answer_a, b.odpowiedz AS answer_b "
+        "FROM answers a "
+        "JOIN answers b ON b.question_hash = a.question_hash AND b.run_ref = ? "
+        "JOIN questions q ON q.hash = a.question_hash "
+        "WHERE a.run_ref = ? AND a.odpowiedz IS NOT b.odpowiedz",
+        (run_b, run_a),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def accuracy_by_category(conn: sqlite3.Connection, model_name: str = None) -> list[dict[str, Any]]:
+    """
+    Returns accuracy per model, run and 'kategoria', ordered by run start time
+    (accuracy over time). Reads the trigger-maintained per-run counters instead of the answers table.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        model_name (str): Optional model name filter.
+
+    Returns:
+        list[dict]: Rows with model, run id, start time, category, answers and accuracy.
+    """
+    query = (
+        "SELECT m.name AS model, r.id AS run, r.started_at, NULLIF(s.kategoria, '') AS kategoria, "
+        "s.answers, ROUND(CAST(s.correct AS REAL) / s.answers, 4) AS accuracy "
+        "FROM run_category_stats s JOIN runs r ON r.id = s.run_ref JOIN models m ON m.id = r.model_ref "
+    )
+    params = ()
+    if model_name:
+        query += "WHERE m.name = ? "
+        params = (model_name,)
+    query += "ORDER BY r.started_at, r.id, s.kategoria"
+    return [dict(row) for row in conn.execute(query, params).fetchall()]
@@ -0,0 +1,102 @@
+import json
+import urllib.error
+import urllib.request
+from typing import Any
+
+# Default address of the local inference server (see benchmark_local_server.py)
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+# Config keys that are not sent to the server (client-side only or not serialisable)
+_CLIENT_ONLY_KEYS = ("api", "url", "api_key", "call_info")
+
+def _post(url: str, payload: dict[str, Any], timeout: float) -> dict[str, Any]:
+    """
+    Sends a JSON POST request and returns the decoded JSON response.
+    """
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def _server_config(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Builds the model config forwarded to the server.
+    """
+    return {key: value for key, value in config.items() if key not in _CLIENT_ONLY_KEYS}
+
+def run_server_model(prompt: str, config: dict[str, Any]) -> tuple[str, str]:
+    """
+    Executes a prompt on a long-running local inference server that keeps models loaded
+    across benchmark runs. The server runs the same local backend and parse_output path.
+
+    Args:
+        prompt (str): The input prompt.
+        config (dict): Configuration dict. Expected keys:
+            - model_id: Hugging Face model ID
+            - url: (optional) server address (default: DEFAULT_SERVER_URL)
+            - timeout: (optional) request timeout in seconds (default: 600)
+            - other local backend options (max_new_tokens, quantization, ...)
+            - call_info: (optional) dict filled with generation statistics from the server
+
+    Returns:
+        tuple[str, str]: Parsed (answer, explanation)
+    """
+    model_id = config["model_id"]
+    url = (config.get("url") or DEFAULT_SERVER_URL).rstrip("/")
+    timeout = float(config.get("timeout") or 600)
+
+    try:
+        response = _post(f"{url}/generate", {"prompt": prompt, "config": _server_config(config)}, timeout)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"[Local server] Request for {model_id} failed: {e}")
+        return "Generation error", "Exception during generation."
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info.update(response.get("call_info", {}))
+
+    return response["answer"], response["explanation"]
+
+def score_server_model(prompt: str, config: dict[str, Any]) -> dict[str, float]:
+    """
+    Requests answer-letter log-probabilities for a prompt from the local inference server.
+
+    Args:
+        prompt (str): The input prompt.
+        config (dict): Configuration dict (see run_server_model).
+
+    Returns:
+        dict[str, float]: Mapping letter -> log-probability.
+    """
+    url = (config.get("url") or DEFAULT_SERVER_URL).rstrip("/")
+    timeout = float(config.get("timeout") or 600)
+    response = _post(f"{url}/score", {"prompt": prompt, "config": _server_config(config)}, timeout)
+    return response["scores"]
+
+def sample_server_model(prompts: list[str], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Requests self-consistency samples for a batch of prompts from the local inference server,
+    which draws them in batched generate calls (see local_backend.run_local_model_samples).
+
+    Args:
+        prompts (list[str]): Input prompts.
+        config (dict): Configuration dict (see run_server_model) with 'num_samples', 'temperature' and 'top_p'.
+
+    Returns:
+        list[dict]: One entry per prompt with 'answer', 'explanation', 'samples' and 'agreement'.
+    """
+    model_id = config["model_id"]
+    url = (config.get("url") or DEFAULT_SERVER_URL).rstrip("/")
+    timeout = float(config.get("timeout") or 600)
+
+    try:
+        response = _post(f"{url}/samples", {"prompts": prompts, "config": _server_config(config)}, timeout)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"[Local server] Sampling request for {model_id} failed: {e}")
+        return [{"answer": "Generation error", "explanation": "Exception during generation.",
+                 "samples": [], "agreement": 0.0} for _ in prompts]
+
+    call_info = config.get("call_info")
+    if call_info is not None:
+        call_info.update(response.get("call_info", {}))
+    return response["results"]
@@ -0,0 +1,199 @@
+import math
+from statistics import NormalDist
+from typing import Any
+import numpy as np
+import pandas as pd
+
+def correctness_matrix(answers: pd.DataFrame) -> tuple[list[str], pd.DataFrame]:
+    """
+    Builds a model x question correctness matrix over the questions answered by every model.
+
+    Args:
+        answers (pd.DataFrame): Scored answers with 'model', 'pytanie', 'domena' and 'label' columns
+            (see merger.merge_results).
+
+    Returns:
+        tuple: (model names, frame indexed by question with one boolean column per model and a 'domena' column)
+    """
+    frame = answers.assign(
+        model=answers["model"].astype(str),
+        pytanie=answers["pytanie"].astype(str),
+        correct=answers["label"].astype(str) == 'prawidłowa',
+    ).drop_duplicates(["model", "pytanie"], keep="last")
+    matrix = frame.pivot(index="pytanie", columns="model", values="correct").dropna()
+    models = [str(model) for model in matrix.columns]
+    domains = frame.drop_duplicates("pytanie").set_index("pytanie")["domena"].astype(str)
+    return models, matrix.astype(bool).assign(domena=domains.reindex(matrix.index))
+
+def resample_weights(n: int, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws bootstrap resamples of n items as a (n_resamples, n) matrix of draw counts.
+    Multiplying it with a correctness matrix gives the hit counts of all resamples of all
+    models in one matrix product.
+    """
+    return rng.multinomial(n, np.full(n, 1.0 / n), size=n_resamples).astype(np.float32)
+
+def bootstrap_accuracy(correct: np.ndarray, n_resamples: int = 10000, seed: int = 0,
+                       chunk_size: int = 1000) -> np.ndarray:
+    """
+    Returns resampled accuracies of every model. Resamples are drawn in chunks so the
+    draw-count matrix stays small for large question sets; with the same seed, every model
+    (column) is evaluated on the same resamples, which makes paired comparisons possible.
+
+    Args:
+        correct (np.ndarray): (questions, models) correctness matrix.
+        n_resamples (int): Number of bootstrap resamples.
+        seed (int): Random seed.
+        chunk_size (int): Resamples drawn per matrix product.
+
+    Returns:
+        np.ndarray: (resamples, models) accuracies.
+    """
+    rng = np.random.default_rng(seed)
+    n = correct.shape[0]
+    values = correct.astype(np.float32)
+    chunks = [resample_weights(n, min(chunk_size, n_resamples - start), rng) @ values / n
+              for start in range(0, n_resamples, chunk_size)]
+    return np.concatenate(chunks)
+
+def _interval(samples: np.ndarray, confidence: float) -> tuple[np.ndarray, np.ndarray]:
+    """Percentile interval along the resample axis."""
+    alpha = (1 - confidence) / 2
+    return np.quantile(samples, alpha, axis=0), np.quantile(samples, 1 - alpha, axis=0)
+
+def bootstrap_ci(correct: np.ndarray, n_resamples: int = 10000, confidence: float = 0.95,
+                 seed: int = 0) -> list[dict[str, float]]:
+    """
+    Percentile bootstrap confidence intervals of accuracy for every column of a correctness matrix.
+
+    Args:
+        correct (np.ndarray): (questions, models) correctness matrix.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level.
+        seed (int): Random seed.
+
+    Returns:
+        list[dict]: Accuracy and interval bounds per model.
+    """
+    correct = np.asarray(correct, dtype=bool).reshape(len(correct), -1)
+    samples = bootstrap_accuracy(correct, n_resamples, seed)
+    low, high = _interval(samples, confidence)
+    return [{"accuracy": round(float(acc), 4), "ci_low": round(float(lo), 4), "ci_high": round(float(hi), 4)}
+            for acc, lo, hi in zip(correct.mean(axis=0), low, high)]
+
+def wilson_interval(hits: int, n: int, confidence: float = 0.95) -> tuple[float, float]:
+    """
+    Wilson score interval of a proportion (well behaved for small n and accuracies near 0 or 1).
+
+    Args:
+        hits (int): Number of correct answers.
+        n (int): Number of answers.
+        confidence (float): Confidence level.
+
+    Returns:
+        tuple[float, float]: (lower, upper) bound; (0.0, 1.0) for n == 0.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = hits / n
+    denominator = 1 + z ** 2 / n
+    centre = (p + z ** 2 / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def mcnemar_test(correct_a: np.ndarray, correct_b: np.ndarray) -> dict[str, Any]:
+    """
+    McNemar test on paired correctness of two models. Uses the exact binomial test when
+    there are at most 25 discordant questions, otherwise the chi-square test with continuity correction.
+
+    Args:
+        correct_a (np.ndarray): Correctness of model A per question.
+        correct_b (np.ndarray): Correctness of model B on the same questions.
+
+    Returns:
+        dict: Discordant counts (only A correct, only B correct) and the two-sided p-value.
+    """
+    only_a = int(np.sum(correct_a & ~correct_b))
+    only_b = int(np.sum(~correct_a & correct_b))
+    discordant = only_a + only_b
+    if discordant == 0:
+        p_value = 1.0
+    elif discordant <= 25:
+        tail = sum(math.comb(discordant, k) for k in range(min(only_a, only_b) + 1)) / 2 ** discordant
+        p_value = min(1.0, 2 * tail)
+    else:
+        statistic = (abs(only_a - only_b) - 1) ** 2 / discordant
+        p_value = math.erfc(math.sqrt(statistic / 2))
+    return {"only_a": only_a, "only_b": only_b, "p_value": round(p_value, 6)}
+
+def paired_tests(models: list[str], correct: np.ndarray, n_resamples: int = 10000, confidence: float = 0.95,
+                 seed: int = 0) -> list[dict[str, Any]]:
+    """
+    Paired comparisons of all model pairs on a shared question set: accuracy difference with a
+    paired bootstrap interval and p-value (every pair uses the same resamples) and the McNemar test.
+
+    Args:
+        models (list[str]): Model names (columns of correct).
+        correct (np.ndarray): (questions, models) correctness matrix.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level.
+        seed (int): Random seed.
+
+    Returns:
+        list[dict]: One entry per model pair.
+    """
+    correct = np.asarray(correct, dtype=bool)
+    samples = bootstrap_accuracy(correct, n_resamples, seed)
+    observed = correct.mean(axis=0)
+    pairs = []
+    for i in range(len(models) - 1):
+        diffs = samples[:, i:i + 1] - samples[:, i + 1:]
+        low, high = _interval(diffs, confidence)
+        p_values = np.minimum(1.0, 2 * np.minimum((diffs <= 0).mean(axis=0), (diffs >= 0).mean(axis=0)))
+        for offset, j in enumerate(range(i + 1, len(models))):
+            pairs.append({
+                "model_a": models[i],
+                "model_b": models[j],
+                "accuracy_diff": round(float(observed[i] - observed[j]), 4),
+                "ci_low": round(float(low[offset]), 4),
+                "ci_high": round(float(high[offset]), 4),
+                "p_bootstrap": round(float(p_values[offset]), 6),
+                "mcnemar": mcnemar_test(correct[:, i], correct[:, j]),
+            })
+    return pairs
+
+def compare_models(answers: pd.DataFrame, n_resamples: int = 10000, confidence: float = 0.95,
+                   seed: int = 0) -> dict[str, Any]:
+    """
+    Significance report for scored answers of several models: bootstrap confidence intervals of
+    accuracy per model and per domain, and paired tests between all models. Everything is computed
+    on the questions answered by every model, so intervals and tests refer to the same question set.
+
+    Args:
+        answers (pd.DataFrame): Scored answers (see merger.merge_results).
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Number of shared questions, per-model intervals (with 'domeny') and pairwise tests.
+    """
+    models, matrix = correctness_matrix(answers)
+    correct = matrix[models].to_numpy()
+    report = {
+        "questions": len(matrix),
+        "n_resamples": n_resamples,
+        "confidence": confidence,
+        "models": {},
+        "pairs": paired_tests(models, correct, n_resamples, confidence, seed) if len(matrix) else [],
+    }
+    if not len(matrix):
+        return report
+
+    for model, interval in zip(models, bootstrap_ci(correct, n_resamples, confidence, seed)):
+        report["models"][model] = {**interval, "domeny": {}}
+    for domain, rows in matrix.groupby("domena"):
+        for model, interval in zip(models, bootstrap_ci(rows[models].to_numpy(), n_resamples, confidence, seed)):
+            report["models"][model]["domeny"][domain] = {**interval, "questions": len(rows)}
+    return report
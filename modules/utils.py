@@ -1,37 +1,79 @@
 import re
+from collections import Counter
 from typing import Tuple
 
 ANSWER_RE = re.compile(r'answer\s*:\s*\[?\s*([ABCD])\s*\]?', re.IGNORECASE)
 EXPL_RE   = re.compile(r'explanation\s*:\s*(.+)', re.IGNORECASE | re.DOTALL)
 
-def parse_output(raw_output: str) -> Tuple[str, str]:
+def parse_output(raw_output: str, require_explanation: bool = True) -> Tuple[str, str]:
     """
     Parse output. Succeed only if we have BOTH:
     - an answer letter A–D (explicit or fallback),
     - an Explanation: <text>.
     Otherwise return the standard parsing error tuple.
+    With require_explanation=False (answer-only prompts) the letter is enough and the
+    explanation is returned as an empty string when missing. Without the "Explanation:" marker
+    to anchor the output, the fallback accepts only an uppercase letter, so Polish prose
+    ("a", "i", "w") is not read as an answer.
     """
     try:
         # 1) answer: explicit "Answer: X" OR fallback standalone A–D
         m_answer = ANSWER_RE.search(raw_output)
         if not m_answer:
-            m_answer = re.search(r'\b([ABCD])\b', raw_output, flags=re.IGNORECASE)
+            m_answer = re.search(r'\b([ABCD])\b', raw_output,
+                                 flags=re.IGNORECASE if require_explanation else 0)
 
         # 2) explanation: must be an "Explanation: ..." section
         m_expl = EXPL_RE.search(raw_output)
 
         # 3) require BOTH; otherwise -> parsing error
-        if not m_answer or not m_expl:
+        if not m_answer or (require_explanation and not m_expl):
             return "Parsing error", "Exception during parsing."
 
         answer = m_answer.group(1).upper()
-        explanation = m_expl.group(1).strip()
+        explanation = m_expl.group(1).strip() if m_expl else ""
 
         return answer, explanation
 
     except Exception as e:
         print(f"Error parsing output: {e}")
         return ("Parsing error", "Exception during parsing.")
+
+def majority_vote(answers: list[str]) -> Tuple[str, float]:
+    """
+    Aggregates sampled answers by majority vote over valid letters A–D.
+    Ties are resolved in favour of the letter sampled first.
+
+    Args:
+        answers (list[str]): Answers of the individual samples (letters or error strings).
+
+    Returns:
+        Tuple[str, float]: (winning letter or "Parsing error" if no sample has a letter,
+            agreement rate = share of all samples that voted for the winner)
+    """
+    letters = [a for a in answers if a in ("A", "B", "C", "D")]
+    if not letters:
+        return "Parsing error", 0.0
+
+    counts = Counter(letters)
+    winner = max(counts, key=lambda letter: (counts[letter], -letters.index(letter)))
+    return winner, counts[winner] / len(answers)
+
+def aggregate_samples(parsed: list[Tuple[str, str]]) -> dict:
+    """
+    Aggregates parsed (answer, explanation) samples of one question.
+
+    Args:
+        parsed (list[Tuple[str, str]]): Parsed samples.
+
+    Returns:
+        dict: 'answer' (majority vote), 'explanation' (from the first sample agreeing
+            with the majority), 'samples' (per-sample answers) and 'agreement'.
+    """
+    letters = [answer for answer, _ in parsed]
+    answer, agreement = majority_vote(letters)
+    explanation = next((expl for letter, expl in parsed if letter == answer), "Exception during parsing.")
+    return {"answer": answer, "explanation": explanation, "samples": letters, "agreement": agreement}
     
 PROMPT_TEMPLATE = (
     """Wybierz poprawną odpowiedź spośród A, B, C i D. Uzasadnij krótko swój wybór.
@@ -51,20 +93,125 @@ PROMPT_TEMPLATE = (
     D: {D}
     """
 )
+
+# Two-stage evaluation: answer-only prompt of the first pass (a few output tokens per question)
+ANSWER_ONLY_TEMPLATE = (
+    """Wybierz poprawną odpowiedź spośród A, B, C i D.
+
+    Podaj wynik WYŁĄCZNIE w tym formacie, bez uzasadnienia:
+    Answer: [A/B/C/D]
+
+    Pytanie: {question}
+    A: {A}
+    B: {B}
+    C: {C}
+    D: {D}
+    """
+)
+
+# Two-stage evaluation: second pass asking to justify the answer given in the first pass
+EXPLANATION_TEMPLATE = (
+    """Na poniższe pytanie wybrano odpowiedź {answer}. Uzasadnij krótko ten wybór.
+
+    Podaj wynik WYŁĄCZNIE w tym formacie:
+    Answer: {answer}
+    Explanation: [krótka przyczyna]
+
+    Pytanie: {question}
+    A: {A}
+    B: {B}
+    C: {C}
+    D: {D}
+    """
+)
     
-def build_prompt(row) -> str:
+# Compact wording (no example block): fewer prompt tokens per question
+COMPACT_TEMPLATE = (
+    """Wybierz poprawną odpowiedź (A, B, C lub D) i krótko ją uzasadnij. Odpowiedz WYŁĄCZNIE w formacie:
+    Answer: [A/B/C/D]
+    Explanation: [krótka przyczyna]
+
+    Pytanie: {question}
+    A: {A}
+    B: {B}
+    C: {C}
+    D: {D}
+    """
+)
+
+COMPACT_ANSWER_ONLY_TEMPLATE = (
+    """Wybierz poprawną odpowiedź (A, B, C lub D). Odpowiedz WYŁĄCZNIE w formacie, bez uzasadnienia:
+    Answer: [A/B/C/D]
+
+    Pytanie: {question}
+    A: {A}
+    B: {B}
+    C: {C}
+    D: {D}
+    """
+)
+
+# Named, versioned prompt templates (--prompt). A template id names one exact wording and
+# normalisation; change the wording under a new id so that results stay comparable.
+# 'pl-v1' reproduces the original prompts verbatim, including the source indentation.
+PROMPT_TEMPLATES = {
+    "pl-v1": {"question": PROMPT_TEMPLATE, "answer_only": ANSWER_ONLY_TEMPLATE,
+              "explanation": EXPLANATION_TEMPLATE, "normalize": False},
+    "pl-v2": {"question": PROMPT_TEMPLATE, "answer_only": ANSWER_ONLY_TEMPLATE,
+              "explanation": EXPLANATION_TEMPLATE, "normalize": True},
+    "pl-compact-v1": {"question": COMPACT_TEMPLATE, "answer_only": COMPACT_ANSWER_ONLY_TEMPLATE,
+                      "explanation": EXPLANATION_TEMPLATE, "normalize": True},
+}
+DEFAULT_PROMPT = "pl-v1"
+
+def normalize_prompt(text: str) -> str:
+    """
+    Strips needless whitespace from a rendered prompt: leading and trailing spaces of every line,
+    repeated spaces within a line, repeated blank lines and blank lines at both ends.
+    """
+    lines = [" ".join(line.split()) for line in text.strip().splitlines()]
+    return re.sub(r'\n{3,}', '\n\n', "\n".join(lines))
+
+def get_prompt_template(prompt_id: str) -> dict:
+    """
+    Returns a registered prompt template (see PROMPT_TEMPLATES).
+
+    Raises:
+        ValueError: If the template id is not registered.
+    """
+    if prompt_id not in PROMPT_TEMPLATES:
+        raise ValueError(f"Unknown prompt template: {prompt_id} (available: {', '.join(PROMPT_TEMPLATES)})")
+    return PROMPT_TEMPLATES[prompt_id]
+
+def _render(prompt_id: str, kind: str, **fields) -> str:
+    template = get_prompt_template(prompt_id)
+    text = template[kind].format(**fields)
+    return normalize_prompt(text) if template["normalize"] else text
+
+def build_prompt(row, answer_only: bool = False, prompt_id: str = DEFAULT_PROMPT) -> str:
     """Builds a prompt for the model from a DataFrame row.
         
     Args:
         row (pd.Series): A row from the DataFrame with columns 'Pytanie', 'A', 'B', 'C', 'D'.
+        answer_only (bool): Use the answer-only template (first pass of two-stage evaluation).
+        prompt_id (str): Prompt template id (see PROMPT_TEMPLATES).
             
     Returns:
        str: Formatted prompt string.
     """
-    return PROMPT_TEMPLATE.format(
-         question=row['Pytanie'],
-         A=row['A'],
-         B=row['B'],
-         C=row['C'],
-         D=row['D']                                                                       
-    )
\ No newline at end of file
+    return _render(prompt_id, "answer_only" if answer_only else "question",
+                   question=row['Pytanie'], A=row['A'], B=row['B'], C=row['C'], D=row['D'])
+
+def build_explanation_prompt(row, answer: str, prompt_id: str = DEFAULT_PROMPT) -> str:
+    """Builds the prompt asking the model to justify a given answer letter (second pass of two-stage evaluation).
+
+    Args:
+        row (pd.Series): A row from the DataFrame with columns 'Pytanie', 'A', 'B', 'C', 'D'.
+        answer (str): Answer letter chosen in the first pass.
+        prompt_id (str): Prompt template id (see PROMPT_TEMPLATES).
+
+    Returns:
+       str: Formatted prompt string.
+    """
+    return _render(prompt_id, "explanation", answer=answer, question=row['Pytanie'],
+                   A=row['A'], B=row['B'], C=row['C'], D=row['D'])
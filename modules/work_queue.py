@@ -0,0 +1,223 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+from typing import Any, Optional
+
+# Default lease of a claimed batch; a worker that does not finish (or renew) in time loses it
+# and the batch is handed to another worker.
+DEFAULT_LEASE_S = 300.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    labels TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stats TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    label TEXT PRIMARY KEY,
+    batch_ref INTEGER NOT NULL REFERENCES batches(id),
+    worker TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    batch_ref INTEGER NOT NULL REFERENCES batches(id),
+    worker TEXT,
+    stats TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batches_status ON batches(status, lease_expires);
+"""
+
+def worker_name() -> str:
+    """Returns an identifier of this worker process (host:pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def open_queue(path: str, timeout: float = 60.0) -> sqlite3.Connection:
+    """
+    Opens (and creates if needed) a work queue database. The rollback journal is used instead of
+    WAL, because WAL needs shared memory and does not work for workers on other hosts sharing
+    the file over a network filesystem; writers are serialised by SQLite's file lock.
+
+    Args:
+        path (str): Queue file path.
+        timeout (float): Seconds to wait for the file lock.
+
+    Returns:
+        sqlite3.Connection: Connection in autocommit mode (transactions are explicit).
+    """
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _encode_label(label) -> str:
+    """Encodes a dataset index label as text (JSON keeps ints and strings apart)."""
+    return json.dumps(label.item() if hasattr(label, "item") else label)
+
+def create_queue(conn: sqlite3.Connection, labels: list, batch_size: int, meta: Optional[dict[str, Any]] = None) -> int:
+    """
+    Fills an empty queue with question batches. A queue that already has batches is kept as is,
+    so restarting the coordinator resumes the run.
+
+    Args:
+        conn (sqlite3.Connection): Queue connection.
+        labels (list): Dataset index labels of all questions.
+        batch_size (int): Questions per batch.
+        meta (dict): Run information stored in the queue (e.g. dataset hash, model).
+
+    Returns:
+        int: Number of batches in the queue.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        existing = conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+        if not existing:
+            encoded = [_encode_label(label) for label in labels]
+            conn.executemany("INSERT INTO batches (labels) VALUES (?)",
+                             [(json.dumps(encoded[i:i + batch_size]),) for i in range(0, len(encoded), batch_size)])
+            for key, value in (meta or {}).items():
+                conn.execute("INSERT OR REPLACE INTO queue_meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+
+def queue_meta(conn: sqlite3.Connection) -> dict[str, Any]:
+    """Returns the run information stored in the queue."""
+    return {row["key"]: json.loads(row["value"]) for row in conn.execute("SELECT key, value FROM queue_meta")}
+
+def claim_batch(conn: sqlite3.Connection, worker: str, lease_s: float = DEFAULT_LEASE_S) -> Optional[tuple[int, list]]:
+    """
+    Claims the next pending batch, or a batch whose lease expired (its worker crashed or stalled).
+
+    Args:
+        conn (sqlite3.Connection): Queue connection.
+        worker (str): Worker identifier.
+        lease_s (float): Lease duration in seconds.
+
+    Returns:
+        tuple | None: (batch id, dataset index labels) or None if nothing is claimable right now.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, labels FROM batches WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+            "ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE batches SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, now + lease_s, row["id"]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    return row["id"], [json.loads(label) for label in json.loads(row["labels"])]
+
+def renew_lease(conn: sqlite3.Connection, batch_id: int, worker: str, lease_s: float = DEFAULT_LEASE_S) -> bool:
+    """Extends the lease of a batch still held by the worker. Returns False if the lease was lost."""
+    cursor = conn.execute("UPDATE batches SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                          (time.time() + lease_s, batch_id, worker))
+    return cursor.rowcount == 1
+
+def complete_batch(conn: sqlite3.Connection, batch_id: int, worker: str, records: list[dict[str, Any]],
+                   stats: Optional[dict[str, Any]] = None) -> bool:
+    """
+    Writes the answers of a batch and marks it done, provided the worker still holds its lease.
+    A stale completion (the batch was reclaimed by another worker) writes no answers, so the
+    results come from the current holder; its usage is still recorded (see abandon_batch).
+
+    Args:
+        conn (sqlite3.Connection): Queue connection.
+        batch_id (int): Batch id.
+        worker (str): Worker identifier.
+        records (list[dict]): Result records (see benchmark_test_llm_main.build_record).
+        stats (dict): Numeric backend statistics of the batch (tokens, timings, ...).
+
+    Returns:
+        bool: True if the batch was completed, False if the worker no longer held its lease.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute("UPDATE batches SET status = 'done', lease_expires = NULL, stats = ? "
+                              "WHERE id = ? AND worker = ? AND status = 'leased'",
+                              (json.dumps(stats or {}), batch_id, worker))
+        if cursor.rowcount != 1:
+            abandon_batch(conn, batch_id, worker, stats)
+            conn.execute("COMMIT")
+            return False
+        conn.executemany(
+            "INSERT OR REPLACE INTO answers (label, batch_ref, worker, record) VALUES (?, ?, ?, ?)",
+            [(_encode_label(record["numer"]), batch_id, worker, json.dumps(record, ensure_ascii=False, default=str))
+             for record in records],
+        )
+        conn.execute("INSERT INTO usage (batch_ref, worker, stats) VALUES (?, ?, ?)",
+                     (batch_id, worker, json.dumps(stats or {})))
+        conn.execute("COMMIT")
+        return True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def abandon_batch(conn: sqlite3.Connection, batch_id: int, worker: str, stats: Optional[dict[str, Any]] = None) -> None:
+    """
+    Records the usage of a batch the worker stopped answering after losing its lease
+    (the batch itself stays with the worker that reclaimed it).
+
+    Args:
+        conn (sqlite3.Connection): Queue connection.
+        batch_id (int): Batch id.
+        worker (str): Worker identifier.
+        stats (dict): Numeric backend statistics of the answered part of the batch.
+    """
+    conn.execute("INSERT INTO usage (batch_ref, worker, stats) VALUES (?, ?, ?)",
+                 (batch_id, worker, json.dumps(stats or {})))
+
+def queue_usage(conn: sqlite3.Connection) -> dict[str, float]:
+    """
+    Returns the summed numeric backend statistics of every batch attempt recorded by the workers
+    (completed and abandoned), i.e. the run-wide usage used for the budget checks.
+    """
+    totals = {}
+    for row in conn.execute("SELECT stats FROM usage"):
+        for key, value in json.loads(row["stats"]).items():
+            if isinstance(value, (int, float)):
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+def queue_progress(conn: sqlite3.Connection) -> dict[str, Any]:
+    """Returns batch counts per status, the number of answers, workers and reclaimed batches."""
+    counts = {row["status"]: row["n"] for row in conn.execute("SELECT status, COUNT(*) AS n FROM batches GROUP BY status")}
+    return {
+        "batches": sum(counts.values()),
+        "pending": counts.get("pending", 0),
+        "leased": counts.get("leased", 0),
+        "done": counts.get("done", 0),
+        "answers": conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0],
+        "workers": conn.execute("SELECT COUNT(DISTINCT worker) FROM answers").fetchone()[0],
+        "reclaimed_batches": conn.execute("SELECT COUNT(*) FROM batches WHERE attempts > 1").fetchone()[0],
+    }
+
+def collect_results(conn: sqlite3.Connection) -> tuple[list[dict[str, Any]], dict[str, float]]:
+    """
+    Returns all answers written by workers (ordered by question number) and the summed
+    numeric backend statistics of all batch attempts (see queue_usage).
+    """
+    records = [json.loads(row["record"]) for row in conn.execute("SELECT record FROM answers")]
+    records.sort(key=lambda record: record["numer"])
+    return records, queue_usage(conn)
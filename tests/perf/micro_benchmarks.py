@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+import pandas as pd
+from modules.dataset_loader import load_dataset
+from modules.response_saver import save_raw_results
+from modules.scorer import evaluate_answer, count_evaluation_labels
+from modules.utils import parse_output, build_prompt
+
+# Micro-benchmarks of the pure-Python hot paths. Not collected by pytest (run it explicitly):
+#   python -m tests.perf.micro_benchmarks run --output tests/perf/baseline.json
+#   python -m tests.perf.micro_benchmarks compare --baseline tests/perf/baseline.json
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# differences below this many seconds are treated as timer noise, whatever the ratio
+MIN_DELTA_S = 0.001
+
+LETTERS = ("A", "B", "C", "D")
+
+def make_dataset(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a synthetic dataset with the columns of the real question bank."""
+    rng = random.Random(seed)
+    return pd.DataFrame([{
+        "Lp": i + 1,
+        "Pytanie": f"W jakim regionie Polski kultywowany jest zwyczaj numer {i}, opisany w źródłach etnograficznych?",
+        "Odpowiedź": f"Region {i % 16}",
+        "Pozycja": rng.choice(LETTERS),
+        "A": f"Podhale {i}", "B": f"Kaszuby {i}", "C": f"Kurpie {i}", "D": f"Śląsk Cieszyński {i}",
+        "Domena": rng.choice(("Etnologia", "Kulinaria", "Muzyka")),
+        "Kategoria": rng.choice(("Historia", "Kultura", "Obrzędy", "Wypieki")),
+        "Tagi": None if i % 3 else "folklor",
+    } for i in range(rows)])
+
+def make_outputs(n: int, seed: int = 0) -> list[str]:
+    """Realistic model outputs: well-formed, bracketed, lower-case, with preambles and parsing failures."""
+    rng = random.Random(seed)
+    templates = [
+        "Answer: {l}\nExplanation: Zwyczaj ten opisywany jest w literaturze etnograficznej regionu.",
+        "Answer: [{l}]\nExplanation: Krótko dlaczego {l}.",
+        "answer:{l}\nexplanation: " + "uzasadnienie " * 40,
+        "Oto moja odpowiedź.\n\nAnswer: {l}\nExplanation: Tak podają źródła.\nDodatkowe uwagi: brak.",
+        "Odpowiedź {l} jest poprawna, ponieważ tak podają źródła.",
+        "Nie jestem pewien, ale wydaje mi się, że chodzi o region górski.",
+    ]
+    return [rng.choice(templates).format(l=rng.choice(LETTERS)) for _ in range(n)]
+
+def make_adversarial_outputs() -> list[str]:
+    """Long and pathological outputs: no markers, repeated markers, long letter runs, huge explanations."""
+    return [
+        "x" * 50_000,
+        "Answer: " * 5_000,
+        "A B C D " * 5_000,
+        "Explanation: " + "bardzo długie uzasadnienie " * 5_000,
+        ("Answer:\n" + " " * 1_000) * 50 + "Explanation:",
+        "ABCD" * 10_000,
+        "\n" * 20_000 + "Answer: D\nExplanation: na końcu",
+    ]
+
+def make_results(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Raw result records as written by the runner."""
+    rng = random.Random(seed)
+    return [{
+        "numer": i,
+        "pytanie": f"Pytanie numer {i} o zwyczaje ludowe?",
+        "poprawna": rng.choice(LETTERS),
+        "odpowiedź": rng.choice(LETTERS + ("Parsing error",)),
+        "uzasadnienie": "Zwyczaj ten opisywany jest w literaturze etnograficznej regionu. " * 3,
+        "meta": {"domena": "Etnologia", "kategoria": "Historia", "tagi": None, "czas_s": 1.234, "tokeny": 87},
+    } for i in range(n)]
+
+def build_cases(workdir: str, scale: float = 1.0) -> dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]]:
+    """
+    Returns the benchmark cases: name -> (setup, function). setup() prepares the input outside
+    the timed region (fixtures are written to workdir) and function(input) is timed.
+
+    Args:
+        workdir (str): Directory for generated fixture files.
+        scale (float): Multiplier of input sizes (e.g. 0.1 for a quick run).
+    """
+    def size(n: int) -> int:
+        return max(int(n * scale), 1)
+
+    def dataset_file(rows: int, extension: str) -> Callable[[], str]:
+        def setup():
+            path = os.path.join(workdir, f"dataset_{rows}.{extension}")
+            if not os.path.exists(path):
+                frame = make_dataset(rows)
+                frame.to_csv(path, index=False) if extension == "csv" else frame.to_excel(path, index=False)
+            return path
+        return setup
+
+    def labelled(n: int) -> Callable[[], list]:
+        def setup():
+            results = make_results(n)
+            return [{"question_id": r["numer"], "label": evaluate_answer(r["odpowiedź"], r["poprawna"])} for r in results]
+        return setup
+
+    def save_setup(n: int, extension: str) -> Callable[[], tuple]:
+        return lambda: (make_results(n), os.path.join(workdir, f"results_{n}.{extension}"))
+
+    return {
+        "parse_output/realistic_10k": (lambda: make_outputs(size(10_000)),
+                                       lambda outputs: [parse_output(o) for o in outputs]),
+        "parse_output/adversarial": (make_adversarial_outputs,
+                                     lambda outputs: [parse_output(o) for o in outputs]),
+        "build_prompt/10k_rows": (lambda: make_dataset(size(10_000)),
+                                  lambda frame: [build_prompt(row) for _, row in frame.iterrows()]),
+        "load_dataset/csv_10k": (dataset_file(size(10_000), "csv"), load_dataset),
+        "load_dataset/csv_100k": (dataset_file(size(100_000), "csv"), load_dataset),
+        "load_dataset/xlsx_10k": (dataset_file(size(10_000), "xlsx"), load_dataset),
+        "save_raw_results/json_1k": (save_setup(size(1_000), "json"), lambda args: save_raw_results(*args)),
+        "save_raw_results/json_10k": (save_setup(size(10_000), "json"), lambda args: save_raw_results(*args)),
+        "save_raw_results/parquet_10k": (save_setup(size(10_000), "parquet"), lambda args: save_raw_results(*args)),
+        "evaluate_answer/100k": (lambda: [(r["odpowiedź"], r["poprawna"]) for r in make_results(size(100_000))],
+                                 lambda pairs: [evaluate_answer(a, c) for a, c in pairs]),
+        "count_evaluation_labels/100k": (labelled(size(100_000)), count_evaluation_labels),
+    }
+
+def time_case(setup: Callable[[], Any], function: Callable[[Any], Any], repeat: int = 5) -> dict[str, Any]:
+    """Times function(setup()) 'repeat' times (after one warm-up call) and returns min/median/max in seconds."""
+    data = setup()
+    function(data)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - start)
+    return {
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "max_s": round(max(timings), 6),
+        "repeat": repeat,
+    }
+
+def run_suite(selected: str = "", repeat: int = 5, scale: float = 1.0) -> dict[str, Any]:
+    """
+    Runs the benchmark cases whose name contains 'selected'.
+
+    Returns:
+        dict: 'meta' (environment, scale) and 'results' (case name -> timings).
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (setup, function) in build_cases(workdir, scale).items():
+            if selected not in name:
+                continue
+            results[name] = time_case(setup, function, repeat)
+            print(f"{name:<32} min {results[name]['min_s'] * 1000:10.2f} ms   median {results[name]['median_s'] * 1000:10.2f} ms")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "scale": scale,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare_results(current: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+                    min_delta_s: float = MIN_DELTA_S) -> list[dict[str, Any]]:
+    """
+    Compares the fastest timings (min_s, the least noisy statistic) of the cases present in both runs.
+
+    Args:
+        current (dict): Current run (see run_suite).
+        baseline (dict): Baseline run.
+        threshold (float): Allowed relative slowdown (0.25 = 25%).
+        min_delta_s (float): Absolute slowdown ignored as noise.
+
+    Returns:
+        list[dict]: One entry per common case with 'name', 'baseline_s', 'current_s', 'ratio' and 'regression'.
+    """
+    if current["meta"].get("scale") != baseline["meta"].get("scale"):
+        raise ValueError(f"Runs use different input scales: {current['meta'].get('scale')} "
+                         f"and {baseline['meta'].get('scale')}")
+    rows = []
+    for name, timing in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name]["min_s"], timing["min_s"]
+        ratio = after / before if before else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_s": before,
+            "current_s": after,
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and after - before > min_delta_s,
+        })
+    return rows
+
+def main():
+    """ Runs the micro-benchmarks, stores them as a JSON baseline or compares them with one."""
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the benchmark's pure-Python hot paths")
+    parser.add_argument("command", choices=["run", "compare"], help="run: time and save; compare: time and check against a baseline")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for the timings (run: default baseline path)")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline JSON file (compare)")
+    parser.add_argument("--current", type=str, default=None, help="Compare an already saved run instead of timing now")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--filter", type=str, default="", help="Run only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case")
+    parser.add_argument("--scale", type=float, default=1.0, help="Input size multiplier (e.g. 0.1 for a quick run)")
+    args = parser.parse_args()
+
+    if args.command == "compare" and args.current:
+        with open(args.current, encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.filter, args.repeat, args.scale)
+
+    if args.command == "run":
+        output = args.output or DEFAULT_BASELINE
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Timings saved to {output}")
+        return
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare_results(current, baseline, args.threshold)
+    for row in rows:
+        flag = "SLOWER" if row["regression"] else "ok"
+        print(f"{row['name']:<32} {row['baseline_s'] * 1000:10.2f} ms -> {row['current_s'] * 1000:10.2f} ms "
+              f"(x{row['ratio']:.2f}) {flag}")
+    regressions = [row["name"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from modules.adaptive import stratified_order, stop_reason, adaptive_summary
+
+def make_dataset(sizes):
+    """Builds a dataset with the given number of questions per (Domena, Kategoria) stratum."""
+    rows = []
+    for (domain, category), size in sizes.items():
+        rows += [{"Pytanie": f"{category} {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A",
+                  "Domena": domain, "Kategoria": category, "Tagi": None} for i in range(size)]
+    return pd.DataFrame(rows)
+
+def test_stratified_order_is_a_reproducible_proportional_permutation():
+    """ Tests that the order covers every question once, depends on the seed and keeps strata proportions in prefixes."""
+    data = make_dataset({("Etnologia", "Historia"): 60, ("Etnologia", "Kultura"): 30, ("Kulinaria", "Wypieki"): 10})
+
+    order = stratified_order(data, seed=3)
+
+    assert sorted(order) == list(data.index)
+    assert order == stratified_order(data, seed=3)
+    assert order != stratified_order(data, seed=4)
+    prefix = Counter(data.loc[order[:20], "Kategoria"])
+    assert prefix == {"Historia": 12, "Kultura": 6, "Wypieki": 2}
+
+def test_stop_reason():
+    """ Tests stopping on interval width (after the minimum), on budget, and continuing otherwise."""
+    assert stop_reason(5, 10, target_width=0.1, max_questions=100) is None
+    assert stop_reason(0, 40, target_width=0.1, max_questions=100) == "ci_width"
+    assert stop_reason(0, 40, target_width=0.1, max_questions=100, min_questions=50) is None
+    assert stop_reason(20, 40, target_width=0.1, max_questions=40) == "budget"
+
+def test_adaptive_summary():
+    """ Tests the adaptive run summary."""
+    summary = adaptive_summary(30, 40, 200, "ci_width", 0.3)
+
+    assert summary["questions_used"] == 40
+    assert summary["questions_available"] == 200
+    assert summary["accuracy"] == 0.75
+    assert summary["ci_low"] < 0.75 < summary["ci_high"]
+    assert adaptive_summary(0, 0, 200, None, 0.1)["stop_reason"] == "exhausted"
+
+def test_run_adaptive_stops_early(tmp_path):
+    """ Tests that the runner stops once a model answering always correctly has a narrow enough interval."""
+    from benchmark_test_llm_main import run_adaptive
+
+    data = make_dataset({("Etnologia", "Historia"): 150, ("Etnologia", "Kultura"): 50})
+    args = SimpleNamespace(seed=0, ci_width=0.1, max_questions=None, min_questions=30, interval=0, llm="m", llm_name="m",
+                           results=str(tmp_path / "adaptive_raw.json"))
+    results = []
+
+    with patch("benchmark_test_llm_main.ask_model", return_value=("A", "x")) as ask:
+        summary = run_adaptive(data, {"api": "local"}, args, results, {}, 0.0)
+
+    assert summary["stop_reason"] == "ci_width"
+    assert summary["questions_used"] == len(results) == ask.call_count < 200
+    assert summary["accuracy"] == 1.0
+
+def test_resume_of_an_adaptive_run_is_rejected(capsys):
+    """ Tests that --resume refuses an adaptive run instead of asking the remaining questions out of the stratified order."""
+    from benchmark_test_llm_main import main
+
+    argv = ["benchmark_test_llm_main.py", "--llm", "m", "--llm_name", "m", "--api", "openAI",
+            "--test", "input.csv", "--results", "raw.json", "--adaptive", "--resume"]
+    with patch.object(sys, "argv", argv), patch("benchmark_test_llm_main.load_dataset") as load, \
+            pytest.raises(SystemExit):
+        main()
+    load.assert_not_called()
+    assert "--resume cannot continue an --adaptive run" in capsys.readouterr().err
@@ -1,6 +1,9 @@
+import time
 import pytest
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
-from modules.api_backend import run_api_model
+from modules.api_backend import run_api_model, hedge_delay, _may_hedge, _get_executor
 
 @patch("modules.api_backend.parse_output", return_value = ("B", "openai explanation"))
 @patch("modules.api_backend.OpenAI")
@@ -60,6 +63,25 @@ def test_run_api_model_openai_uses_max_new_tokens(mock_openai, _):
     _, kwargs = mc.chat.completions.create.call_args
     
     assert kwargs["max_tokens"] == 77
+    assert "temperature" not in kwargs
+
+@patch("modules.api_backend.genai.GenerativeModel")
+@patch("modules.api_backend.genai.configure")
+@patch("modules.api_backend.OpenAI")
+def test_run_api_model_passes_sampling_settings(mock_openai, _, mock_model):
+    """ Test that temperature and top_p (self-consistency) reach both API clients."""
+    mock_openai.return_value.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content="Answer: B\nExplanation: b"))]
+    mock_model.return_value.generate_content.return_value.text = "Answer: C\nExplanation: c"
+    sampling = {"temperature": 0.7, "top_p": 0.95}
+
+    run_api_model("p", {"api": "openAI", "model_id": "gpt-4o", "api_key": "x", **sampling})
+    run_api_model("p", {"api": "google", "model_id": "gemini-1.5-pro", "api_key": "g", "max_new_tokens": 64, **sampling})
+
+    _, kwargs = mock_openai.return_value.chat.completions.create.call_args
+    assert (kwargs["temperature"], kwargs["top_p"]) == (0.7, 0.95)
+    mock_model.return_value.generate_content.assert_called_once_with(
+        "p", generation_config={"max_output_tokens": 64, "temperature": 0.7, "top_p": 0.95})
 
 @patch("modules.api_backend.parse_output", return_value=("C", "google"))
 @patch("modules.api_backend.genai.GenerativeModel")
@@ -112,3 +134,142 @@ def test_run_api_model_missing_model_id():
     with pytest.raises(KeyError):
         run_api_model("prompt", config)
 
+
+# -------------------------------
+# TEST: Deadlines and hedged requests
+# -------------------------------
+
+@patch("modules.api_backend.OpenAI")
+def test_run_api_model_passes_timeout_to_clients(mock_openai):
+    """ Test that a configured deadline is passed to the OpenAI client and to Google requests."""
+    mock_openai.return_value.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content="Answer: B\nExplanation: b"))]
+    assert run_api_model("p", {"api": "openAI", "model_id": "gpt-4o", "api_key": "x", "timeout": 7}) == ("B", "b")
+    assert mock_openai.call_args.kwargs["timeout"] == 7.0
+
+    with patch("modules.api_backend.genai.configure"), patch("modules.api_backend.genai.GenerativeModel") as mock_model:
+        mock_model.return_value.generate_content.return_value.text = "Answer: C\nExplanation: c"
+        run_api_model("p", {"api": "google", "model_id": "gemini", "api_key": "g", "max_new_tokens": 8, "timeout": 3})
+        mock_model.return_value.generate_content.assert_called_once_with(
+            "p", generation_config={"max_output_tokens": 8}, request_options={"timeout": 3.0})
+
+def test_run_api_model_deadline_returns_generation_error():
+    """ Test that a stuck request is abandoned at the deadline instead of blocking the run."""
+    def stuck(*_):
+        time.sleep(2)
+        return "Answer: A\nExplanation: late", {}
+
+    with patch("modules.api_backend._call_openai", side_effect=stuck):
+        start = time.perf_counter()
+        answer, _ = run_api_model("p", {"api": "openAI", "model_id": "gpt-4o", "timeout": 0.2})
+
+    assert answer == "Generation error"
+    assert time.perf_counter() - start < 1
+
+def test_run_api_model_hedged_request_wins():
+    """ Test that a duplicate request is sent after the hedging delay and the faster answer is used."""
+    calls = []
+
+    def slow_then_fast(*_):
+        calls.append(1)
+        first = len(calls) == 1
+        time.sleep(1.0 if first else 0.01)
+        return ("Answer: A\nExplanation: first" if first else "Answer: D\nExplanation: hedge"), {}
+
+    call_info = {}
+    cfg = {"api": "openAI", "model_id": "gpt-4o", "hedge": True, "hedge_delay_s": 0.1, "hedge_budget": 1.0,
+           "timeout": 5, "call_info": call_info}
+    with patch("modules.api_backend._call_openai", side_effect=slow_then_fast), \
+            patch.dict("modules.api_backend._hedge_stats", {"requests": 0, "hedged": 0}):
+        start = time.perf_counter()
+        answer, _ = run_api_model("p", cfg)
+
+    assert answer == "D"
+    assert time.perf_counter() - start < 0.8
+    assert call_info["hedged_requests"] == 1 and call_info["hedge_wins"] == 1
+
+def test_deadline_starts_when_the_request_runs():
+    """ Test that time spent queued behind other requests in the executor does not count against the deadline."""
+    def quick(*_):
+        time.sleep(0.05)
+        return "Answer: B\nExplanation: b", {}
+
+    busy = ThreadPoolExecutor(max_workers=1)
+    busy.submit(time.sleep, 0.5)
+    with patch("modules.api_backend._executor", busy), patch("modules.api_backend._executor_size", 64), \
+            patch("modules.api_backend._call_openai", side_effect=quick):
+        answer, _ = run_api_model("p", {"api": "openAI", "model_id": "gpt-4o", "timeout": 0.3})
+    busy.shutdown()
+
+    assert answer == "B"
+
+def test_request_threads_follow_concurrency():
+    """ Test that the request executor grows to two threads per concurrent question."""
+    with patch("modules.api_backend._executor", ThreadPoolExecutor(max_workers=8)), \
+            patch("modules.api_backend._executor_size", 8):
+        assert _get_executor({"concurrency": 2})._max_workers == 8
+        assert _get_executor({"concurrency": 16})._max_workers == 32
+        assert _get_executor({})._max_workers == 32
+
+def test_usage_of_a_losing_hedge_is_counted():
+    """ Test that the hedged request that lost the race is still counted once it finishes."""
+    calls = []
+
+    def slow_then_fast(*_):
+        calls.append(1)
+        first = len(calls) == 1
+        time.sleep(0.3 if first else 0.01)
+        return "Answer: D\nExplanation: d", {"prompt_tokens": 100, "completion_tokens": 10 if first else 5}
+
+    cfg = {"api": "openAI", "model_id": "gpt-4o", "hedge": True, "hedge_delay_s": 0.05, "hedge_budget": 1.0}
+    first_info, second_info = {}, {}
+    with patch("modules.api_backend._call_openai", side_effect=slow_then_fast), \
+            patch.dict("modules.api_backend._hedge_stats", {"requests": 0, "hedged": 0}), \
+            patch.dict("modules.api_backend._late_usage", {}, clear=True):
+        run_api_model("p", {**cfg, "call_info": first_info})
+        time.sleep(0.5)
+        run_api_model("p", {**cfg, "hedge": False, "call_info": second_info})
+
+    assert (first_info["prompt_tokens"], first_info["completion_tokens"]) == (100, 5)
+    assert (second_info["prompt_tokens"], second_info["completion_tokens"]) == (200, 15)
+
+def test_hedging_respects_budget_and_needs_observations():
+    """ Test that no duplicate is sent without enough latency observations or when the budget is used up."""
+    with patch("modules.api_backend._latencies", deque([0.1] * 5)):
+        assert hedge_delay({"hedge": True}) is None
+    with patch("modules.api_backend._latencies", deque([i / 100 for i in range(1, 101)])):
+        assert hedge_delay({"hedge": True}) == 0.96
+    with patch.dict("modules.api_backend._hedge_stats", {"requests": 10, "hedged": 0}):
+        assert _may_hedge({"hedge_budget": 0.05}) is False
+        assert _may_hedge({"hedge_budget": 0.1}) is True
+        assert _may_hedge({"hedge_budget": 0.1}) is False
+
+
+# -------------------------------
+# TEST: Token usage
+# -------------------------------
+
+@patch("modules.api_backend.OpenAI")
+def test_run_api_model_reports_openai_usage(mock_openai):
+    """ Test that prompt and completion tokens from the OpenAI 'usage' block end up in call_info with the raw output."""
+    response = mock_openai.return_value.chat.completions.create.return_value
+    response.choices = [MagicMock(message=MagicMock(content="Answer: B\nExplanation: b"))]
+    response.usage = MagicMock(prompt_tokens=120, completion_tokens=15)
+    call_info = {}
+
+    run_api_model("p", {"api": "openAI", "model_id": "gpt-4o", "api_key": "x", "call_info": call_info})
+
+    assert call_info == {"prompt_tokens": 120, "completion_tokens": 15, "raw_output": "Answer: B\nExplanation: b"}
+
+@patch("modules.api_backend.genai.GenerativeModel")
+@patch("modules.api_backend.genai.configure")
+def test_run_api_model_reports_google_usage(_, mock_model):
+    """ Test that Gemini usage metadata is reported as prompt and completion tokens."""
+    response = mock_model.return_value.generate_content.return_value
+    response.text = "Answer: C\nExplanation: c"
+    response.usage_metadata = MagicMock(prompt_token_count=90, candidates_token_count=7)
+    call_info = {}
+
+    run_api_model("p", {"api": "google", "model_id": "gemini-1.5-pro", "api_key": "g", "call_info": call_info})
+
+    assert call_info == {"prompt_tokens": 90, "completion_tokens": 7, "raw_output": "Answer: C\nExplanation: c"}
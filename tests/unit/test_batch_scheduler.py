@@ -0,0 +1,106 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+import pytest
+from modules.batch_scheduler import MicroBatchScheduler
+
+class FakePipe:
+    """Pipeline stand-in that echoes prompts and records the size of every generate call."""
+
+    def __init__(self, fail: bool = False, lock=None):
+        self.tokenizer = MagicMock(pad_token="<pad>")
+        self.calls = []
+        self.fail = fail
+        self.lock = lock
+        self.lock_held = []
+
+    def __call__(self, prompts, **kwargs):
+        self.calls.append((list(prompts), kwargs))
+        if self.lock is not None:
+            self.lock_held.append(self.lock.locked())
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return [[{"generated_text": f" out:{prompt} "}] for prompt in prompts]
+
+def test_concurrent_requests_are_batched_and_routed_back():
+    """ Tests that requests of many threads share padded generate calls and every caller gets its own output."""
+    pipe = FakePipe()
+    scheduler = MicroBatchScheduler(pipe, max_batch_size=4, max_wait_s=0.2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(lambda i: scheduler.generate(f"p{i}", 16), range(8)))
+    scheduler.close()
+
+    assert [text for text, _ in outputs] == [f"out:p{i}" for i in range(8)]
+    assert all(len(prompts) <= 4 for prompts, _ in pipe.calls)
+    assert len(pipe.calls) < 8
+    assert scheduler.requests == 8 and sum(info["batch_size"] == 4 for _, info in outputs) >= 4
+    assert pipe.calls[0][1]["do_sample"] is False and pipe.calls[0][1]["max_new_tokens"] == 16
+
+def test_requests_with_different_settings_are_not_mixed():
+    """ Tests that requests with a different token limit go to a separate batch."""
+    pipe = FakePipe()
+    scheduler = MicroBatchScheduler(pipe, max_batch_size=8, max_wait_s=0.2)
+
+    futures = [scheduler.submit("a", 16), scheduler.submit("b", 4), scheduler.submit("c", 16)]
+    assert [future.result()[0] for future in futures] == ["out:a", "out:b", "out:c"]
+    scheduler.close()
+
+    assert sorted((kwargs["max_new_tokens"], prompts) for prompts, kwargs in pipe.calls) == [(4, ["b"]), (16, ["a", "c"])]
+
+def test_generation_error_reaches_every_caller_of_the_batch():
+    """ Tests that a failed generate call raises in every caller of the batch and the scheduler keeps running."""
+    pipe = FakePipe(fail=True)
+    scheduler = MicroBatchScheduler(pipe, max_batch_size=2, max_wait_s=0.2)
+
+    futures = [scheduler.submit("a", 8), scheduler.submit("b", 8)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    pipe.fail = False
+    assert scheduler.generate("c", 8)[0] == "out:c"
+    scheduler.close()
+
+def test_scheduler_holds_shared_lock_during_generation():
+    """ Tests that the generate call runs under the lock shared with non-batched callers."""
+    lock = threading.Lock()
+    pipe = FakePipe(lock=lock)
+    scheduler = MicroBatchScheduler(pipe, max_wait_s=0, lock=lock)
+
+    scheduler.generate("a", 8)
+    scheduler.close()
+
+    assert pipe.lock_held == [True]
+    assert not lock.locked()
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_uses_scheduler(mock_load_model):
+    """ Tests that run_local_model routes the prompt through the scheduler with micro_batching enabled."""
+    from modules.local_backend import run_local_model
+    from modules.batch_scheduler import close_schedulers
+
+    pipe = MagicMock(return_value=[[{"generated_text": "Answer: B\nExplanation: b"}]])
+    pipe.tokenizer.return_value = {"input_ids": [1, 2, 3]}
+    mock_load_model.return_value = pipe
+    call_info = {}
+
+    answer = run_local_model("prompt", {"model_id": "mb-test", "micro_batching": True, "max_batch_wait_s": 0,
+                                        "call_info": call_info})
+    close_schedulers()
+
+    assert answer == ("B", "b")
+    assert call_info["micro_batch_size"] == 1
+    assert pipe.call_args.args[0] == ["prompt"]
+
+def test_local_concurrency_requires_micro_batching(capsys):
+    """ Tests that concurrent questions are not sent into the local pipeline without the micro-batching scheduler."""
+    from benchmark_test_llm_main import main
+
+    argv = ["benchmark_test_llm_main.py", "--llm", "tiny", "--llm_name", "tiny", "--api", "local",
+            "--test", "input.csv", "--results", "raw.json", "--concurrency", "4"]
+    with patch.object(sys, "argv", argv), patch("benchmark_test_llm_main.load_dataset") as load, \
+            pytest.raises(SystemExit):
+        main()
+    load.assert_not_called()
+    assert "--concurrency with --api local requires --micro_batch" in capsys.readouterr().err
@@ -0,0 +1,94 @@
+import json
+import sys
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from modules.costs import load_prices, model_price, usage_summary, budget_reason
+
+def test_model_price_uses_longest_prefix(tmp_path):
+    """ Tests exact and prefix price lookups and extending the table from a JSON file."""
+    prices = load_prices()
+    assert model_price("gpt-4o", prices) == {"input": 2.50, "output": 10.00}
+    assert model_price("gpt-4o-mini-2024-07-18", prices) == prices["gpt-4o-mini"]
+    assert model_price("speakleash/Bielik-7B-Instruct-v0.1", prices) is None
+
+    path = tmp_path / "prices.json"
+    path.write_text(json.dumps({"speakleash/Bielik": {"input": 0.0, "output": 0.1}}), encoding="utf-8")
+    assert model_price("speakleash/Bielik-7B-Instruct-v0.1", load_prices(str(path))) == {"input": 0.0, "output": 0.1}
+
+def test_usage_summary_and_budget():
+    """ Tests token sums and cost (including a resumed session) and both budget limits."""
+    prices = {"m": {"input": 1.0, "output": 4.0}}
+    usage = usage_summary({"prompt_tokens": 600_000, "completion_tokens": 100_000}, "m", prices,
+                          previous={"prompt_tokens": 400_000, "completion_tokens": 0})
+
+    assert usage == {"prompt_tokens": 1_000_000, "completion_tokens": 100_000, "total_tokens": 1_100_000,
+                     "cost_usd": 1.4}
+    assert usage_summary({}, "other", prices)["cost_usd"] is None
+    assert budget_reason(usage, max_cost=1.5) is None
+    assert budget_reason(usage, max_cost=1.4) == "max_cost"
+    assert budget_reason(usage, max_tokens_total=1_000_000) == "max_tokens_total"
+
+def fake_api_answer(prompt, config):
+    """Mocked model call reporting 100 prompt and 10 completion tokens."""
+    config["call_info"].update({"prompt_tokens": 100, "completion_tokens": 10})
+    return "A", "x"
+
+def test_run_stops_at_budget_and_resumes(tmp_path):
+    """ Tests that the runner stops once the token budget is used and --resume answers only the rest."""
+    from benchmark_test_llm_main import main
+
+    dataset = tmp_path / "input.csv"
+    pd.DataFrame([{"Pytanie": f"Pytanie {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}
+                  for i in range(5)]).to_csv(dataset, index=False)
+    results = tmp_path / "raw.json"
+    argv = ["benchmark_test_llm_main.py", "--llm", "gpt-4o", "--llm_name", "gpt", "--api", "openAI",
+            "--test", str(dataset), "--results", str(results), "--interval", "0"]
+
+    with patch("benchmark_test_llm_main.ask_model", side_effect=fake_api_answer) as ask:
+        with patch.object(sys, "argv", argv + ["--max_tokens_total", "300"]):
+            main()
+        assert ask.call_count == 3
+        summary = json.loads((tmp_path / "raw_run.json").read_text(encoding="utf-8"))
+        assert summary["budget"]["limit_reached"] == "max_tokens_total"
+        assert summary["usage"]["cost_usd"] == pytest.approx((300 * 2.5 + 30 * 10.0) / 1_000_000)
+
+        with patch.object(sys, "argv", argv + ["--resume"]):
+            main()
+        assert ask.call_count == 5
+
+    saved = json.loads(results.read_text(encoding="utf-8"))
+    assert [record["numer"] for record in saved] == [0, 1, 2, 3, 4]
+    assert saved[0]["meta"]["tokeny_promptu"] == 100
+    summary = json.loads((tmp_path / "raw_run.json").read_text(encoding="utf-8"))
+    assert summary["usage"]["total_tokens"] == 550
+
+def test_resume_counts_usage_of_a_crashed_session(tmp_path):
+    """ Tests that usage is checkpointed with every answer, so --resume after a crash still counts it."""
+    from benchmark_test_llm_main import main
+
+    dataset = tmp_path / "input.csv"
+    pd.DataFrame([{"Pytanie": f"Pytanie {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}
+                  for i in range(5)]).to_csv(dataset, index=False)
+    argv = ["benchmark_test_llm_main.py", "--llm", "gpt-4o", "--llm_name", "gpt", "--api", "openAI",
+            "--test", str(dataset), "--results", str(tmp_path / "raw.json"), "--interval", "0",
+            "--max_tokens_total", "440"]
+    calls = []
+
+    def crash_after_two(prompt, config):
+        calls.append(prompt)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return fake_api_answer(prompt, config)
+
+    with patch.object(sys, "argv", argv), patch("benchmark_test_llm_main.ask_model", side_effect=crash_after_two):
+        with pytest.raises(KeyboardInterrupt):
+            main()
+    checkpoint = json.loads((tmp_path / "raw_run.json").read_text(encoding="utf-8"))
+    assert checkpoint["partial"] and checkpoint["usage"]["total_tokens"] == 220
+
+    with patch.object(sys, "argv", argv + ["--resume"]):
+        with patch("benchmark_test_llm_main.ask_model", side_effect=fake_api_answer) as ask:
+            main()
+    assert ask.call_count == 2
+    assert json.loads((tmp_path / "raw_run.json").read_text(encoding="utf-8"))["usage"]["total_tokens"] == 440
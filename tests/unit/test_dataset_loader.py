@@ -75,4 +75,51 @@ def test_unsupported_format(tmp_path):
     file.write_text('{"sample" : 123}') 
 
     with pytest.raises(ValueError, match = 'Unsupported file format'):
-        dataset_loader.load_dataset(str(file))
\ No newline at end of file
+        dataset_loader.load_dataset(str(file))
+
+def make_bank():
+    """Question bank with a whitespace variant, a shuffled-options variant and a different question."""
+    base = {"Pytanie": "Jaki język tradycyjnie używany był przez Łemków?", "A": "Polski",
+            "B": "Rusiński (łemkowski)", "C": "Słowacki", "D": "Czeski", "Pozycja": "B"}
+    return pd.DataFrame([
+        base,
+        {**base, "Pytanie": "Jaki\tjęzyk tradycyjnie używany był przez Łemków? "},
+        {**base, "A": "Rusiński (łemkowski)", "B": "Polski", "Pozycja": "A"},
+        {"Pytanie": "Gdzie piecze się sękacza?", "A": "Podlasie", "B": "Kujawy", "C": "Podhale", "D": "Śląsk",
+         "Pozycja": "A"},
+    ], index=[10, 11, 12, 13])
+
+def test_normalize_text():
+    """ Tests that tabs, case, punctuation and repeated spaces are normalised."""
+    assert dataset_loader.normalize_text("  Jaki\tjęzyk –  Łemków?") == "jaki język łemków"
+    assert dataset_loader.normalize_text(float("nan")) == ""
+
+def test_find_and_collapse_near_duplicates():
+    """ Tests that whitespace and option-order variants form one cluster and collapsing keeps the first question."""
+    bank = make_bank()
+
+    clusters = dataset_loader.find_near_duplicates(bank)
+    report = dataset_loader.duplicate_report(bank, clusters)
+    collapsed = dataset_loader.collapse_duplicates(bank, clusters)
+
+    assert clusters == [[10, 11, 12]]
+    assert (report["clusters"], report["duplicates"], report["conflicting"]) == (1, 2, 0)
+    assert list(collapsed.index) == [10, 13]
+
+def test_near_duplicates_with_different_answer_are_flagged():
+    """ Tests that a near-duplicate with a different correct answer is reported as conflicting."""
+    bank = make_bank()
+    bank.loc[11, "Pozycja"] = "C"
+
+    report = dataset_loader.duplicate_report(bank, dataset_loader.find_near_duplicates(bank))
+
+    assert report["conflicting"] == 1 and report["details"][0]["conflicting_answers"]
+
+def test_minhash_estimates_similarity():
+    """ Tests that signature agreement tracks similarity: identical texts match, unrelated texts barely do."""
+    signatures = dataset_loader.minhash_signatures(["w jakim regionie polski obchodzi się dożynki",
+                                                    "w jakim regionie polski obchodzi się dożynki",
+                                                    "gdzie piecze się sękacza"])
+
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() < 0.2
@@ -1,5 +1,5 @@
 import pytest
-from modules.llm_connector import ask_model
+from modules.llm_connector import ask_model, ask_model_batch, ask_model_samples
 
 def test_ask_model_unsupported_api():
     """
@@ -85,4 +85,100 @@ def test_ask_model_non_string_api_type():
     """
     config = {"api": 123, "model_id": "test"}
     with pytest.raises(NotImplementedError):
-        ask_model("prompt", config)
\ No newline at end of file
+        ask_model("prompt", config)
+
+def test_ask_model_delegates_to_onnx(monkeypatch):
+    """
+    Test if ask_model delegates to run_onnx_model when 'api' is set to 'onnx'.
+    """
+    monkeypatch.setattr("modules.llm_connector.run_onnx_model", lambda p, c: ("D", "onnx explanation"))
+    config = {"api": "onnx", "model_id": "bielik"}
+    answer, explanation = ask_model("prompt", config)
+
+    assert answer == "D"
+    assert explanation == "onnx explanation"
+
+def test_ask_model_delegates_to_local_server(monkeypatch):
+    """
+    Test if ask_model delegates to run_server_model when 'api' is set to 'local_server'.
+    """
+    monkeypatch.setattr("modules.llm_connector.run_server_model", lambda p, c: ("A", "from server"))
+    config = {"api": "local_server", "model_id": "bielik"}
+
+    assert ask_model("prompt", config) == ("A", "from server")
+
+def test_ask_model_samples_api_fallback_votes(monkeypatch):
+    """
+    Test that for API backends ask_model_samples repeats ask_model and aggregates by majority vote.
+    """
+    answers = iter([("B", "x"), ("A", "y"), ("B", "z")])
+    monkeypatch.setattr("modules.llm_connector.run_api_model", lambda p, c: next(answers))
+    config = {"api": "openAI", "model_id": "gpt-4", "num_samples": 3}
+
+    outcome = ask_model_samples(["prompt"], config)[0]
+
+    assert outcome["answer"] == "B"
+    assert outcome["samples"] == ["B", "A", "B"]
+
+def test_ask_model_samples_api_sums_usage(monkeypatch):
+    """
+    Test that the token usage of every sampled API request is summed into call_info.
+    """
+    def fake_run_api(prompt, config):
+        config["call_info"].update(prompt_tokens=100, completion_tokens=10, raw_output="Answer: A")
+        return "A", "x"
+
+    monkeypatch.setattr("modules.llm_connector.run_api_model", fake_run_api)
+    call_info = {}
+    ask_model_samples(["p1", "p2"], {"api": "google", "model_id": "gemini", "num_samples": 3, "call_info": call_info})
+
+    assert call_info == {"prompt_tokens": 600, "completion_tokens": 60}
+
+def test_ask_model_samples_api_keeps_raw_outputs(monkeypatch):
+    """
+    Test that the raw output of every sampled API request is returned, None where none was reported.
+    """
+    raw = iter(["Answer: A", None])
+
+    def fake_run_api(prompt, config):
+        text = next(raw)
+        if text is not None:
+            config["call_info"]["raw_output"] = text
+        return "A", "x"
+
+    monkeypatch.setattr("modules.llm_connector.run_api_model", fake_run_api)
+    outcome = ask_model_samples(["p"], {"api": "openAI", "model_id": "gpt-4", "num_samples": 2, "call_info": {}})[0]
+
+    assert outcome["raw_outputs"] == ["Answer: A", None]
+
+def test_ask_model_batch_api_sums_usage_and_keeps_raw_outputs(monkeypatch):
+    """
+    Test that API batches sum the usage of every request and report the raw output per prompt.
+    """
+    def fake_ask(prompt, config):
+        config["call_info"].update(completion_tokens=5, raw_output=f"Answer: {prompt}")
+        return prompt, "x"
+
+    monkeypatch.setattr("modules.llm_connector.ask_model", fake_ask)
+    call_info = {}
+    answers = ask_model_batch(["A", "B"], {"api": "openAI", "model_id": "gpt-4", "call_info": call_info})
+
+    assert answers == [("A", "x"), ("B", "x")]
+    assert call_info == {"completion_tokens": 10, "raw_outputs": ["Answer: A", "Answer: B"]}
+
+def test_ask_model_samples_delegates_to_local_server(monkeypatch):
+    """
+    Test that the local server draws the samples itself instead of repeated greedy requests.
+    """
+    outcome = {"answer": "C", "explanation": "c", "samples": ["C", "C"], "agreement": 1.0}
+    monkeypatch.setattr("modules.llm_connector.sample_server_model", lambda p, c: [outcome] * len(p))
+    monkeypatch.setattr("modules.llm_connector.run_server_model", lambda p, c: pytest.fail("greedy request"))
+
+    assert ask_model_samples(["p"], {"api": "local_server", "model_id": "bielik", "num_samples": 2}) == [outcome]
+
+def test_ask_model_samples_rejects_onnx():
+    """
+    Test that the greedy ONNX backend cannot be used for self-consistency.
+    """
+    with pytest.raises(NotImplementedError, match="onnx"):
+        ask_model_samples(["p"], {"api": "onnx", "model_id": "bielik", "num_samples": 3})
@@ -1,6 +1,9 @@
+import numpy as np
 import pytest
+import torch
 from unittest.mock import patch, MagicMock
-from modules.local_backend import load_local_model, run_local_model, _local_model_cache
+from modules.local_backend import load_local_model, run_local_model, get_local_model_stats, _local_model_cache, _answer_letter_token_ids, run_local_model_samples, run_local_model_batch, AnswerFormatLogitsProcessor
+from modules.utils import parse_output
 
 # -------------------------------
 # TEST: Loading and cache
@@ -123,4 +126,402 @@ def test_load_local_model_use_q4(mock_model, mock_tokenizer, mock_pipeline):
 def test_run_local_model_missing_model_id():
     config = {"max_new_tokens": 100}
     with pytest.raises(KeyError):
-        run_local_model("prompt", config)
\ No newline at end of file
+        run_local_model("prompt", config)
+# -------------------------------
+# TEST: CPU quantization modes
+# -------------------------------
+
+@patch('modules.local_backend.torch.ao.quantization.quantize_dynamic')
+@patch('modules.local_backend.pipeline')
+@patch('modules.local_backend.AutoTokenizer.from_pretrained')
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_load_local_model_int8_dynamic(mock_model, mock_tokenizer, mock_pipeline, mock_quantize):
+    """ Test that int8_dynamic loads float32 weights, quantizes linear layers and uses a separate cache key."""
+    _local_model_cache.clear()
+    mock_pipeline.return_value = MagicMock()
+
+    load_local_model('cpu-model', quantization="int8_dynamic")
+
+    _, kwargs = mock_model.call_args
+    assert kwargs["torch_dtype"] == torch.float32
+    mock_quantize.assert_called_once()
+    assert mock_pipeline.call_args.kwargs["model"] is mock_quantize.return_value
+    assert 'cpu-model@int8_dynamic' in _local_model_cache
+    assert 'cpu-model' not in _local_model_cache
+
+@patch('modules.local_backend.pipeline')
+@patch('modules.local_backend.AutoTokenizer.from_pretrained')
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_load_local_model_records_load_stats(mock_model, mock_tokenizer, mock_pipeline):
+    """ Test that load time and resident memory are recorded for the loaded model."""
+    _local_model_cache.clear()
+    mock_pipeline.return_value = MagicMock()
+
+    load_local_model('stats-model')
+    stats = get_local_model_stats({"model_id": "stats-model"})
+
+    assert stats["quantization"] == "bf16"
+    assert stats["load_time_s"] >= 0
+    assert "rss_mb" in stats
+
+@patch.dict('sys.modules', {'optimum.quanto': None})
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_load_local_model_int4_without_quanto(mock_model):
+    """ Test that int4_weight_only without optimum-quanto raises an ImportError naming the package."""
+    _local_model_cache.clear()
+    with pytest.raises(ImportError, match="optimum-quanto"):
+        load_local_model('int4-model', quantization="int4_weight_only")
+    mock_model.assert_not_called()
+
+def test_load_local_model_unsupported_quantization():
+    """ Test that an unknown quantization mode raises ValueError."""
+    with pytest.raises(ValueError, match="Unsupported quantization mode"):
+        load_local_model('mock-id', quantization="int2")
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_passes_quantization_and_fills_call_info(mock_load_model):
+    """ Test that run_local_model forwards the quantization mode and reports generation statistics."""
+    mock_pipe = MagicMock(return_value=[{"generated_text": "Answer: B\nExplanation: ok"}])
+    mock_pipe.tokenizer.return_value = {"input_ids": [1, 2, 3, 4]}
+    mock_load_model.return_value = mock_pipe
+
+    call_info = {}
+    cfg = {"model_id": "m", "quantization": "int8_dynamic", "call_info": call_info}
+    answer, _ = run_local_model("p", cfg)
+
+    assert answer == "B"
+    assert mock_load_model.call_args.kwargs["quantization"] == "int8_dynamic"
+    assert call_info["completion_tokens"] == 4
+    assert call_info["generation_time_s"] >= 0
+
+# -------------------------------
+# TEST: Assisted decoding with a draft model
+# -------------------------------
+
+def make_assisted_pipes(draft_vocab=None, rounds=3, proposed=4, new_tokens=8):
+    """
+    Builds mocked target and draft pipelines. The target's generate simulates assisted decoding:
+    every round the draft proposes candidate tokens and the target runs one verifying forward pass.
+    """
+    target_pipe = MagicMock()
+    target_pipe.model.device = "cpu"
+    target_pipe.tokenizer.return_value = {"input_ids": [1, 2, 3]}
+    target_pipe.tokenizer.pad_token_id = 0
+    target_pipe.tokenizer.get_vocab.return_value = {"a": 0}
+    target_pipe.tokenizer.decode.return_value = "Answer: C\nExplanation: ok"
+    draft_pipe = MagicMock()
+    draft_pipe.tokenizer.get_vocab.return_value = draft_vocab or {"a": 0}
+    draft_pipe.model.generate.return_value = MagicMock(scores=[None] * proposed)
+    hooks = []
+    target_pipe.model.register_forward_hook.side_effect = lambda hook: hooks.append(hook) or MagicMock()
+
+    def assisted_generate(input_ids, **kwargs):
+        for _ in range(rounds):
+            kwargs["assistant_model"].generate(input_ids=input_ids)
+            hooks[0](None, None, None)
+        return torch.arange(input_ids.shape[1] + new_tokens).unsqueeze(0)
+
+    target_pipe.model.generate.side_effect = assisted_generate
+    return target_pipe, draft_pipe
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_with_assistant_model(mock_load_model):
+    """
+    Test that assistant_model_id loads the draft model through the model cache,
+    passes it to generation and reports forward-call statistics.
+    """
+    target_pipe, draft_pipe = make_assisted_pipes()
+    mock_load_model.side_effect = lambda model_id, **_: draft_pipe if model_id == "small" else target_pipe
+
+    call_info = {}
+    cfg = {"model_id": "big", "assistant_model_id": "small", "call_info": call_info}
+    answer, _ = run_local_model("p", cfg)
+
+    assert answer == "C"
+    kwargs = target_pipe.model.generate.call_args.kwargs
+    assert kwargs["assistant_model"] is draft_pipe.model
+    assert kwargs["do_sample"] is False
+    assert "assistant_tokenizer" not in kwargs  # same vocabulary
+    draft_pipe.model.register_forward_hook.assert_called_once()
+    assert call_info["completion_tokens"] == 8
+    assert call_info["target_forward_calls"] == 3
+    assert call_info["draft_tokens"] == 12
+    assert call_info["accepted_draft_tokens"] == 5
+
+@pytest.mark.parametrize("rounds,proposed,new_tokens", [(1, 4, 20), (10, 1, 20), (20, 5, 20), (5, 2, 3)])
+@patch('modules.local_backend.load_local_model')
+def test_assisted_accept_rate_stays_within_bounds(mock_load_model, rounds, proposed, new_tokens):
+    """ Test that accepted draft tokens never exceed the proposed ones, so the accept rate stays in [0, 1]."""
+    target_pipe, draft_pipe = make_assisted_pipes(rounds=rounds, proposed=proposed, new_tokens=new_tokens)
+    mock_load_model.side_effect = lambda model_id, **_: draft_pipe if model_id == "small" else target_pipe
+
+    call_info = {}
+    run_local_model("p", {"model_id": "big", "assistant_model_id": "small", "call_info": call_info})
+
+    assert call_info["completion_tokens"] == new_tokens
+    assert 0 <= call_info["accepted_draft_tokens"] / call_info["draft_tokens"] <= 1
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_assistant_with_different_tokenizer(mock_load_model):
+    """ Test that a draft model with a different vocabulary gets both tokenizers (universal assisted decoding)."""
+    target_pipe, draft_pipe = make_assisted_pipes(draft_vocab={"b": 0})
+    mock_load_model.side_effect = lambda model_id, **_: draft_pipe if model_id == "small" else target_pipe
+
+    run_local_model("p", {"model_id": "big", "assistant_model_id": "small"})
+
+    kwargs = target_pipe.model.generate.call_args.kwargs
+    assert kwargs["tokenizer"] is target_pipe.tokenizer
+    assert kwargs["assistant_tokenizer"] is draft_pipe.tokenizer
+
+# -------------------------------
+# TEST: Answer letter token ids (used for scoring)
+# -------------------------------
+
+def test_answer_letter_token_ids_uses_token_after_prefix():
+    """ Test that letter ids are taken from the token following the 'Answer:' prefix."""
+    vocab = {"Answer": 1, ":": 2, " A": 10, " B": 11, " C": 12, " D": 13}
+
+    class FakeTokenizer:
+        def encode(self, text, add_special_tokens=False):
+            ids = [1, 2]
+            if text != "Answer:":
+                ids.append(vocab[" " + text[-1]])
+            return ids
+
+    assert _answer_letter_token_ids(FakeTokenizer()) == {"A": 10, "B": 11, "C": 12, "D": 13}
+
+# -------------------------------
+# TEST: Fast loading path
+# -------------------------------
+
+@patch('modules.local_backend.pipeline')
+@patch('modules.local_backend.AutoTokenizer.from_pretrained')
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_load_local_model_fast_load(mock_model, mock_tokenizer, mock_pipeline):
+    """
+    Test that fast_load requests memory-mapped safetensors with low CPU memory usage,
+    still loads the tokenizer and records per-stage load times and peak RSS.
+    """
+    _local_model_cache.clear()
+    mock_pipeline.return_value = MagicMock()
+
+    load_local_model('fast-model', fast_load=True)
+
+    _, kwargs = mock_model.call_args
+    assert kwargs["low_cpu_mem_usage"] is True
+    assert kwargs["use_safetensors"] is True
+    mock_tokenizer.assert_called_once_with('fast-model')
+    assert mock_pipeline.call_args.kwargs["tokenizer"] is mock_tokenizer.return_value
+
+    stats = get_local_model_stats({"model_id": "fast-model"})
+    assert set(stats["stages_s"]) == {"model_s", "tokenizer_s", "pipeline_s"}
+    assert stats["peak_rss_mb"] >= stats["rss_mb"]
+
+# -------------------------------
+# TEST: Self-consistency sampling
+# -------------------------------
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_samples_batches_and_votes(mock_load_model):
+    """
+    Test that all prompts are sampled in one batched call with num_return_sequences
+    and that each question gets a majority answer with per-sample letters.
+    """
+    mock_pipe = MagicMock(return_value=[
+        [{"generated_text": "Answer: A\nExplanation: a"}, {"generated_text": "Answer: A\nExplanation: a2"},
+         {"generated_text": "Answer: B\nExplanation: b"}],
+        [{"generated_text": "bez formatu"}, {"generated_text": "Answer: C\nExplanation: c"},
+         {"generated_text": "Answer: C\nExplanation: c2"}],
+    ])
+    mock_pipe.tokenizer.pad_token = None
+    mock_load_model.return_value = mock_pipe
+
+    outcomes = run_local_model_samples(["p1", "p2"], {"model_id": "m", "num_samples": 3, "batch_size": 2})
+
+    mock_pipe.assert_called_once()
+    args, kwargs = mock_pipe.call_args
+    assert args[0] == ["p1", "p2"]
+    assert kwargs["num_return_sequences"] == 3
+    assert kwargs["do_sample"] is True
+    assert mock_pipe.tokenizer.padding_side == "left"
+
+    assert outcomes[0]["answer"] == "A"
+    assert outcomes[0]["samples"] == ["A", "A", "B"]
+    assert outcomes[1]["answer"] == "C"
+    assert outcomes[1]["agreement"] == pytest.approx(2 / 3)
+    assert outcomes[1]["raw_outputs"][0] == "bez formatu"
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_samples_generation_error(mock_load_model):
+    """ Test that a failed sampling call yields a generation error for every prompt."""
+    mock_load_model.return_value = MagicMock(side_effect=RuntimeError("fail"))
+
+    outcomes = run_local_model_samples(["p1", "p2"], {"model_id": "m"})
+
+    assert [o["answer"] for o in outcomes] == ["Generation error", "Generation error"]
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_batch_greedy(mock_load_model):
+    """ Test that prompt variants are answered greedily in one batched pipeline call."""
+    mock_pipe = MagicMock(return_value=[
+        [{"generated_text": "Answer: A\nExplanation: a"}],
+        [{"generated_text": "Answer: D\nExplanation: d"}],
+    ])
+    mock_load_model.return_value = mock_pipe
+
+    call_info = {}
+    answers = run_local_model_batch(["p1", "p2"], {"model_id": "m", "call_info": call_info})
+
+    assert answers == [("A", "a"), ("D", "d")]
+    assert call_info["raw_outputs"] == ["Answer: A\nExplanation: a", "Answer: D\nExplanation: d"]
+    _, kwargs = mock_pipe.call_args
+    assert kwargs["do_sample"] is False
+    assert kwargs["batch_size"] == 2
+
+# -------------------------------
+# TEST: Constrained decoding
+# -------------------------------
+
+class CharTokenizer:
+    """Character-level tokenizer (keeps the space before the answer letter as its own token)."""
+    eos_token_id = 0
+
+    def encode(self, text, add_special_tokens=False):
+        return [ord(char) for char in text]
+
+def test_answer_format_processor_forces_format_and_restarts_per_batch():
+    """
+    Test that the processor forces 'Answer: ', one of the letters and '\\nExplanation:',
+    then leaves generation free (without EOS at the first free step), and that a new
+    prompt batch restarts the forced sequence.
+    """
+    processor = AnswerFormatLogitsProcessor(CharTokenizer())
+    forced = "Answer: "
+    explanation = "\nExplanation:"
+
+    ids = torch.tensor([[1, 2, 3]])
+    generated = ""
+    for step in range(len(forced) + 1 + len(explanation) + 1):
+        scores = processor(ids, torch.zeros(1, 200))
+        allowed = torch.isfinite(scores[0]).nonzero().flatten().tolist()
+        if step < len(forced):
+            assert allowed == [ord(forced[step])]
+        elif step == len(forced):
+            assert allowed == [ord(letter) for letter in "ABCD"]
+        elif step <= len(forced) + len(explanation):
+            assert allowed == [ord(explanation[step - len(forced) - 1])]
+        else:
+            assert 0 not in allowed and len(allowed) == 199
+        token = {len(forced): ord("D"), len(forced) + len(explanation) + 1: ord(" ")}.get(step, allowed[0])
+        generated += chr(token)
+        ids = torch.cat([ids, torch.tensor([[token]])], dim=1)
+
+    assert parse_output(generated + "tekst") == ("D", "tekst")
+
+    new_batch = torch.tensor([[5, 6], [7, 8]])
+    scores = processor(new_batch, torch.zeros(2, 200))
+    assert torch.isfinite(scores).nonzero()[:, 1].tolist() == [ord("A"), ord("A")]
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_constrained_passes_logits_processor(mock_load_model):
+    """ Test that constrained mode passes the format logits processor to generation."""
+    mock_pipe = MagicMock(return_value=[{"generated_text": "Answer: B\nExplanation: b"}])
+    mock_pipe.tokenizer = CharTokenizer()
+    mock_load_model.return_value = mock_pipe
+
+    answer = run_local_model("prompt", {"model_id": "m", "constrained": True})
+
+    assert answer == ("B", "b")
+    _, kwargs = mock_pipe.call_args
+    assert isinstance(kwargs["logits_processor"][0], AnswerFormatLogitsProcessor)
+
+def test_answer_format_processor_answer_only_ends_after_letter():
+    """ Test that in answer-only mode the letter is followed by end of sequence."""
+    processor = AnswerFormatLogitsProcessor(CharTokenizer(), answer_only=True)
+
+    assert processor.allowed_tokens(len("Answer: ")) == [ord(letter) for letter in "ABCD"]
+    assert processor.allowed_tokens(len("Answer: ") + 1) == [CharTokenizer.eos_token_id]
+    assert processor.allowed_tokens(len("Answer: ") + 2) is None
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_answer_only_accepts_letter(mock_load_model):
+    """ Test that an answer-only output without an explanation is parsed in answer-only mode."""
+    mock_load_model.return_value = MagicMock(return_value=[{"generated_text": "Answer: C"}])
+
+    assert run_local_model("prompt", {"model_id": "m", "answer_only": True}) == ("C", "")
+    assert run_local_model("prompt", {"model_id": "m"})[0] == "Parsing error"
+
+def test_run_local_model_constrained_rejects_assistant():
+    """ Test that constrained decoding cannot be combined with a draft model."""
+    with patch('modules.local_backend.load_local_model'):
+        with pytest.raises(ValueError):
+            run_local_model("prompt", {"model_id": "m", "constrained": True, "assistant_model_id": "small"})
+
+# -------------------------------
+# TEST: Pre-tokenised prompts (question packs)
+# -------------------------------
+
+@patch('modules.local_backend.load_local_model')
+def test_run_local_model_uses_pretokenised_ids(mock_load_model):
+    """ Test that packed prompt ids are passed straight to generate and only new tokens are decoded."""
+    mock_pipe = MagicMock()
+    mock_pipe.model.device = "cpu"
+    mock_pipe.model.generate.return_value = torch.tensor([[5, 6, 7, 8, 9]])
+    mock_pipe.tokenizer.pad_token_id = 0
+    mock_pipe.tokenizer.decode.return_value = "Answer: C\nExplanation: c"
+    mock_load_model.return_value = mock_pipe
+
+    answer = run_local_model("prompt", {"model_id": "m", "input_ids": np.array([5, 6, 7], dtype=np.int32)})
+
+    assert answer == ("C", "c")
+    mock_pipe.assert_not_called()
+    kwargs = mock_pipe.model.generate.call_args.kwargs
+    assert kwargs["input_ids"].tolist() == [[5, 6, 7]]
+    assert mock_pipe.tokenizer.decode.call_args.args[0].tolist() == [8, 9]
+
+def test_parse_max_memory():
+    """ Test that memory budgets are parsed into an accelerate max_memory mapping."""
+    from modules.local_backend import parse_max_memory
+
+    assert parse_max_memory("0=20GiB, cpu=30GiB") == {0: "20GiB", "cpu": "30GiB"}
+    assert parse_max_memory(None) is None
+    with pytest.raises(ValueError, match="Invalid memory budget entry"):
+        parse_max_memory("cpu:12GiB")
+
+@patch('modules.local_backend.pipeline')
+@patch('modules.local_backend.AutoTokenizer.from_pretrained')
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_load_local_model_with_memory_budget(mock_model, mock_tokenizer, mock_pipeline):
+    """ Test that the memory budget and offload folder reach from_pretrained and the placement is recorded."""
+    _local_model_cache.clear()
+    mock_model.return_value = MagicMock(hf_device_map={"model.embed_tokens": "cpu", "model.layers.0": "disk",
+                                                       "model.layers.1": "disk"})
+
+    load_local_model('org/offload-model', max_memory={"cpu": "1GiB"})
+    kwargs = mock_model.call_args.kwargs
+    stats = get_local_model_stats({"model_id": "org/offload-model"})
+
+    assert kwargs["max_memory"] == {"cpu": "1GiB"} and kwargs["device_map"] == "auto"
+    assert kwargs["offload_folder"].endswith("org--offload-model")
+    assert stats["device_map"] == {"cpu": 1, "disk": 2}
+
+@patch('modules.local_backend.pipeline')
+@patch('modules.local_backend.AutoTokenizer.from_pretrained')
+@patch('modules.local_backend.AutoModelForCausalLM.from_pretrained')
+def test_fully_offloaded_model_pipeline_runs_on_cpu(mock_model, mock_tokenizer, mock_pipeline):
+    """ Test that a model offloaded entirely to disk gets a CPU pipeline and keeps its device map."""
+    _local_model_cache.clear()
+    model = MagicMock(hf_device_map={"": "disk"})
+    mock_model.return_value = model
+    seen = []
+    mock_pipeline.side_effect = lambda *args, **kwargs: seen.append(dict(kwargs["model"].hf_device_map))
+
+    load_local_model('disk-model', max_memory={"cpu": "1MB"}, offload_folder="offload")
+
+    assert seen == [{"": "cpu"}]
+    assert model.hf_device_map == {"": "disk"}
+
+def test_memory_budget_rejected_for_cpu_quantization():
+    """ Test that a memory budget cannot be combined with the CPU quantization modes."""
+    with pytest.raises(ValueError, match="not supported with int8_dynamic"):
+        load_local_model('budget-int8', quantization="int8_dynamic", max_memory={"cpu": "1GiB"})
@@ -0,0 +1,93 @@
+import json
+import pytest
+from unittest.mock import patch
+from modules.merger import merge_results, summary_path_for, model_name_for
+from modules.response_saver import save_raw_results, save_run_summary, run_summary_path, load_results_frame
+
+def make_results(answers, correct="ABCD"):
+    """Builds raw result records with the given model answers."""
+    return [
+        {"numer": i, "pytanie": f"Pytanie {i}", "poprawna": correct[i % len(correct)], "odpowiedź": answer,
+         "uzasadnienie": "x", "meta": {"domena": "Etnologia", "kategoria": ["Historia", "Kultura"][i % 2], "tagi": None}}
+        for i, answer in enumerate(answers)
+    ]
+
+def test_merge_results_scores_and_writes_summaries(tmp_path):
+    """
+    Tests that raw results of two models are scored, summarised per model and merged,
+    including per-category accuracy and a long answers table.
+    """
+    path_a = tmp_path / "bielik_raw.json"
+    path_b = tmp_path / "gemini_raw.json"
+    save_raw_results(make_results(["A", "B", "Parsing error", "A"]), str(path_a))
+    save_raw_results(make_results(["A", "B", "C", "D"]), str(path_b))
+    save_run_summary({"llm_name": "Gemini Flash"}, run_summary_path(str(path_b)))
+
+    leaderboard, answers = merge_results([str(path_a), str(path_b)])
+
+    assert leaderboard["bielik"]["podsumowanie"] == {
+        'prawidłowa': 2, 'nieprawidłowa': 1, 'brak odpowiedzi': 1, 'odpowiedź niezgodna z oczekiwaniami': 0
+    }
+    assert leaderboard["bielik"]["accuracy"] == 0.5
+    assert leaderboard["bielik"]["kategorie"]["Historia"] == {"accuracy": 0.5, "questions": 2}
+    assert leaderboard["Gemini Flash"]["accuracy"] == 1.0
+
+    assert (tmp_path / "bielik_summary.json").exists()
+    assert len(answers) == 8
+    assert set(answers["model"].cat.categories) == {"bielik", "Gemini Flash"}
+
+def test_merge_results_reads_parquet(tmp_path):
+    """ Tests that Parquet raw results are merged the same way as JSON ones."""
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "bielik_raw.parquet"
+    save_raw_results(make_results(["A", "C"]), str(path))
+
+    leaderboard, _ = merge_results([str(path)], write_summaries=False)
+
+    assert leaderboard["bielik"]["accuracy"] == 0.5
+
+def test_paths_and_names():
+    """ Tests summary path and model name derivation from raw file names."""
+    assert summary_path_for("results/bielik7b_raw.json") == "results/bielik7b_summary.json"
+    assert model_name_for("results/does_not_exist_raw.json") == "does_not_exist"
+
+def test_merge_with_manifest_scores_only_new_files(tmp_path):
+    """
+    Tests that with a manifest unchanged files are not re-read: adding a model scores one file,
+    and a changed file is re-scored.
+    """
+    manifest = str(tmp_path / "merge_manifest.json")
+    path_a = tmp_path / "bielik_raw.json"
+    path_b = tmp_path / "gemini_raw.json"
+    save_raw_results(make_results(["A", "B", "Parsing error", "A"]), str(path_a))
+    first, _ = merge_results([str(path_a)], manifest_path=manifest, with_answers=False)
+
+    save_raw_results(make_results(["A", "B", "C", "D"]), str(path_b))
+    with patch("modules.merger.load_results_frame", wraps=load_results_frame) as loader:
+        leaderboard, answers = merge_results([str(path_a), str(path_b)], manifest_path=manifest, with_answers=False)
+
+    loader.assert_called_once_with(str(path_b))
+    assert leaderboard["bielik"] == first["bielik"]
+    assert leaderboard["gemini"]["accuracy"] == 1.0
+    assert answers.empty
+
+    save_raw_results(make_results(["A", "B", "C", "D"]), str(path_a))
+    leaderboard, _ = merge_results([str(path_a), str(path_b)], manifest_path=manifest, with_answers=False)
+
+    assert leaderboard["bielik"]["accuracy"] == 1.0
+    # both files now have identical content, so they share one cached entry
+    assert len(json.load(open(manifest, encoding='utf-8'))["files"]) == 1
+
+def test_files_of_one_model_are_combined(tmp_path):
+    """ Tests that shards with the same model name are summed into one leaderboard entry."""
+    path_a = tmp_path / "part1" / "bielik_raw.json"
+    path_b = tmp_path / "part2" / "bielik_raw.json"
+    path_a.parent.mkdir()
+    path_b.parent.mkdir()
+    save_raw_results(make_results(["A", "C"]), str(path_a))
+    save_raw_results(make_results(["A", "B"]), str(path_b))
+
+    leaderboard, _ = merge_results([str(path_a), str(path_b)], write_summaries=False)
+
+    assert leaderboard["bielik"]["liczba_pytań"] == 4
+    assert leaderboard["bielik"]["accuracy"] == 0.75
@@ -0,0 +1,57 @@
+import urllib.request
+from modules.metrics import RunMetrics, start_metrics_exporter, write_metrics_file
+
+def test_run_metrics_counts_rates_and_histogram():
+    """ Tests counters, cache hit rate, ETA and the latency histogram of a run."""
+    metrics = RunMetrics(total_questions=10)
+    with metrics.request():
+        assert metrics.snapshot()["requests_in_flight"] == 1
+    metrics.record(1, call_info={"completion_tokens": 20, "model_cache_hit": 0})
+    with metrics.request():
+        pass
+    metrics.record(3, failed=1, call_info={"completion_tokens": 10, "model_cache_hit": 1})
+
+    metrics.started -= 4
+    values = metrics.snapshot()
+
+    assert values["questions_completed"] == 4
+    assert values["questions_failed"] == 1
+    assert values["requests_in_flight"] == 0
+    assert values["cache_hit_rate"] == 0.5
+    assert values["latency_count"] == 2
+    assert values["latency_buckets"][0] == 2
+    assert values["questions_per_s"] == 1.0
+    assert values["eta_s"] == 6.0
+
+def test_prometheus_text_format():
+    """ Tests the exposition format: typed metrics and a cumulative histogram."""
+    metrics = RunMetrics(total_questions=2)
+    with metrics.request():
+        pass
+    metrics.record(1)
+
+    text = metrics.to_prometheus()
+
+    assert "# TYPE bench_questions_completed_total counter\nbench_questions_completed_total 1\n" in text
+    assert 'bench_request_latency_seconds_bucket{le="120.0"} 1' in text
+    assert 'bench_request_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "bench_model_cache_hit_ratio" not in text
+
+def test_metrics_file_and_http_endpoint(tmp_path):
+    """ Tests that the exporters write the text file and serve /metrics on localhost."""
+    metrics = RunMetrics(total_questions=5)
+    path = tmp_path / "metrics" / "bench.prom"
+
+    stop = start_metrics_exporter(metrics, str(path), port=0, interval=60)
+    try:
+        metrics.record(2)
+        port = stop.server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "bench_questions_completed_total 2" in body
+    finally:
+        stop()
+
+    assert "bench_questions_completed_total 2" in path.read_text()
+
+    write_metrics_file(metrics, str(path))
+    assert not (tmp_path / "metrics" / "bench.prom.tmp").exists()
@@ -0,0 +1,28 @@
+import pytest
+from tests.perf.micro_benchmarks import compare_results, time_case, build_cases
+
+def run(timings, scale=1.0):
+    """Builds a run in the run_suite format from case name -> fastest time in seconds."""
+    return {"meta": {"scale": scale}, "results": {name: {"min_s": value} for name, value in timings.items()}}
+
+def test_compare_results_flags_slowdowns_beyond_threshold():
+    """ Tests that only slowdowns above the relative threshold and the noise floor are flagged."""
+    baseline = run({"parse": 0.100, "load": 0.0002, "save": 0.050, "removed": 1.0})
+    current = run({"parse": 0.130, "load": 0.0008, "save": 0.070, "new": 1.0})
+
+    rows = {row["name"]: row for row in compare_results(current, baseline, threshold=0.25)}
+
+    assert set(rows) == {"parse", "load", "save"}
+    assert rows["parse"]["regression"] is True and rows["parse"]["ratio"] == 1.3
+    assert rows["load"]["regression"] is False
+    assert rows["save"]["regression"] is True
+    with pytest.raises(ValueError):
+        compare_results(run({}, scale=0.1), baseline)
+
+def test_cases_run_at_small_scale(tmp_path):
+    """ Tests that every benchmark case runs on tiny inputs and reports timings."""
+    for name, (setup, function) in build_cases(str(tmp_path), scale=0.001).items():
+        if "xlsx" in name:
+            continue
+        timing = time_case(setup, function, repeat=1)
+        assert timing["min_s"] <= timing["median_s"] <= timing["max_s"], name
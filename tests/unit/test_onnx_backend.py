@@ -0,0 +1,79 @@
+import torch
+from unittest.mock import patch, MagicMock
+from modules.onnx_backend import load_onnx_model, run_onnx_model, onnx_export_dir, _onnx_model_cache
+
+# -------------------------------
+# TEST: Export, on-disk cache and in-memory cache
+# -------------------------------
+
+@patch('modules.onnx_backend.AutoTokenizer.from_pretrained')
+@patch('modules.onnx_backend._load_ort_model')
+def test_load_onnx_model_exports_on_first_run(mock_load_ort, mock_tokenizer, tmp_path):
+    """
+    Tests that a model without an exported graph is exported and saved to the cache directory.
+    """
+    _onnx_model_cache.clear()
+    mock_model = MagicMock()
+    mock_load_ort.return_value = mock_model
+
+    model, tokenizer = load_onnx_model('org/bielik', cache_dir=str(tmp_path))
+
+    mock_load_ort.assert_called_once_with('org/bielik', export=True)
+    mock_model.save_pretrained.assert_called_once_with(onnx_export_dir('org/bielik', str(tmp_path)))
+    assert model is mock_model
+
+@patch('modules.onnx_backend.AutoTokenizer.from_pretrained')
+@patch('modules.onnx_backend._load_ort_model')
+def test_load_onnx_model_skips_export_when_cached(mock_load_ort, mock_tokenizer, tmp_path):
+    """
+    Tests that an already exported graph is loaded from disk without export,
+    and that a second call reuses the in-memory session.
+    """
+    _onnx_model_cache.clear()
+    export_dir = tmp_path / "org--bielik"
+    export_dir.mkdir()
+    (export_dir / "model.onnx").write_bytes(b"")
+
+    first = load_onnx_model('org/bielik', cache_dir=str(tmp_path))
+    second = load_onnx_model('org/bielik', cache_dir=str(tmp_path))
+
+    mock_load_ort.assert_called_once_with(str(export_dir), export=False)
+    assert first[0] is second[0]
+
+# -------------------------------
+# TEST: run_onnx_model
+# -------------------------------
+
+@patch('modules.onnx_backend.load_onnx_model')
+def test_run_onnx_model_success(mock_load):
+    """
+    Tests that run_onnx_model generates greedily, decodes only new tokens
+    and passes the output through parse_output.
+    """
+    tokenizer = MagicMock(return_value={"input_ids": torch.tensor([[1, 2, 3]])})
+    tokenizer.decode.return_value = "Answer: D\nExplanation: onnx"
+    model = MagicMock()
+    model.generate.return_value = torch.tensor([[1, 2, 3, 7, 8]])
+    mock_load.return_value = (model, tokenizer)
+
+    call_info = {}
+    answer, explanation = run_onnx_model("prompt", {"model_id": "m", "max_new_tokens": 16, "call_info": call_info})
+
+    assert (answer, explanation) == ("D", "onnx")
+    _, kwargs = model.generate.call_args
+    assert kwargs["max_new_tokens"] == 16
+    assert kwargs["do_sample"] is False
+    assert tokenizer.decode.call_args.args[0].tolist() == [7, 8]
+    assert call_info["completion_tokens"] == 2
+
+@patch('modules.onnx_backend.load_onnx_model')
+def test_run_onnx_model_generation_error(mock_load):
+    """ Test error handling when ONNX generation fails."""
+    model = MagicMock()
+    model.generate.side_effect = RuntimeError("fail")
+    mock_load.return_value = (model, MagicMock(return_value={"input_ids": torch.tensor([[1]])}))
+
+    answer, explanation = run_onnx_model("prompt", {"model_id": "m"})
+
+    assert answer == "Generation error"
+    assert "Exception during generation" in explanation
@@ -0,0 +1,68 @@
+import pytest
+import pandas as pd
+from modules.permutations import option_orders, permute_row, original_option, permutation_metrics
+
+@pytest.fixture
+def row():
+    return pd.Series({
+        "Pytanie": "Który region słynie z oscypków?",
+        "A": "Mazury", "B": "Podhale", "C": "Kujawy", "D": "Podlasie",
+        "Pozycja": "B",
+    })
+
+def test_option_orders_modes():
+    """ Tests that cyclic mode gives 4 rotations, 'all' gives 24 orders and identity comes first."""
+    cyclic = option_orders("cyclic")
+    assert cyclic == [("A", "B", "C", "D"), ("B", "C", "D", "A"), ("C", "D", "A", "B"), ("D", "A", "B", "C")]
+    assert len(option_orders("all")) == 24
+    assert option_orders("all")[0] == ("A", "B", "C", "D")
+    with pytest.raises(ValueError, match="Unsupported permutation mode"):
+        option_orders("random")
+
+def test_permute_row_remaps_correct_letter(row):
+    """ Tests that options are reordered and 'Pozycja' follows the correct option."""
+    permuted = permute_row(row, ("C", "D", "A", "B"))
+
+    assert [permuted[l] for l in "ABCD"] == ["Kujawy", "Podlasie", "Mazury", "Podhale"]
+    assert permuted["Pozycja"] == "D"
+    assert permuted[permuted["Pozycja"]] == "Podhale"
+    assert row["Pozycja"] == "B"  # original row untouched
+
+def test_original_option():
+    """ Tests mapping answers for a variant back to original letters."""
+    assert original_option("A", ("C", "D", "A", "B")) == "C"
+    assert original_option("Parsing error", ("C", "D", "A", "B")) == "Parsing error"
+
+def test_permutation_metrics_consistency_and_position_bias():
+    """
+    Tests metrics for one consistent question and one question where the model always answers 'A'
+    (a pure position bias).
+    """
+    records = [
+        {"poprawna": "B", "variants": [
+            {"order": "ABCD", "poprawna": "B", "odpowiedź": "B"},
+            {"order": "BCDA", "poprawna": "A", "odpowiedź": "A"},
+        ]},
+        {"poprawna": "C", "variants": [
+            {"order": "ABCD", "poprawna": "C", "odpowiedź": "A"},
+            {"order": "BCDA", "poprawna": "B", "odpowiedź": "A"},
+        ]},
+    ]
+    metrics = permutation_metrics(records)
+
+    assert metrics["accuracy"] == 0.5
+    assert metrics["consistency"] == 0.5
+    assert metrics["mean_agreement"] == 0.75
+    assert metrics["answer_position_share"]["A"] == 0.75
+    assert metrics["accuracy_by_correct_position"]["A"] == 1.0
+    assert metrics["accuracy_by_correct_position"]["C"] == 0.0
+    assert metrics["position_bias"] == 0.5
+
+def test_permutation_metrics_parsing_errors_are_not_consistent():
+    """ Tests that variants without a valid letter do not count as consistent."""
+    records = [{"poprawna": "A", "variants": [
+        {"order": "ABCD", "poprawna": "A", "odpowiedź": "Parsing error"},
+        {"order": "BCDA", "poprawna": "D", "odpowiedź": "Parsing error"},
+    ]}]
+
+    assert permutation_metrics(records)["consistency"] == 0.0
@@ -0,0 +1,21 @@
+import time
+from modules.profiling import current_rss_mb, peak_rss_mb, track_peak_rss
+
+def test_rss_readings_are_consistent():
+    """ Tests that the peak RSS is never below the current RSS."""
+    assert current_rss_mb() > 0
+    assert peak_rss_mb() >= current_rss_mb() - 1
+
+def test_track_peak_rss_sees_temporary_allocation():
+    """
+    Tests that a temporary allocation made and released inside the context
+    is reflected in the tracked peak.
+    """
+    with track_peak_rss(interval=0.001) as memory:
+        buffer = bytearray(64 * 1024 * 1024)
+        buffer[::4096] = b"x" * len(buffer[::4096])  # touch every page
+        time.sleep(0.05)
+        del buffer
+
+    assert memory["peak_rss_mb"] >= memory["start_rss_mb"] + 32
+    assert memory["peak_rss_mb"] >= memory["end_rss_mb"]
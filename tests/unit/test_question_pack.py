@@ -0,0 +1,102 @@
+import sys
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from modules.question_pack import (build_question_pack, load_question_pack, check_question_pack,
+                                   pack_input_ids, pack_path, prompts_hash, prompt_token_counts)
+from modules.utils import build_prompt
+
+class ByteTokenizer:
+    """Tokenizer with one id per UTF-8 byte plus a BOS token (id 256)."""
+
+    def __call__(self, text, truncation=False):
+        return {"input_ids": [256] + list(text.encode("utf-8"))}
+
+    def __len__(self):
+        return 257
+
+def make_dataset():
+    """Builds a small dataset with a non-default index."""
+    return pd.DataFrame({
+        "Pytanie": ["Gdzie piecze się sękacza?", "Co to jest oczepiny?"],
+        "A": ["Podlasie", "Obrzęd"], "B": ["Kujawy", "Taniec"], "C": ["Podhale", "Potrawa"], "D": ["Śląsk", "Strój"],
+        "Pozycja": ["A", "A"],
+    }, index=[3, 7])
+
+def test_pack_round_trip(tmp_path):
+    """ Tests that packed ids equal tokenised prompts and are read through a read-only memory map."""
+    data = make_dataset()
+    path = str(tmp_path / "pack")
+
+    meta = build_question_pack(data, ByteTokenizer(), path, "byte-model")
+    pack = load_question_pack(path)
+
+    assert meta["questions"] == 2 and meta["index"] == [3, 7]
+    assert isinstance(pack["input_ids"], np.memmap) and not pack["input_ids"].flags.writeable
+    for idx, row in data.iterrows():
+        assert pack_input_ids(pack, idx).tolist() == ByteTokenizer()(build_prompt(row))["input_ids"]
+    check_question_pack(pack, data, "byte-model")
+
+def test_pack_mismatch_is_rejected(tmp_path):
+    """ Tests that a pack built for another tokenizer, dataset snapshot or dataset numbering is rejected."""
+    data = make_dataset()
+    path = str(tmp_path / "pack")
+    build_question_pack(data, ByteTokenizer(), path, "byte-model")
+    pack = load_question_pack(path)
+
+    with pytest.raises(ValueError, match="tokenizer"):
+        check_question_pack(pack, data, "other-model")
+    changed = data.copy()
+    changed.loc[3, "A"] = "Mazury"
+    with pytest.raises(ValueError, match="dataset"):
+        check_question_pack(pack, changed, "byte-model")
+    with pytest.raises(ValueError, match="dataset"):
+        check_question_pack(pack, data.reset_index(drop=True), "byte-model")
+    with pytest.raises(FileNotFoundError):
+        load_question_pack(str(tmp_path / "missing"))
+
+def test_pack_path():
+    """ Tests the default pack directory name."""
+    assert pack_path("data/input.xlsx", "speakleash/Bielik-7B") == "models/packs/input__speakleash--Bielik-7B__pl-v1"
+    assert pack_path("data/input.xlsx", "m", prompt_id="pl-v2") == "models/packs/input__m__pl-v2"
+
+def test_pack_is_keyed_by_prompt_template(tmp_path):
+    """ Tests that a pack built with one prompt template is rejected for another and the hashes differ."""
+    data = make_dataset()
+    path = str(tmp_path / "pack")
+    meta = build_question_pack(data, ByteTokenizer(), path, "byte-model", prompt_id="pl-v2")
+    pack = load_question_pack(path)
+
+    assert meta["prompt"] == "pl-v2"
+    check_question_pack(pack, data, "byte-model", "pl-v2")
+    with pytest.raises(ValueError, match="prompt template pl-v2"):
+        check_question_pack(pack, data, "byte-model")
+    assert len({prompts_hash(data, prompt_id) for prompt_id in ("pl-v1", "pl-v2", "pl-compact-v1")}) == 3
+
+def test_prompt_token_counts_drop_with_normalised_templates():
+    """ Tests the per-template token counts and that normalised templates are cheaper than the original."""
+    data = make_dataset()
+    counts = {prompt_id: prompt_token_counts(data, ByteTokenizer(), prompt_id)
+              for prompt_id in ("pl-v1", "pl-v2", "pl-compact-v1")}
+
+    assert counts["pl-v1"]["questions"] == 2
+    assert counts["pl-v1"]["tokens"] == sum(len(ByteTokenizer()(build_prompt(row))["input_ids"]) for _, row in data.iterrows())
+    assert counts["pl-compact-v1"]["tokens"] < counts["pl-v2"]["tokens"] < counts["pl-v1"]["tokens"]
+
+@pytest.mark.parametrize("flags", [["--num_samples", "3"], ["--permutations", "cyclic"], ["--micro_batch"],
+                                   ["--concurrency", "4", "--micro_batch"], ["--two_stage"]])
+def test_pack_is_rejected_outside_sequential_and_adaptive_modes(tmp_path, capsys, flags):
+    """ Tests that --pack is refused in the batched and concurrent modes before the pack is loaded."""
+    from benchmark_test_llm_main import main
+
+    dataset = tmp_path / "input.csv"
+    pd.DataFrame([{"Pytanie": "P", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}]).to_csv(dataset, index=False)
+    argv = ["benchmark_test_llm_main.py", "--llm", "tiny", "--llm_name", "tiny", "--api", "local",
+            "--test", str(dataset), "--results", str(tmp_path / "raw.json"), "--pack", str(tmp_path / "pack"), *flags]
+
+    with patch.object(sys, "argv", argv), patch("benchmark_test_llm_main.load_question_pack") as load, \
+            pytest.raises(SystemExit):
+        main()
+    load.assert_not_called()
+    assert "error: --pack" in capsys.readouterr().err
@@ -0,0 +1,137 @@
+import json
+import sys
+from unittest.mock import patch
+import pandas as pd
+from modules.reparse import reparse_record, reparse_results
+from modules.response_saver import (compress_output, compress_outputs, decompress_output, load_raw_results,
+                                    RAW_OUTPUT_META, RAW_EXPLANATION_META)
+
+def make_record(numer, answer, raw, poprawna="A", **meta):
+    """Result record with a stored raw output (None for records without one)."""
+    extra = {RAW_OUTPUT_META: compress_output(raw)} if raw is not None else {}
+    return {"numer": numer, "pytanie": f"Pytanie {numer}", "poprawna": poprawna, "odpowiedź": answer,
+            "uzasadnienie": "stare", "meta": {"domena": "", "kategoria": "", "tagi": "", **extra, **meta}}
+
+def test_compress_output_round_trip():
+    """ Tests that raw outputs survive compression, including Polish characters."""
+    text = "Answer: B\nExplanation: Zwyczaj opisany w źródłach. " * 20
+    data = compress_output(text)
+
+    assert decompress_output(data) == text
+    assert len(data) < len(text)
+    assert decompress_output(None) is None
+
+def test_reparse_results_reports_changes():
+    """ Tests that only records with a raw output are re-parsed and changed answers are reported."""
+    results = [
+        make_record(0, "Parsing error", "Answer: A\nExplanation: teraz się da"),
+        make_record(1, "B", "Answer: B\nExplanation: bez zmian", poprawna="B"),
+        make_record(2, "Parsing error", None),
+    ]
+
+    with patch("modules.reparse.parse_output", side_effect=lambda raw, require_explanation: ("A", "teraz się da")
+               if "teraz" in raw else ("B", "bez zmian")):
+        updated, report = reparse_results(results, workers=1)
+
+    assert [r["odpowiedź"] for r in updated] == ["A", "B", "Parsing error"]
+    assert updated[0]["uzasadnienie"] == "teraz się da" and results[0]["odpowiedź"] == "Parsing error"
+    assert report["changes"] == [{"numer": 0, "poprawna": "A", "przed": "Parsing error", "po": "A"}]
+    assert (report["reparsed"], report["without_raw"], report["correct_before"], report["correct_after"]) == (2, 1, 1, 2)
+
+def test_answer_only_record_keeps_its_explanation():
+    """ Tests that a two-stage record needs only the letter and keeps the explanation of the second pass."""
+    record = make_record(0, "Parsing error", "Answer: C", ma_uzasadnienie=True)
+
+    assert reparse_record(record) == ("C", "stare")
+
+def test_answer_only_record_takes_a_parsed_explanation_pass():
+    """ Tests that a stored explanation-pass output that now parses for the same letter replaces the explanation."""
+    record = make_record(0, "C", "Answer: C", ma_uzasadnienie=False,
+                         **{RAW_EXPLANATION_META: compress_output("Answer: C\nExplanation: bo C")})
+
+    assert reparse_record(record) == ("C", "bo C")
+    record["meta"][RAW_EXPLANATION_META] = compress_output("Answer: D\nExplanation: bo D")
+    assert reparse_record(record) == ("C", "stare")
+
+def test_self_consistency_record_is_reaggregated():
+    """ Tests that sampled outputs are re-parsed one by one and voted again; a sample without a raw output keeps its letter."""
+    record = make_record(0, "B", None, samples=["Parsing error", "Parsing error", "B"], agreement=1 / 3)
+    record["meta"][RAW_OUTPUT_META] = compress_outputs(["Answer: A\nExplanation: a", "Answer: A\nExplanation: a2", None])
+
+    updated, report = reparse_results([record], workers=1)
+
+    assert (updated[0]["odpowiedź"], updated[0]["uzasadnienie"]) == ("A", "a")
+    assert updated[0]["meta"]["samples"] == ["A", "A", "B"]
+    assert updated[0]["meta"]["agreement"] == 2 / 3
+    assert report["changes"] == [{"numer": 0, "poprawna": "A", "przed": "B", "po": "A"}]
+
+def test_permutation_record_updates_every_variant():
+    """ Tests that every option-order variant is re-parsed and the record answer comes from the original order."""
+    variants = [{"order": "ABCD", "poprawna": "A", "odpowiedź": "Parsing error"},
+                {"order": "BCDA", "poprawna": "D", "odpowiedź": "Parsing error"}]
+    record = make_record(0, "Parsing error", None, permutations=variants)
+    record["meta"][RAW_OUTPUT_META] = compress_outputs(["Answer: A\nExplanation: a", "Answer: D\nExplanation: d"])
+
+    updated, _ = reparse_results([record], workers=1)
+
+    assert updated[0]["odpowiedź"] == "A"
+    assert [variant["odpowiedź"] for variant in updated[0]["meta"]["permutations"]] == ["A", "D"]
+    assert record["meta"]["permutations"][0]["odpowiedź"] == "Parsing error"
+
+def test_reparse_results_in_worker_processes():
+    """ Tests that the process pool gives the same answers as parsing in one process."""
+    results = [make_record(i, "Parsing error", f"Answer: {'ABCD'[i % 4]}\nExplanation: x") for i in range(40)]
+
+    with patch("modules.reparse.MIN_PARALLEL_RECORDS", 10):
+        parallel, _ = reparse_results(results, workers=2, chunk_size=7)
+    serial, report = reparse_results(results, workers=1)
+
+    assert parallel == serial
+    assert report["changed"] == 40
+
+def fake_local_answer(prompt, config):
+    """Mocked local model call reporting an output that the parser cannot handle."""
+    config["call_info"].update({"completion_tokens": 5, "raw_output": "Odpowiedź: c, bo tak"})
+    return "Parsing error", "Exception during parsing."
+
+def test_runner_stores_raw_output_for_reparse(tmp_path):
+    """ Tests that the runner keeps the compressed raw output and reparse rescues it with a better parser."""
+    from benchmark_test_llm_main import main
+    from benchmark_reparse import main as reparse_main
+
+    dataset = tmp_path / "input.csv"
+    pd.DataFrame([{"Pytanie": "Pytanie", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "C"}]).to_csv(dataset, index=False)
+    results = tmp_path / "raw.json"
+    argv = ["benchmark_test_llm_main.py", "--llm", "tiny", "--llm_name", "tiny", "--api", "local",
+            "--test", str(dataset), "--results", str(results), "--interval", "0"]
+
+    with patch("benchmark_test_llm_main.ask_model", side_effect=fake_local_answer), \
+         patch("modules.local_backend.load_local_model"), patch.object(sys, "argv", argv):
+        main()
+    saved = load_raw_results(str(results))
+    assert decompress_output(saved[0]["meta"][RAW_OUTPUT_META]) == "Odpowiedź: c, bo tak"
+
+    report_path = tmp_path / "report.json"
+    with patch("modules.reparse.parse_output", return_value=("C", "")), patch.object(
+            sys, "argv", ["benchmark_reparse.py", "--results", str(results), "--in_place", "--report", str(report_path)]):
+        reparse_main()
+
+    assert load_raw_results(str(results))[0]["odpowiedź"] == "C"
+    report = json.loads(report_path.read_text(encoding="utf-8"))[str(results)]
+    assert report["correct_before"] == 0 and report["correct_after"] == 1
+
+def test_self_consistency_run_stores_sample_outputs(tmp_path):
+    """ Tests that a self-consistency run stores the compressed raw output of every sample."""
+    from types import SimpleNamespace
+    from benchmark_test_llm_main import run_self_consistency
+
+    data = pd.DataFrame([{"Pytanie": "Pytanie", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}])
+    args = SimpleNamespace(num_samples=2, temperature=0.7, top_p=0.95, batch_size=4, interval=0,
+                           llm="m", llm_name="m", results=str(tmp_path / "raw.json"))
+    outcome = {"answer": "A", "explanation": "a", "samples": ["A", "Parsing error"], "agreement": 0.5,
+               "raw_outputs": ["Answer: A\nExplanation: a", "a może B"]}
+    results = []
+    with patch("benchmark_test_llm_main.ask_model_samples", return_value=[outcome]):
+        run_self_consistency(data, {"api": "local"}, args, results, {}, 0.0)
+
+    assert [decompress_output(data) for data in results[0]["meta"][RAW_OUTPUT_META]] == outcome["raw_outputs"]
@@ -1,6 +1,7 @@
 import json
+import pytest
 from pathlib import Path
-from modules.response_saver import save_raw_results 
+from modules.response_saver import save_raw_results, save_run_summary, run_summary_path, load_raw_results, load_results_frame
 
 def test_save_raw_results_creates_valid_json(tmp_path):
     """ Tests that save_raw_results creates a valid
@@ -35,4 +36,46 @@ def test_save_raw_results_creates_valid_json(tmp_path):
     assert saved_data[0]["model_answer"] == "C", "Model answer does not match."
     assert "model_explanation" in saved_data[0], "Model explanation is missing."
 
-    
\ No newline at end of file
+def test_save_run_summary_next_to_results(tmp_path):
+    """ Tests that the run summary is written next to the raw results file."""
+
+    results_path = tmp_path / "bielik.json"
+    summary_path = run_summary_path(str(results_path))
+    save_run_summary({"questions": 3, "tokens_per_s": 12.5}, summary_path)
+
+    assert summary_path.endswith("bielik_run.json")
+    with open(summary_path, encoding='utf-8') as f:
+        assert json.load(f)["tokens_per_s"] == 12.5
+
+def test_save_raw_results_replaces_nan_with_null(tmp_path):
+    """ Tests that NaN values (e.g. empty 'Tagi') are written as null, so the file is valid JSON."""
+
+    results = [{"numer": 0, "pytanie": "Q", "poprawna": "A", "odpowiedź": "A", "uzasadnienie": "x",
+                "meta": {"domena": "Etnologia", "kategoria": "Historia", "tagi": float("nan")}}]
+    output_path = tmp_path / "nan.json"
+    save_raw_results(results, str(output_path))
+
+    text = output_path.read_text(encoding='utf-8')
+    assert "NaN" not in text
+    assert json.loads(text)[0]["meta"]["tagi"] is None
+
+def test_parquet_round_trip_with_categorical_columns(tmp_path):
+    """ Tests that results saved to Parquet load back unchanged and use categorical columns."""
+    pytest.importorskip("pyarrow")
+
+    results = [
+        {"numer": i, "pytanie": f"Pytanie {i}", "poprawna": "ABCD"[i % 4], "odpowiedź": "B",
+         "uzasadnienie": "Bo tak.",
+         "meta": {"domena": "Etnologia", "kategoria": "Historia", "tagi": None, "czas_s": 0.5, "tokeny": 12,
+                  "samples": ["B", "B", "A"]}}
+        for i in range(6)
+    ]
+    output_path = tmp_path / "results.parquet"
+    save_raw_results(results, str(output_path))
+
+    assert load_raw_results(str(output_path)) == results
+
+    frame = load_results_frame(str(output_path))
+    assert str(frame["odpowiedź"].dtype) == "category"
+    assert str(frame["kategoria"].dtype) == "category"
+    assert frame["czas_s"].sum() == 3.0
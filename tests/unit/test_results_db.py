@@ -0,0 +1,75 @@
+import pandas as pd
+from modules.results_db import open_results_db, start_run, record_answer, disagreements, accuracy_by_category, question_hash
+
+QUESTIONS = [
+    {"Pytanie": "Jaki język tradycyjnie używany był przez Łemków?", "A": "polski", "B": "rusiński", "C": "słowacki",
+     "D": "czeski", "Pozycja": "B", "Domena": "Etnologia", "Kategoria": "Historia", "Tagi": float("nan")},
+    {"Pytanie": "Jak nazywa się chata góralska?", "A": "Chałupa", "B": "Kurna chata", "C": "Bacówka",
+     "D": "Szałas", "Pozycja": "A", "Domena": "Etnologia", "Kategoria": "Architektura", "Tagi": "góry"},
+]
+
+def record(numer, answer):
+    return {"numer": numer, "pytanie": "", "poprawna": "", "odpowiedź": answer, "uzasadnienie": "x",
+            "meta": {"czas_s": 0.2, "tokeny": 10}}
+
+def store_run(conn, model, answers):
+    run_id = start_run(conn, model, model_id=f"org/{model}", api="local", dataset="input.xlsx", config={"x": 1})
+    for numer, (question, answer) in enumerate(zip(QUESTIONS, answers)):
+        record_answer(conn, run_id, pd.Series(question), record(numer, answer))
+    return run_id
+
+def test_question_hash_ignores_position_and_whitespace():
+    """ Tests that the question key depends on content only, not on stray whitespace."""
+    row = pd.Series(QUESTIONS[0])
+    moved = pd.Series({**QUESTIONS[0], "Pytanie": "\t" + QUESTIONS[0]["Pytanie"] + "  "})
+
+    assert question_hash(row) == question_hash(moved)
+    assert question_hash(row) != question_hash(pd.Series(QUESTIONS[1]))
+
+def test_disagreements_between_latest_runs(tmp_path):
+    """ Tests that disagreements compare the latest runs of both models on shared questions."""
+    conn = open_results_db(str(tmp_path / "results.sqlite"))
+    store_run(conn, "bielik-7b", ["A", "A"])
+    store_run(conn, "bielik-7b", ["B", "A"])  # newer run
+    store_run(conn, "gemini", ["B", "C"])
+
+    rows = disagreements(conn, "bielik-7b", "gemini")
+
+    assert len(rows) == 1
+    assert rows[0]["kategoria"] == "Architektura"
+    assert (rows[0]["answer_a"], rows[0]["answer_b"]) == ("A", "C")
+
+def test_accuracy_by_category_over_runs(tmp_path):
+    """ Tests accuracy per kategoria for every run of a model, in run order."""
+    conn = open_results_db(str(tmp_path / "results.sqlite"))
+    store_run(conn, "bielik-7b", ["Parsing error", "A"])
+    store_run(conn, "bielik-7b", ["B", "A"])
+
+    rows = accuracy_by_category(conn, "bielik-7b")
+
+    history = [(r["kategoria"], r["accuracy"]) for r in rows if r["kategoria"] == "Historia"]
+    assert history == [("Historia", 0.0), ("Historia", 1.0)]
+    assert all(r["answers"] == 1 for r in rows)
+
+def test_reopening_database_keeps_data(tmp_path):
+    """ Tests that answers persist across connections and questions are stored once."""
+    path = str(tmp_path / "results.sqlite")
+    conn = open_results_db(path)
+    store_run(conn, "bielik-7b", ["B", "A"])
+    store_run(conn, "gemini", ["B", "A"])
+    conn.close()
+
+    conn = open_results_db(path)
+    assert conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] == 4
+
+def test_rerecorded_answer_updates_category_counters(tmp_path):
+    """ Tests that answering the same question again in a run replaces the answer and keeps counters exact."""
+    conn = open_results_db(str(tmp_path / "results.sqlite"))
+    run_id = store_run(conn, "bielik-7b", ["Parsing error", "A"])
+    record_answer(conn, run_id, pd.Series(QUESTIONS[0]), record(0, "B"))
+
+    rows = {r["kategoria"]: r for r in accuracy_by_category(conn)}
+
+    assert rows["Historia"]["answers"] == 1
+    assert rows["Historia"]["accuracy"] == 1.0
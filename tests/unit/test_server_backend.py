@@ -0,0 +1,70 @@
+import threading
+import pytest
+from unittest.mock import patch
+from modules.local_server import create_server
+from modules.server_backend import run_server_model, score_server_model, sample_server_model
+
+@pytest.fixture
+def server_url():
+    """Starts the local inference server on a free port for the duration of a test."""
+    server = create_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def fake_run_local_model(prompt, config):
+    config["call_info"]["completion_tokens"] = 5
+    return "B", f"{config['model_id']}: {prompt}"
+
+@patch("modules.local_backend.run_local_model", side_effect=fake_run_local_model)
+def test_run_server_model_round_trip(mock_run, server_url):
+    """
+    Tests that a prompt sent to the server is answered by the local backend,
+    that the config is forwarded and that call statistics come back to the client.
+    """
+    call_info = {}
+    config = {"api": "local_server", "model_id": "bielik", "url": server_url, "max_new_tokens": 64, "call_info": call_info}
+    answer, explanation = run_server_model("pytanie", config)
+
+    assert (answer, explanation) == ("B", "bielik: pytanie")
+    forwarded_config = mock_run.call_args.args[1]
+    assert forwarded_config["max_new_tokens"] == 64
+    assert "url" not in forwarded_config
+    assert call_info["completion_tokens"] == 5
+
+@patch("modules.local_backend.score_local_model", return_value={"A": -0.1, "B": -2.0, "C": -3.0, "D": -4.0})
+def test_score_server_model(mock_score, server_url):
+    """ Tests that the /score endpoint returns answer-letter log-probabilities."""
+    scores = score_server_model("pytanie", {"model_id": "bielik", "url": server_url})
+
+    assert max(scores, key=scores.get) == "A"
+
+def fake_run_local_model_samples(prompts, config):
+    config["call_info"]["completion_tokens"] = 12
+    return [{"answer": "A", "explanation": prompt, "samples": ["A", "A", "B"], "agreement": 2 / 3} for prompt in prompts]
+
+@patch("modules.local_backend.run_local_model_samples", side_effect=fake_run_local_model_samples)
+def test_sample_server_model_round_trip(mock_samples, server_url):
+    """ Tests that the /samples endpoint samples a whole batch on the server with the sampling settings."""
+    call_info = {}
+    config = {"model_id": "bielik", "url": server_url, "num_samples": 3, "temperature": 0.7, "call_info": call_info}
+    outcomes = sample_server_model(["p1", "p2"], config)
+
+    assert [outcome["explanation"] for outcome in outcomes] == ["p1", "p2"]
+    assert mock_samples.call_args.args[1]["temperature"] == 0.7
+    assert call_info["completion_tokens"] == 12
+
+def test_run_server_model_unreachable_server():
+    """ Tests that a server that cannot be reached results in a generation error."""
+    config = {"model_id": "bielik", "url": "http://127.0.0.1:9", "timeout": 1}
+    answer, explanation = run_server_model("prompt", config)
+
+    assert answer == "Generation error"
+    assert "Exception during generation" in explanation
+
+def test_run_server_model_missing_model_id():
+    """ Test if run_server_model raises KeyError when model_id is missing from config."""
+    with pytest.raises(KeyError):
+        run_server_model("prompt", {"api": "local_server"})
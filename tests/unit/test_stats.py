@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.stats import wilson_interval, bootstrap_ci, mcnemar_test, paired_tests, compare_models, correctness_matrix
+
+def make_answers(model, labels, domains=("Etnologia", "Historia")):
+    """Builds a scored answers frame for one model."""
+    return pd.DataFrame({
+        "model": model,
+        "pytanie": [f"Pytanie {i}" for i in range(len(labels))],
+        "domena": [domains[i % len(domains)] for i in range(len(labels))],
+        "label": labels,
+    })
+
+def test_bootstrap_ci_contains_accuracy_and_is_reproducible():
+    """ Tests that the interval brackets the observed accuracy and depends only on the seed."""
+    correct = np.array([True] * 60 + [False] * 40)
+
+    first = bootstrap_ci(correct, n_resamples=2000, seed=1)[0]
+    second = bootstrap_ci(correct, n_resamples=2000, seed=1)[0]
+
+    assert first == second
+    assert first["accuracy"] == 0.6
+    assert first["ci_low"] < 0.6 < first["ci_high"]
+    assert 0.45 < first["ci_low"] and first["ci_high"] < 0.75
+
+def test_mcnemar_exact_and_chi_square():
+    """ Tests McNemar p-values for no, few and many discordant questions."""
+    same = np.array([True, False, True])
+    assert mcnemar_test(same, same) == {"only_a": 0, "only_b": 0, "p_value": 1.0}
+
+    # 6 discordant questions, all in favour of A: exact p = 2 / 2**6
+    a = np.array([True] * 6 + [False] * 4)
+    b = np.array([False] * 6 + [False] * 4)
+    assert mcnemar_test(a, b)["p_value"] == pytest.approx(2 / 64)
+
+    a = np.array([True] * 40 + [False] * 10)
+    b = np.array([False] * 40 + [True] * 10)
+    result = mcnemar_test(a, b)
+    assert (result["only_a"], result["only_b"]) == (40, 10)
+    assert result["p_value"] < 0.001
+
+def test_paired_tests_detect_a_clear_difference():
+    """ Tests that a much better model differs significantly and identical models do not."""
+    rng = np.random.default_rng(0)
+    weak = rng.random(300) < 0.3
+    strong = weak | (rng.random(300) < 0.6)
+    correct = np.column_stack([strong, weak, weak])
+
+    pairs = {(p["model_a"], p["model_b"]): p for p in paired_tests(["strong", "weak", "copy"], correct, 2000)}
+
+    assert pairs[("strong", "weak")]["p_bootstrap"] < 0.01
+    assert pairs[("strong", "weak")]["ci_low"] > 0
+    assert pairs[("weak", "copy")]["accuracy_diff"] == 0
+    assert pairs[("weak", "copy")]["mcnemar"]["p_value"] == 1.0
+
+def test_compare_models_uses_shared_questions_and_domains():
+    """ Tests the report built from merged answers: shared question set, per-domain intervals and pairs."""
+    answers = pd.concat([
+        make_answers("bielik", ['prawidłowa', 'nieprawidłowa', 'prawidłowa', 'brak odpowiedzi']),
+        make_answers("gemini", ['prawidłowa', 'prawidłowa', 'prawidłowa']),
+    ])
+
+    models, matrix = correctness_matrix(answers)
+    report = compare_models(answers, n_resamples=500)
+
+    assert models == ["bielik", "gemini"]
+    assert report["questions"] == 3
+    assert report["models"]["bielik"]["accuracy"] == round(2 / 3, 4)
+    assert report["models"]["gemini"]["domeny"]["Etnologia"]["questions"] == 2
+    assert len(report["pairs"]) == 1
+    assert report["pairs"][0]["mcnemar"] == {"only_a": 0, "only_b": 1, "p_value": 1.0}
+
+def test_wilson_interval():
+    """ Tests the Wilson interval against a known value and its edge cases."""
+    low, high = wilson_interval(8, 10)
+
+    assert (round(low, 4), round(high, 4)) == (0.4902, 0.9433)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(0, 20)[0] == pytest.approx(0.0)
@@ -1,6 +1,11 @@
+import json
+import sys
 import pytest
 import pandas as pd
-from modules.utils import parse_output, build_prompt
+from types import SimpleNamespace
+from unittest.mock import patch
+from modules.utils import (parse_output, build_prompt, build_explanation_prompt, majority_vote, aggregate_samples,
+                           normalize_prompt, PROMPT_TEMPLATE)
 
 def test_parse_output_with_valid_format():
     """ Tests whether parse_output correctly extracts the answer and explanation 
@@ -32,6 +37,19 @@ def test_parse_output_unstructured():
     assert answer == "Parsing error"
     assert explanation == "Exception during parsing."
 
+def test_parse_output_without_required_explanation():
+    """ Tests that answer-only outputs are parsed when the explanation is not required."""
+    assert parse_output("Answer: B", require_explanation=False) == ("B", "")
+    assert parse_output("Answer: B\nExplanation: bo tak", require_explanation=False) == ("B", "bo tak")
+    assert parse_output("Nie wiem", require_explanation=False)[0] == "Parsing error"
+
+def test_parse_output_answer_only_ignores_polish_prose():
+    """ Tests that lowercase Polish words ("a", "i", "w") are not taken for the answer of an answer-only output."""
+    assert parse_output("To jest a nie b, odpowiedź C", require_explanation=False) == ("C", "")
+    assert parse_output("Chodzi o strój noszony w Łowiczu i okolicach: D", require_explanation=False) == ("D", "")
+    assert parse_output("Trudno powiedzieć, a i w źródłach brak zgody", require_explanation=False)[0] == "Parsing error"
+    assert parse_output("answer: b", require_explanation=False) == ("B", "")
+
 def test_build_prompt_with_valid_row():
     """ Test that build_prompt correctly formats a prompt from a row of test data."""
 
@@ -69,3 +87,88 @@ def test_build_prompt_with_missing_option():
     with pytest.raises(KeyError):
         build_prompt(row)
 
+
+def test_majority_vote_and_agreement():
+    """ Test that majority vote ignores errors and reports the share of samples agreeing with the winner."""
+    assert majority_vote(["B", "A", "B", "Parsing error"]) == ("B", 0.5)
+    assert majority_vote(["C", "A"]) == ("C", 0.5)  # tie -> first sampled letter
+    assert majority_vote(["Parsing error", "Generation error"]) == ("Parsing error", 0.0)
+
+def test_aggregate_samples_takes_explanation_from_majority():
+    """ Test that the explanation comes from a sample that voted for the majority answer."""
+    parsed = [("A", "why A"), ("D", "why D"), ("D", "why D again")]
+    outcome = aggregate_samples(parsed)
+
+    assert outcome["answer"] == "D"
+    assert outcome["explanation"] == "why D"
+    assert outcome["samples"] == ["A", "D", "D"]
+    assert outcome["agreement"] == pytest.approx(2 / 3)
+
+def test_answer_only_and_explanation_prompts():
+    """ Tests the answer-only prompt (no request for an explanation) and the explanation prompt of a given answer."""
+    row = pd.Series({"Pytanie": "Stolica Polski?", "A": "Kraków", "B": "Warszawa", "C": "Gdańsk", "D": "Poznań"})
+
+    answer_only = build_prompt(row, answer_only=True)
+    assert "Warszawa" in answer_only and "Explanation" not in answer_only
+    explanation = build_explanation_prompt(row, "B")
+    assert "Answer: B" in explanation and "Explanation:" in explanation and "Stolica Polski?" in explanation
+
+def test_run_two_stage_explains_only_wrong_answers(tmp_path):
+    """ Tests that the two-stage runner asks answer-only first and requests explanations only for wrong answers."""
+    from benchmark_test_llm_main import run_two_stage
+
+    data = pd.DataFrame([{"Pytanie": f"Pytanie {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}
+                         for i in range(4)])
+    args = SimpleNamespace(answer_tokens=8, explain="wrong", explain_sample=0.1, seed=0, interval=0,
+                           llm="m", llm_name="m", results=str(tmp_path / "raw.json"))
+    answers = iter([("A", ""), ("B", ""), ("A", ""), ("Parsing error", "Exception during parsing."), ("B", "bo b")])
+    configs = []
+
+    def fake_ask(prompt, config):
+        configs.append(config)
+        return next(answers)
+
+    results = []
+    with patch("benchmark_test_llm_main.ask_model", side_effect=fake_ask):
+        summary = run_two_stage(data, {"api": "local", "max_new_tokens": 256}, args, results, {}, 0.0)
+
+    assert [c.get("answer_only") for c in configs] == [True] * 4 + [None]
+    assert configs[0]["max_new_tokens"] == 8 and configs[-1]["max_new_tokens"] == 256
+    assert [r["meta"]["ma_uzasadnienie"] for r in results] == [False, True, False, False]
+    assert results[1]["uzasadnienie"] == "bo b" and results[1]["odpowiedź"] == "B"
+    assert (summary["selected"], summary["explained"]) == (1, 1)
+
+def test_prompt_templates_and_normalisation():
+    """ Tests that 'pl-v1' keeps the original prompt, normalised templates drop the indentation
+    and an unknown template id is rejected."""
+    row = pd.Series({"Pytanie": "Co  to jest?", "A": "a", "B": "b", "C": "c", "D": "d"})
+
+    assert build_prompt(row) == PROMPT_TEMPLATE.format(question="Co  to jest?", A="a", B="b", C="c", D="d")
+    normalised = build_prompt(row, prompt_id="pl-v2")
+    assert normalised == normalize_prompt(build_prompt(row))
+    assert "\n    " not in normalised and "Pytanie: Co to jest?\nA: a" in normalised
+    assert normalize_prompt("  a  b \n\n\n\n c\n  ") == "a b\n\nc"
+    assert "Explanation:" not in build_prompt(row, answer_only=True, prompt_id="pl-compact-v1")
+    with pytest.raises(ValueError, match="Unknown prompt template"):
+        build_prompt(row, prompt_id="pl-v9")
+
+def test_runner_records_template_and_rejects_mixed_resume(tmp_path):
+    """ Tests that answers carry the prompt template id and --resume refuses a different template."""
+    from benchmark_test_llm_main import main
+
+    dataset = tmp_path / "input.csv"
+    pd.DataFrame([{"Pytanie": f"P{i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A"}
+                  for i in range(2)]).to_csv(dataset, index=False)
+    results = tmp_path / "raw.json"
+    argv = ["benchmark_test_llm_main.py", "--llm", "gpt-4o", "--llm_name", "gpt", "--api", "openAI",
+            "--test", str(dataset), "--results", str(results), "--interval", "0", "--prompt", "pl-compact-v1"]
+
+    with patch("benchmark_test_llm_main.ask_model", return_value=("A", "x")) as ask:
+        with patch.object(sys, "argv", argv):
+            main()
+        assert ask.call_args.args[0].startswith("Wybierz poprawną odpowiedź (A, B, C lub D)")
+        with patch.object(sys, "argv", argv[:-2] + ["--resume"]), pytest.raises(SystemExit):
+            main()
+
+    saved = json.loads(results.read_text(encoding="utf-8"))
+    assert [record["meta"]["szablon_promptu"] for record in saved] == ["pl-compact-v1"] * 2
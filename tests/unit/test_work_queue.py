@@ -0,0 +1,184 @@
+import multiprocessing
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from modules.work_queue import (open_queue, create_queue, queue_meta, claim_batch, renew_lease, complete_batch,
+                                abandon_batch, queue_progress, queue_usage, collect_results)
+
+def make_records(labels, answer="A"):
+    """Builds minimal result records for the given question numbers."""
+    return [{"numer": label, "odpowiedz_modelu": answer} for label in labels]
+
+def drain_queue(path, worker):
+    """Worker process used by the multi-process test: answers batches until nothing is claimable."""
+    conn = open_queue(path)
+    while True:
+        claimed = claim_batch(conn, worker, lease_s=60)
+        if claimed is None:
+            return
+        batch_id, labels = claimed
+        complete_batch(conn, batch_id, worker, make_records(labels), {"completion_tokens": len(labels)})
+
+def test_claim_complete_and_collect(tmp_path):
+    """ Tests claiming batches in order, completing them and collecting answers with summed statistics."""
+    conn = open_queue(str(tmp_path / "queue.db"))
+    assert create_queue(conn, list(range(5)), batch_size=2, meta={"model": "m"}) == 3
+    assert queue_meta(conn) == {"model": "m"}
+
+    first = claim_batch(conn, "w1")
+    second = claim_batch(conn, "w2")
+    assert first == (1, [0, 1]) and second == (2, [2, 3])
+    assert renew_lease(conn, 1, "w1") is True
+    assert renew_lease(conn, 1, "w2") is False
+
+    complete_batch(conn, 2, "w2", make_records([2, 3]), {"completion_tokens": 4})
+    complete_batch(conn, 1, "w1", make_records([0, 1]), {"completion_tokens": 6})
+    progress = queue_progress(conn)
+    assert (progress["pending"], progress["leased"], progress["done"], progress["workers"]) == (1, 0, 2, 2)
+
+    records, totals = collect_results(conn)
+    assert [record["numer"] for record in records] == [0, 1, 2, 3]
+    assert totals == {"completion_tokens": 10}
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    """ Tests that a batch of a worker that stopped renewing its lease is handed to another worker once."""
+    conn = open_queue(str(tmp_path / "queue.db"))
+    create_queue(conn, [0, 1, 2], batch_size=3)
+
+    assert claim_batch(conn, "crashed", lease_s=-1) == (1, [0, 1, 2])
+    assert claim_batch(conn, "w2") == (1, [0, 1, 2])
+    assert claim_batch(conn, "w3") is None
+    assert renew_lease(conn, 1, "crashed") is False
+
+    assert complete_batch(conn, 1, "w2", make_records([0, 1, 2]), {"completion_tokens": 3}) is True
+    assert complete_batch(conn, 1, "crashed", make_records([0, 1, 2], answer="B"), {"completion_tokens": 2}) is False
+    assert queue_progress(conn)["reclaimed_batches"] == 1
+    assert queue_progress(conn)["answers"] == 3
+
+    records, totals = collect_results(conn)
+    assert [record["odpowiedz_modelu"] for record in records] == ["A"] * 3
+    assert totals == {"completion_tokens": 5}
+
+def test_stale_completion_before_the_holder_finishes_is_dropped(tmp_path):
+    """ Tests that a worker whose batch was reclaimed cannot mark it done while the new holder is still answering."""
+    conn = open_queue(str(tmp_path / "queue.db"))
+    create_queue(conn, [0, 1], batch_size=2)
+
+    claim_batch(conn, "slow", lease_s=-1)
+    claim_batch(conn, "w2")
+    assert complete_batch(conn, 1, "slow", make_records([0, 1], answer="B")) is False
+    assert (queue_progress(conn)["leased"], queue_progress(conn)["answers"]) == (1, 0)
+    assert renew_lease(conn, 1, "w2") is True
+
+def test_usage_counts_every_batch_attempt(tmp_path):
+    """ Tests that the run-wide usage includes abandoned and repeated attempts of a reclaimed batch."""
+    conn = open_queue(str(tmp_path / "queue.db"))
+    create_queue(conn, [0, 1, 2, 3], batch_size=2)
+
+    claim_batch(conn, "slow", lease_s=-1)
+    claim_batch(conn, "w2")
+    assert renew_lease(conn, 1, "slow") is False
+    abandon_batch(conn, 1, "slow", {"prompt_tokens": 50, "completion_tokens": 5})
+    complete_batch(conn, 1, "w2", make_records([0, 1]), {"prompt_tokens": 100, "completion_tokens": 10})
+
+    assert queue_usage(conn) == {"prompt_tokens": 150, "completion_tokens": 15}
+    assert collect_results(conn)[1] == queue_usage(conn)
+    assert queue_progress(conn)["answers"] == 2
+
+def test_create_queue_is_idempotent(tmp_path):
+    """ Tests that restarting the coordinator on an existing queue keeps its batches and progress."""
+    path = str(tmp_path / "queue.db")
+    conn = open_queue(path)
+    create_queue(conn, list(range(4)), batch_size=2, meta={"model": "m"})
+    batch_id, labels = claim_batch(conn, "w1")
+    complete_batch(conn, batch_id, "w1", make_records(labels))
+
+    assert create_queue(open_queue(path), list(range(4)), batch_size=1, meta={"model": "other"}) == 2
+    assert queue_meta(conn) == {"model": "m"}
+    assert queue_progress(conn)["done"] == 1
+
+def test_workers_in_separate_processes_answer_every_question_once(tmp_path):
+    """ Tests that workers running in parallel processes on one queue file split the work without overlap."""
+    path = str(tmp_path / "queue.db")
+    create_queue(open_queue(path), list(range(200)), batch_size=3)
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=drain_queue, args=(path, f"w{i}")) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    conn = open_queue(path)
+    records, totals = collect_results(conn)
+    assert [record["numer"] for record in records] == list(range(200))
+    assert totals == {"completion_tokens": 200}
+    assert queue_progress(conn)["reclaimed_batches"] == 0
+
+def test_coordinator_and_workers_produce_results(tmp_path):
+    """ Tests two runner workers started before the coordinator and the coordinator sharing a queue (model calls are mocked)."""
+    from benchmark_test_llm_main import run_coordinator, run_worker
+
+    data = pd.DataFrame([{"Pytanie": f"Pytanie {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A",
+                          "Domena": "Etnologia", "Kategoria": "Historia", "Tagi": None} for i in range(10)])
+    args = SimpleNamespace(queue=str(tmp_path / "queue.db"), queue_batch=3, lease=60, poll_interval=0.05,
+                           interval=0, test="input.csv", llm="m", llm_name="m", results=str(tmp_path / "raw.json"))
+
+    with patch("benchmark_test_llm_main.ask_model", return_value=("A", "x")) as ask:
+        coordinator = threading.Thread(target=run_coordinator, args=(data, args, []))
+        workers = [threading.Thread(target=run_worker, args=(data, {"api": "local"}, args, {})) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        coordinator.start()
+        for thread in workers + [coordinator]:
+            thread.join(30)
+
+    assert ask.call_count == 10
+    saved = pd.read_json(args.results)
+    assert sorted(saved["numer"]) == list(range(10))
+    assert set(saved["odpowiedź"]) == {"A"}
+
+def test_queue_run_stops_at_the_run_wide_budget(tmp_path):
+    """ Tests that a worker stops claiming batches once the usage in the queue reaches the budget
+    and that the coordinator then saves the answers so far instead of waiting for the rest."""
+    from benchmark_test_llm_main import run_coordinator, run_worker
+
+    def answer(prompt, config):
+        config["call_info"].update(prompt_tokens=8, completion_tokens=2)
+        return "A", "x"
+
+    data = pd.DataFrame([{"Pytanie": f"Pytanie {i}", "A": "a", "B": "b", "C": "c", "D": "d", "Pozycja": "A",
+                          "Domena": "Etnologia", "Kategoria": "Historia", "Tagi": None} for i in range(10)])
+    args = SimpleNamespace(queue=str(tmp_path / "queue.db"), queue_batch=3, lease=60, poll_interval=0.05,
+                           interval=0, test="input.csv", llm="m", llm_name="m", results=str(tmp_path / "raw.json"),
+                           max_cost=None, max_tokens_total=25, previous_usage=None)
+
+    with patch("benchmark_test_llm_main.ask_model", side_effect=answer) as ask:
+        coordinator = threading.Thread(target=run_coordinator, args=(data, args, []))
+        coordinator.start()
+        run_worker(data, {"api": "openAI"}, args, {})
+        coordinator.join(30)
+
+    assert not coordinator.is_alive()
+    assert ask.call_count == 3
+    assert queue_usage(open_queue(args.queue)) == {"prompt_tokens": 24, "completion_tokens": 6}
+    assert sorted(pd.read_json(args.results)["numer"]) == [0, 1, 2]
+
+@pytest.mark.parametrize("flags", [["--worker", "--concurrency", "4"], ["--worker", "--num_samples", "3"],
+                                   ["--coordinator", "--two_stage"], ["--worker", "--micro_batch"],
+                                   ["--coordinator", "--permutations", "cyclic"], ["--worker", "--adaptive"]])
+def test_queue_roles_reject_run_modes(tmp_path, capsys, flags):
+    """ Tests that --worker and --coordinator refuse run mode flags they would otherwise ignore."""
+    from benchmark_test_llm_main import main
+
+    argv = ["benchmark_test_llm_main.py", "--llm", "m", "--llm_name", "m", "--api", "openAI", "--test", "input.csv",
+            "--results", str(tmp_path / "raw.json"), "--queue", str(tmp_path / "queue.db"), *flags]
+    with patch.object(sys, "argv", argv), patch("benchmark_test_llm_main.load_dataset") as load, \
+            pytest.raises(SystemExit):
+        main()
+    load.assert_not_called()
+    assert "does not support" in capsys.readouterr().err